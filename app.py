@@ -1,32 +1,26 @@
 import streamlit as st
-import asyncio
 import logging
 import os
 import tempfile
-import shutil
+import time
 
-from moviepy.config import change_settings
 from utils.service_utils import create_service_sections, validate_service_content
-from utils.audio_utils import text_to_speech
-from utils.video_utils import create_slide, combine_slides_and_audio
-from services.unsplash_service import fetch_and_save_photo
-from services.gemini_service import generate_slides_from_raw
-from utils.avatar_utils import add_avatar_to_slide
-from utils.pdf_extractor import extract_raw_content
-from utils.pdf_utils import generate_service_pdf
-
-# --- DYNAMIC BINARY CONFIG ---
-def init_binaries():
-    # Detect ImageMagick location (Linux vs Windows)
-    magick_path = shutil.which("magick") or shutil.which("convert")
-    if magick_path:
-        change_settings({"IMAGEMAGICK_BINARY": magick_path})
-    elif os.name == 'nt': # Fallback for local Windows testing only
-        win_path = r"C:\Program Files\ImageMagick-7.1.2-Q16-HDRI\magick.exe"
-        if os.path.exists(win_path):
-            change_settings({"IMAGEMAGICK_BINARY": win_path})
-
-init_binaries()
+from utils.render_profiles import RENDER_PROFILES, DEFAULT_PROFILE
+from utils.trace_utils import start_metrics_server, summarize_trace, trace_path
+from services.slide_cache import load_deck
+from job_queue import (
+    submit_job,
+    get_job,
+    list_jobs,
+    cancel_job,
+    start_workers,
+    supervise_workers,
+    JOB_WORKERS,
+    ACTIVE_STATES,
+    DONE,
+    FAILED,
+)
+
 logging.basicConfig(level=logging.INFO)
 
 VOICES = {
@@ -34,22 +28,58 @@ VOICES = {
     "en-IN-PrabhatNeural": "Prabhat (Male, Indian English)",
 }
 
+QUALITY_LABELS = {
+    "draft": "Draft (360p, quick content review)",
+    "standard": "Standard (720p)",
+    "final": "Final (1080p)",
+}
+
 def main():
     st.set_page_config(page_title="BSK Training Video Generator", page_icon="🎥", layout="wide")
 
     # Sidebar
     with st.sidebar:
         st.header("⚙️ Settings")
-        page = st.selectbox("Select Page:", ["🎬 Create New Video", "📂 View Existing Videos"])
+        page = st.selectbox("Select Page:", ["🎬 Create New Video", "📋 Job Queue", "📂 View Existing Videos"])
         selected_voice = st.selectbox("Select Narrator:", list(VOICES.keys()), format_func=lambda x: VOICES[x])
+        profiles = list(RENDER_PROFILES)
+        selected_profile = st.selectbox(
+            "Render Quality:", profiles, index=profiles.index(DEFAULT_PROFILE),
+            format_func=lambda x: QUALITY_LABELS.get(x, x),
+        )
         uploaded_pdf = st.file_uploader("Upload PDF (Optional)", type=["pdf"])
 
+    # Every rerun (the job pages poll) restarts crashed workers and
+    # requeues / fails the jobs they were running
+    supervise_workers(ensure_job_workers())
+    ensure_metrics_endpoint()
+
     if page == "🎬 Create New Video":
-        show_create_page(selected_voice, uploaded_pdf)
+        show_create_page(selected_voice, uploaded_pdf, selected_profile)
+    elif page == "📋 Job Queue":
+        show_jobs_page()
     else:
         show_existing_videos_page()
 
-def show_create_page(selected_voice, uploaded_pdf):
+@st.cache_resource
+def ensure_job_workers():
+    """Start the background job workers once per server process."""
+    # Workers don't import Streamlit: hand them the API keys via the environment
+    for key in ("UNSPLASH_ACCESS_KEY", "GOOGLE_API_KEY"):
+        try:
+            if key in st.secrets:
+                os.environ.setdefault(key, str(st.secrets[key]))
+        except FileNotFoundError:
+            break  # no secrets.toml; keys come from the environment
+    return start_workers(JOB_WORKERS)
+
+@st.cache_resource
+def ensure_metrics_endpoint():
+    """Optional Prometheus-style /metrics endpoint (set METRICS_PORT)."""
+    port = os.getenv("METRICS_PORT")
+    return start_metrics_server(int(port)) if port else None
+
+def show_create_page(selected_voice, uploaded_pdf, selected_profile):
     st.title("🎥 BSK Training Video Generator")
     
     with st.form("service_form"):
@@ -64,55 +94,103 @@ def show_create_page(selected_voice, uploaded_pdf):
         submitted = st.form_submit_button("🚀 Generate Video")
 
     if submitted:
-        try:
-            status = st.empty()
-            progress = st.progress(0)
-            
-            # Step 1: Get Content
-            if uploaded_pdf:
-                status.text("📄 Reading PDF...")
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    tmp.write(uploaded_pdf.read())
-                    pdf_path = tmp.name
-                pages = extract_raw_content(pdf_path)
-                raw_text = "\n".join(line for page in pages for line in page["lines"])
-            else:
-                status.text("📄 Preparing form data...")
-                raw_text = f"{service_name}\n{service_description}\n{how_to_apply}\n{eligibility}"
-
-            # Step 2: AI Slide Generation
-            status.text("🧠 AI Structuring Content...")
-            slides_data = generate_slides_from_raw(raw_text)
-            slides = slides_data["slides"]
-
-            # Step 3: Creation Loop
-            video_clips = []
-            audio_paths = []
+        spec = {
+            "service_name": service_name,
+            "voice": selected_voice,
+            "profile": selected_profile,
+            "service_description": service_description,
+            "how_to_apply": how_to_apply,
+            "eligibility": eligibility,
+        }
+        if uploaded_pdf:
+            # Persist the upload: the job runs in a worker process
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+                tmp.write(uploaded_pdf.read())
+                spec["pdf_path"] = tmp.name
+
+        job_id = submit_job(spec)
+        st.session_state.setdefault("job_ids", []).append(job_id)
+        st.success(f"Job {job_id} queued. Track it below or on the 📋 Job Queue page.")
+
+    # Jobs submitted from this browser session (latest first)
+    recent_jobs = [get_job(job_id) for job_id in st.session_state.get("job_ids", [])[-3:]]
+    recent_jobs = [job for job in reversed(recent_jobs) if job]
+    for job in recent_jobs:
+        show_job(job)
 
+    # Poll while anything is still queued / running
+    if any(job["status"] in ACTIVE_STATES for job in recent_jobs):
+        time.sleep(2)
+        st.rerun()
+
+def show_job(job):
+    """Status card for one job."""
+    name = job["spec"].get("service_name") or "Untitled"
+    profile = job["spec"].get("profile") or DEFAULT_PROFILE
+    with st.container(border=True):
+        st.markdown(f"**{name}** · `{job['id']}` · {profile} · {job['status']}")
+        st.progress(job["progress"], text=job["message"])
+
+        if job["status"] == DONE and job["result"]:
+            st.video(job["result"])
+            show_deck_editor(job)
+        elif job["status"] == FAILED:
+            st.error(f"Generation Error: {job['message']}")
+
+        if job["status"] not in ACTIVE_STATES:
+            stages = summarize_trace(trace_path(job["id"]))
+            if stages:
+                with st.expander("⏱️ Stage timings"):
+                    st.dataframe(stages, hide_index=True)
+        else:
+            if st.button("🛑 Cancel", key=f"cancel_{job['id']}"):
+                cancel_job(job["id"])
+                st.rerun()
+
+def show_deck_editor(job):
+    """Edit a finished video's slides; only changed slides are re-rendered."""
+    slides = load_deck(job["result"])
+    if not slides:
+        return
+
+    with st.expander("✏️ Edit slides & re-render"):
+        with st.form(f"edit_{job['id']}"):
+            edited = []
             for i, slide in enumerate(slides):
-                status.text(f"🎬 Processing Slide {i+1}/{len(slides)}")
-                narration = " ".join(slide["bullets"])
-                
-                # TTS & Image
-                audio = asyncio.run(text_to_speech(narration, voice=selected_voice))
-                audio_paths.append(audio)
-                image = fetch_and_save_photo(slide["image_keyword"])
-                
-                # Video Clip Creation
-                clip = create_slide(image, slide["title"], narration, audio)
-                clip = add_avatar_to_slide(clip, clip.duration)
-                video_clips.append(clip)
-                progress.progress((i + 1) / len(slides))
-
-            # Step 4: Final Export
-            status.text("🎞️ Rendering MP4...")
-            final_video = combine_slides_and_audio(video_clips, audio_paths, service_name)
-            
-            st.success("Video Ready!")
-            st.video(final_video)
-            
-        except Exception as e:
-            st.error(f"Generation Error: {e}")
+                st.markdown(f"**Slide {i+1}**")
+                title = st.text_input("Title", slide["title"], key=f"title_{job['id']}_{i}")
+                bullets = st.text_area(
+                    "Bullets (one per line)", "\n".join(slide["bullets"]), key=f"bullets_{job['id']}_{i}"
+                )
+                keyword = st.text_input(
+                    "Image keyword", slide.get("image_keyword", ""), key=f"keyword_{job['id']}_{i}"
+                )
+                edited.append({
+                    "title": title.strip(),
+                    "bullets": [line.strip() for line in bullets.splitlines() if line.strip()],
+                    "image_keyword": keyword.strip(),
+                })
+
+            if st.form_submit_button("🔁 Re-render"):
+                job_id = submit_job({**job["spec"], "slides": edited})
+                st.session_state.setdefault("job_ids", []).append(job_id)
+                st.success(f"Job {job_id} queued.")
+
+def show_jobs_page():
+    st.title("📋 Job Queue")
+    jobs = list_jobs()
+    if not jobs:
+        st.info("No jobs submitted yet.")
+        return
+
+    active = [job for job in jobs if job["status"] in ACTIVE_STATES]
+    st.caption(f"{len(active)} active · {JOB_WORKERS} workers")
+    for job in jobs:
+        show_job(job)
+
+    if active:
+        time.sleep(2)
+        st.rerun()
 
 def show_existing_videos_page():
     st.title("📂 Library")
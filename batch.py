@@ -0,0 +1,270 @@
+"""
+Batch runner: generate many service videos headlessly
+PDF DIRECTORY | CSV | JSONL → PIPELINE (parallel) → MP4s + SUMMARY REPORT
+
+- No Streamlit import (fast startup, runs on render boxes / cron)
+- Resumable: finished items are recorded in a state file and skipped
+- Records use the same fields as utils/service_utils.create_service_sections
+
+Usage:
+    python batch.py services.jsonl --jobs 4
+    python batch.py ./circulars/ --voice en-IN-PrabhatNeural --report report.json
+"""
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.render_profiles import DEFAULT_PROFILE, RENDER_PROFILES
+from utils.service_utils import create_service_sections
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+DEFAULT_VOICE = "en-IN-NeerjaNeural"
+DEFAULT_STATE_FILE = "batch_state.jsonl"
+DEFAULT_REPORT_FILE = "batch_report.json"
+
+# Fields read from CSV / JSONL records (missing ones default to "")
+SERVICE_FIELDS = [
+    "service_name",
+    "service_description",
+    "how_to_apply",
+    "eligibility_criteria",
+    "required_docs",
+    "operator_tips",
+    "troubleshooting",
+    "fees_and_timeline",
+    "service_link",
+]
+
+
+# -------------------------------------------------
+# INPUT → PIPELINE SPECS
+# -------------------------------------------------
+def record_to_spec(record, voice, profile=None):
+    """
+    Service record dict → pipeline spec, with the raw text built from
+    the same training sections the form-based flow uses.
+    """
+    content = {field: str(record.get(field) or "").strip() for field in SERVICE_FIELDS}
+    sections = create_service_sections(content)
+    raw_text = "\n".join(f"{title}\n{text}" for title, text, _ in sections)
+    return {"service_name": content["service_name"], "voice": voice, "profile": profile, "raw_text": raw_text}
+
+
+def load_specs(source, voice, profile=None):
+    """
+    Build specs from a directory of PDFs, a .csv or a .jsonl file.
+    Raises ValueError if two items share a service name (they would
+    write the same video and share one resume entry).
+    """
+    specs = _read_specs(source, voice, profile)
+    seen, duplicates = set(), []
+    for spec in specs:
+        if item_key(spec) in seen and spec["service_name"] not in duplicates:
+            duplicates.append(spec["service_name"])
+        seen.add(item_key(spec))
+    if duplicates:
+        raise ValueError(f"Duplicate service_name in {source}: {', '.join(duplicates)}")
+    return specs
+
+
+def _read_specs(source, voice, profile):
+    if os.path.isdir(source):
+        return [
+            {
+                "service_name": os.path.splitext(name)[0].replace("_", " "),
+                "voice": voice,
+                "profile": profile,
+                "pdf_path": os.path.join(source, name),
+            }
+            for name in sorted(os.listdir(source))
+            if name.lower().endswith(".pdf")
+        ]
+
+    with open(source, "r", encoding="utf-8") as f:
+        if source.lower().endswith(".csv"):
+            records = list(csv.DictReader(f))
+        elif source.lower().endswith((".jsonl", ".ndjson")):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            raise ValueError(f"Unsupported input (expected PDF dir, .csv or .jsonl): {source}")
+
+    specs = []
+    for i, record in enumerate(records, start=1):
+        if not str(record.get("service_name") or "").strip():
+            logger.warning(f"Skipping record {i}: service_name is required")
+            continue
+        specs.append(record_to_spec(record, voice, profile))
+    return specs
+
+
+# -------------------------------------------------
+# RESUME STATE
+# -------------------------------------------------
+def item_key(entry):
+    """Resume key: the same service in another render profile is a new item."""
+    return entry["service_name"], entry.get("profile") or DEFAULT_PROFILE
+
+
+def load_finished(state_path):
+    """
+    (service_name, profile) → output path for items that finished in
+    earlier runs and whose MP4 is still on disk.
+    """
+    finished = {}
+    if not os.path.exists(state_path):
+        return finished
+
+    with open(state_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line after a crash
+            if entry.get("status") == "done" and os.path.exists(entry.get("output") or ""):
+                finished[item_key(entry)] = entry["output"]
+    return finished
+
+
+def append_state(state_path, entry):
+    with open(state_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# -------------------------------------------------
+# WORKER
+# -------------------------------------------------
+def run_item(spec):
+    """Worker entry point: run the pipeline for one spec, never raise."""
+    started = time.time()
+    job_id = f"batch_{uuid.uuid4().hex[:12]}"
+    try:
+        from pipeline import run_pipeline  # heavy imports only in workers
+
+        output = run_pipeline({**spec, "job_id": job_id})
+        status, error = "done", None
+    except Exception as e:
+        output, status, error = None, "failed", f"{type(e).__name__}: {e}"
+
+    return {
+        "service_name": spec["service_name"],
+        "profile": spec.get("profile") or DEFAULT_PROFILE,
+        "job_id": job_id,  # trace: logs/traces/<job_id>.jsonl
+        "status": status,
+        "output": output,
+        "error": error,
+        "seconds": round(time.time() - started, 1),
+    }
+
+
+# -------------------------------------------------
+# BATCH
+# -------------------------------------------------
+def run_batch(specs, jobs=1, state_path=DEFAULT_STATE_FILE, force=False):
+    """
+    Run specs with `jobs` pipelines in parallel; returns per-item results
+    (including items skipped because they finished in an earlier run).
+    """
+    finished = {} if force else load_finished(state_path)
+    results = [
+        {"service_name": spec["service_name"], "profile": item_key(spec)[1], "status": "skipped",
+         "output": finished[item_key(spec)], "error": None, "seconds": 0}
+        for spec in specs if item_key(spec) in finished
+    ]
+    pending = [spec for spec in specs if item_key(spec) not in finished]
+    logger.info(f"{len(specs)} items: {len(results)} already done, {len(pending)} to render")
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, jobs), mp_context=ctx) as pool:
+        futures = [pool.submit(run_item, spec) for spec in pending]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            append_state(state_path, result)
+            results.append(result)
+
+            icon = "✅" if result["status"] == "done" else "❌"
+            logger.info(
+                f"[{done}/{len(pending)}] {icon} {result['service_name']} "
+                f"({result['seconds']}s){' - ' + result['error'] if result['error'] else ''}"
+            )
+
+    return results
+
+
+def write_report(results, report_path, wall_seconds):
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    report = {
+        "total": len(results),
+        "counts": counts,
+        "wall_seconds": round(wall_seconds, 1),
+        "items": results,
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate BSK training videos in bulk")
+    parser.add_argument("source", help="directory of PDFs, or a .csv / .jsonl of service records")
+    parser.add_argument("--voice", default=DEFAULT_VOICE)
+    parser.add_argument("--profile", choices=list(RENDER_PROFILES), default=None,
+                        help="render profile (default: RENDER_PROFILE or final)")
+    parser.add_argument("--jobs", type=int, default=1, help="videos rendered in parallel")
+    parser.add_argument("--render-workers", type=int, default=None,
+                        help="segment render processes per video (RENDER_WORKERS)")
+    parser.add_argument("--narration", choices=["slide", "deck"], default=None,
+                        help="one TTS request per slide, or one for the whole deck (NARRATION_MODE)")
+    parser.add_argument("--preview", action="store_true",
+                        help="also write a 360p <video>_preview.mp4 (RENDER_PREVIEW)")
+    parser.add_argument("--state", default=DEFAULT_STATE_FILE, help="resume state file")
+    parser.add_argument("--report", default=DEFAULT_REPORT_FILE, help="summary report (JSON)")
+    parser.add_argument("--force", action="store_true", help="re-render items that already finished")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    # Read by the spawned workers when they import utils.video_utils / audio_utils
+    if args.render_workers:
+        os.environ["RENDER_WORKERS"] = str(args.render_workers)
+    elif "RENDER_WORKERS" not in os.environ:
+        # Each of the --jobs pipelines gets its own render pool: split the cores
+        os.environ["RENDER_WORKERS"] = str(max(1, (os.cpu_count() or 1) // max(1, args.jobs)))
+    if args.narration:
+        os.environ["NARRATION_MODE"] = args.narration
+    if args.preview:
+        os.environ["RENDER_PREVIEW"] = "1"
+
+    from utils.storage_utils import get_storage
+
+    get_storage()  # a bad STORAGE_URL / missing boto3 fails before any render
+
+    started = time.time()
+    specs = load_specs(args.source, args.voice, args.profile)
+    results = run_batch(specs, jobs=args.jobs, state_path=args.state, force=args.force)
+    report = write_report(results, args.report, time.time() - started)
+
+    logger.info(f"Summary: {report['counts']} in {report['wall_seconds']}s -> {args.report}")
+    return 0 if not report["counts"].get("failed") else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
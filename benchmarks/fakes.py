@@ -0,0 +1,229 @@
+"""
+Local stand-ins for the live services used by the pipeline
+
+Goals:
+- Deterministic slide decks instead of Gemini
+- Generated tone / silent MP3s instead of edge-tts
+- Local JPEGs instead of the Unsplash API + CDN
+- Configurable latency so the asset stage still sees "network" waits
+
+Usage:
+    with install_fakes(work_dir, latency=0.2, n_slides=20):
+        ...  # generate_slides_from_raw / text_to_speech / fetch_and_save_photo
+"""
+
+import asyncio
+import io
+import os
+import random
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+from PIL import Image, ImageDraw
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+FAKE_IMAGE_SIZE = (1080, 720)  # Unsplash "regular" width
+AUDIO_SAMPLE_RATE = 24000      # edge-tts output: 24 kHz mono 48 kbps MP3
+AUDIO_BITRATE = "48k"
+TONE_HZ = 220
+
+KEYWORDS = [
+    "government office", "documents", "computer operator", "village",
+    "certificate", "queue", "bank", "farmer", "student", "health card",
+    "form filling", "help desk",
+]
+
+WORDS = (
+    "citizen service application portal document verify upload submit "
+    "eligibility certificate operator counter receipt fee timeline status "
+    "aadhaar address proof income caste residence signature photo scan "
+    "approve reject track download print guide check form field required"
+).split()
+
+
+# -------------------------------------------------
+# SLIDE DECKS (GEMINI STAND-IN)
+# -------------------------------------------------
+def make_deck(n_slides, seed=0, bullets_per_slide=3, words_per_bullet=8):
+    """
+    Deterministic deck in the generate_slides_from_raw output format.
+    The defaults narrate ~11 s per slide (estimate_audio_duration).
+    """
+    rng = random.Random(seed)
+    slides = []
+    for i in range(n_slides):
+        bullets = [
+            " ".join(rng.choice(WORDS) for _ in range(words_per_bullet)).capitalize() + "."
+            for _ in range(bullets_per_slide)
+        ]
+        slides.append({
+            "title": f"Step {i + 1}: {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}",
+            "bullets": bullets,
+            "image_keyword": KEYWORDS[i % len(KEYWORDS)],
+        })
+    return {"slides": slides}
+
+
+def fake_generate_slides(n_slides, latency=0.0):
+    """generate_slides_from_raw replacement returning make_deck(n_slides)."""
+
+    def generate_slides_from_raw(raw_text):
+        time.sleep(latency)
+        return make_deck(n_slides, seed=len(raw_text))
+
+    return generate_slides_from_raw
+
+
+# -------------------------------------------------
+# NARRATION AUDIO (EDGE-TTS STAND-IN)
+# -------------------------------------------------
+def ffmpeg_binary():
+    from utils.capabilities import probe
+    return probe().ffmpeg
+
+
+def write_mp3(path, seconds, tone=True):
+    """Write a mono MP3 of `seconds` (sine tone, or silence)."""
+    source = (
+        f"sine=frequency={TONE_HZ}:sample_rate={AUDIO_SAMPLE_RATE}:duration={seconds:.2f}"
+        if tone
+        else f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl=mono:d={seconds:.2f}"
+    )
+    subprocess.run(
+        [
+            ffmpeg_binary(), "-y", "-loglevel", "error", "-f", "lavfi", "-i", source,
+            "-ac", "1", "-b:a", AUDIO_BITRATE, path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def fake_communicate(audio_dir, latency=0.0, tone=True):
+    """
+    edge_tts.Communicate replacement. Audio length follows the text length
+    (estimate_audio_duration); one file per distinct length is generated
+    and then copied.
+    """
+    from utils.audio_utils import estimate_audio_duration
+
+    os.makedirs(audio_dir, exist_ok=True)
+
+    class FakeCommunicate:
+        def __init__(self, text, voice=None, rate=None, pitch=None, boundary=None):
+            self.text = text
+            self.seconds = max(1.0, round(estimate_audio_duration(text), 1))
+
+        def _source(self):
+            source = os.path.join(audio_dir, f"{'tone' if tone else 'silence'}_{self.seconds:.1f}.mp3")
+            if not os.path.exists(source):
+                write_mp3(source, self.seconds, tone)
+            return source
+
+        async def save(self, output_path):
+            await asyncio.sleep(latency)
+            shutil.copyfile(self._source(), output_path)
+
+        async def stream(self):
+            """Audio, plus evenly spaced WordBoundary events (100 ns ticks)."""
+            await asyncio.sleep(latency)
+            words = [word.strip(".,;:!?") for word in self.text.split()]
+            words = [word for word in words if word]
+            slot = self.seconds * 10_000_000 / max(1, len(words))
+            for i, word in enumerate(words):
+                yield {"type": "WordBoundary", "offset": round(i * slot),
+                       "duration": round(0.8 * slot), "text": word}
+            with open(self._source(), "rb") as f:
+                yield {"type": "audio", "data": f.read()}
+
+    return FakeCommunicate
+
+
+# -------------------------------------------------
+# IMAGES (UNSPLASH STAND-IN)
+# -------------------------------------------------
+def make_image_bytes(query, size=FAKE_IMAGE_SIZE):
+    """Deterministic gradient JPEG for a search query."""
+    rng = random.Random(query)
+    start = [rng.randrange(256) for _ in range(3)]
+    end = [rng.randrange(256) for _ in range(3)]
+
+    image = Image.new("RGB", size)
+    draw = ImageDraw.Draw(image)
+    for y in range(size[1]):
+        t = y / (size[1] - 1)
+        draw.line([(0, y), (size[0], y)], fill=tuple(int(a + (b - a) * t) for a, b in zip(start, end)))
+    draw.text((40, 40), query, fill=(255, 255, 255))
+
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def fake_http(latency=0.0):
+    """
+    utils.http_utils replacements (sync and async) answering the
+    Unsplash search and image URLs.
+    """
+
+    def search(params):
+        query = (params or {}).get("query", "")
+        return {"results": [{"urls": {"regular": f"fake://{query}"}}]}
+
+    def save(url, path):
+        data = make_image_bytes(url.removeprefix("fake://"))
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    def get_json(url, limiter=None, params=None, **kwargs):
+        time.sleep(latency)
+        return search(params)
+
+    def download(url, path, **kwargs):
+        time.sleep(latency)
+        return save(url, path)
+
+    async def get_json_async(session, url, limiter=None, params=None, **kwargs):
+        await asyncio.sleep(latency)
+        return search(params)
+
+    async def download_async(session, url, path, **kwargs):
+        await asyncio.sleep(latency)
+        return save(url, path)
+
+    return SimpleNamespace(
+        get_json=get_json, download=download, get_json_async=get_json_async, download_async=download_async
+    )
+
+
+# -------------------------------------------------
+# INSTALL
+# -------------------------------------------------
+@contextmanager
+def install_fakes(work_dir, latency=0.0, n_slides=5, tone=True):
+    """
+    Patch Gemini, edge-tts and Unsplash for the duration of the block.
+    (Point IMAGES_DIR at a scratch directory to keep images_cache/ clean.)
+    """
+    import services.gemini_service as gemini_service
+    import services.unsplash_service as unsplash_service
+    import utils.audio_utils as audio_utils
+    import utils.http_utils as http_utils
+
+    generate = fake_generate_slides(n_slides, latency)
+    http = fake_http(latency)
+
+    with mock.patch.object(gemini_service, "generate_slides_from_raw", generate), \
+         mock.patch.object(audio_utils.edge_tts, "Communicate",
+                           fake_communicate(os.path.join(work_dir, "audio"), latency, tone)), \
+         mock.patch.multiple(http_utils, get_json=http.get_json, download=http.download,
+                             get_json_async=http.get_json_async, download_async=http.download_async), \
+         mock.patch.object(unsplash_service, "UNSPLASH_ACCESS_KEY", "benchmark"):
+        yield
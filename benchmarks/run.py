@@ -0,0 +1,484 @@
+"""
+Offline benchmark suite for the video generation pipeline
+SYNTHETIC DECK → PDF / ASSETS / SLIDES / AVATAR / RENDER → TIMINGS vs BASELINE
+
+- No network: Gemini, edge-tts and Unsplash are replaced by benchmarks.fakes
+- Caches, traces and images go to a throwaway directory (real caches untouched)
+- Reports wall time, throughput and peak RSS per stage and deck size
+- Compares against a stored baseline (benchmarks/baseline.json)
+
+Usage:
+    python -m benchmarks.run                        # 5, 20 and 100-slide decks
+    python -m benchmarks.run --decks 5 20 --latency 0.2
+    python -m benchmarks.run --only create_slide add_avatar_to_slide
+    python -m benchmarks.run --decks 20 --profile draft
+    python -m benchmarks.run --decks 5 20 --save-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.fakes import install_fakes, make_deck
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_RESULTS = os.path.join(REPO_ROOT, "benchmarks", "last_run.json")
+DEFAULT_DECKS = [5, 20, 100]
+
+AVATAR_SAMPLE_FRAMES = 48  # frames rendered per slide by the avatar benchmark
+OCR_PAGE_EVERY = 5         # every Nth PDF page is a scanned image (OCR path)
+REGRESSION_TOLERANCE = 0.2  # slower than baseline by more than 20% -> regression
+# Run settings that make timings incomparable when they differ from the
+# baseline's (the profile is part of each row's key instead)
+COMPARABLE_META = ("cpu_count", "python", "latency", "deck_shape", "repeat")
+
+MB = 1024 * 1024
+
+
+# -------------------------------------------------
+# MEASUREMENT
+# -------------------------------------------------
+def current_rss_mb():
+    """Resident set size of this process (Linux), or None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / MB
+
+
+class PeakRss:
+    """
+    Samples this process's RSS on a background thread while active.
+    (Render / OCR worker processes and ffmpeg are not included.)
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None:
+                self.peak_mb = max(self.peak_mb, rss)
+
+    def __enter__(self):
+        if self.start_mb is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+class Timer:
+    """Accumulates wall time over one or more `with timer:` blocks."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._start
+
+
+# -------------------------------------------------
+# SYNTHETIC INPUTS
+# -------------------------------------------------
+def make_pdf(slides, path):
+    """
+    One page per slide. Every OCR_PAGE_EVERY-th page is a full-page image
+    of its text (no text layer), so extract_raw_content takes the OCR path.
+    """
+    import fitz
+    from PIL import Image, ImageDraw
+    from utils.text_utils import load_font
+
+    doc = fitz.open()
+    for i, slide in enumerate(slides):
+        page = doc.new_page()
+        text = "\n".join([slide["title"], *slide["bullets"]])
+
+        if (i + 1) % OCR_PAGE_EVERY == 0:
+            scan = Image.new("RGB", (1240, 1754), "white")
+            draw = ImageDraw.Draw(scan)
+            font = load_font(fontsize=30)
+            for n, line in enumerate(text.split("\n")):
+                draw.text((80, 120 + n * 60), line[:70], fill="black", font=font)
+            page.insert_image(page.rect, stream=_png_bytes(scan))
+        else:
+            page.insert_textbox(fitz.Rect(50, 50, 545, 790), text, fontsize=11)
+
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def _png_bytes(image):
+    import io
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class Deck:
+    """Synthetic deck plus its PDF and (fake) narration / image assets."""
+
+    def __init__(self, n_slides, work_dir, bullets=3, words=8, profile=None):
+        from utils.asset_utils import prepare_slide_assets, slide_narration
+        from utils.render_profiles import get_profile
+        from utils.video_utils import deck_timeline
+
+        self.n_slides = n_slides
+        self.profile = get_profile(profile)
+        self.work_dir = work_dir
+        self.slides = make_deck(n_slides, bullets_per_slide=bullets, words_per_bullet=words)["slides"]
+        self.pdf_path = make_pdf(self.slides, os.path.join(work_dir, f"deck_{n_slides}.pdf"))
+        self.assets = asyncio.run(prepare_slide_assets(self.slides))
+        self.specs = [
+            {"image_path": image, "title": slide["title"],
+             "content": slide_narration(slide), "audio_path": audio}
+            for slide, (audio, image) in zip(self.slides, self.assets)
+        ]
+
+        # Same overlap as concatenate_videoclips(padding=-FADE_DURATION)
+        self.video_seconds = deck_timeline(self.specs).total
+
+    def build_slides(self, with_avatar=True):
+        from utils.avatar_utils import add_avatar_to_slide
+        from utils.video_utils import create_slide
+
+        clips = []
+        for spec in self.specs:
+            clip = create_slide(
+                spec["image_path"], spec["title"], spec["content"], spec["audio_path"], self.profile
+            )
+            clips.append(add_avatar_to_slide(clip, clip.duration, self.profile) if with_avatar else clip)
+        return clips
+
+
+def close_all(clips):
+    for clip in clips:
+        clip.close()
+
+
+# -------------------------------------------------
+# BENCHMARKS
+# -------------------------------------------------
+# Each benchmark times only its `with timer:` blocks and returns
+# (items processed, unit) for the throughput figure.
+
+def bench_extract_raw_content(deck, timer):
+    from utils.pdf_extractor import PAGE_CACHE, extract_raw_content
+
+    shutil.rmtree(PAGE_CACHE.directory, ignore_errors=True)  # cold cache
+    os.makedirs(PAGE_CACHE.directory, exist_ok=True)
+    with timer:
+        pages = extract_raw_content(deck.pdf_path)
+    return len(pages), "pages"
+
+
+def bench_prepare_slide_assets(deck, timer):
+    from utils.asset_utils import prepare_slide_assets
+    from utils.audio_utils import TTS_CACHE
+    from utils.image_cache import IMAGE_CACHE
+
+    for directory in (TTS_CACHE.directory, IMAGE_CACHE.directory):
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+    with timer:
+        asyncio.run(prepare_slide_assets(deck.slides))
+    return 2 * deck.n_slides, "requests"
+
+
+def bench_create_slide(deck, timer):
+    from utils.video_utils import create_slide
+
+    clips = []
+    with timer:
+        for spec in deck.specs:
+            clips.append(create_slide(
+                spec["image_path"], spec["title"], spec["content"], spec["audio_path"], deck.profile
+            ))
+    close_all(clips)
+    return deck.n_slides, "slides"
+
+
+def bench_add_avatar_to_slide(deck, timer):
+    """Wrap each slide and render its first AVATAR_SAMPLE_FRAMES frames."""
+    from utils.avatar_utils import add_avatar_to_slide
+
+    fps = deck.profile.fps
+    frames = 0
+    for clip in deck.build_slides(with_avatar=False):
+        with timer:
+            wrapped = add_avatar_to_slide(clip, clip.duration, deck.profile)
+            for n in range(min(AVATAR_SAMPLE_FRAMES, int(clip.duration * fps))):
+                wrapped.get_frame(n / fps)
+                frames += 1
+        clip.close()
+    return frames, "frames"
+
+
+def bench_combine_slides_and_audio(deck, timer):
+    from utils.video_utils import combine_slides_and_audio
+
+    clips = deck.build_slides()
+    with timer:
+        output = combine_slides_and_audio(
+            clips, [audio for audio, _ in deck.assets], f"Benchmark {deck.n_slides}", deck.profile
+        )
+    close_all(clips)
+    os.remove(output)
+    return round(deck.video_seconds, 2), "video_s"
+
+
+def bench_render_slides_parallel(deck, timer):
+    from utils.video_utils import SEGMENT_CACHE, render_slides_parallel
+
+    shutil.rmtree(SEGMENT_CACHE.directory, ignore_errors=True)  # cold cache
+    os.makedirs(SEGMENT_CACHE.directory, exist_ok=True)
+    with timer:
+        output = render_slides_parallel(deck.specs, f"Benchmark {deck.n_slides}", profile=deck.profile)
+    os.remove(output)
+    return round(deck.video_seconds, 2), "video_s"
+
+
+def bench_render_slides_incremental(deck, timer):
+    """Re-render after editing the title of the middle slide."""
+    from utils.video_utils import SEGMENT_CACHE, render_slides_parallel
+
+    shutil.rmtree(SEGMENT_CACHE.directory, ignore_errors=True)
+    os.makedirs(SEGMENT_CACHE.directory, exist_ok=True)
+    name = f"Benchmark {deck.n_slides}"
+    os.remove(render_slides_parallel(deck.specs, name, profile=deck.profile))
+
+    specs = [dict(spec) for spec in deck.specs]
+    specs[len(specs) // 2]["title"] += " (edited)"
+    with timer:
+        output = render_slides_parallel(specs, name, profile=deck.profile)
+    os.remove(output)
+    return round(deck.video_seconds, 2), "video_s"
+
+
+def bench_render_slides_streaming(deck, timer):
+    from utils.video_utils import render_slides_streaming
+
+    with timer:
+        output = render_slides_streaming(deck.specs, f"Benchmark {deck.n_slides}", profile=deck.profile)
+    os.remove(output)
+    return round(deck.video_seconds, 2), "video_s"
+
+
+def bench_render_deck_narration(deck, timer):
+    """render_slides_parallel with one narration track for the whole deck."""
+    from utils.asset_utils import prepare_deck_assets
+    from utils.video_utils import SEGMENT_CACHE, deck_timeline, render_slides_parallel
+
+    assets, narration = asyncio.run(prepare_deck_assets(deck.slides))
+    if narration is None:
+        raise RuntimeError("deck narration could not be split into slides")
+    specs = [dict(spec, image_path=image, audio_path=None) for spec, (_, image) in zip(deck.specs, assets)]
+
+    shutil.rmtree(SEGMENT_CACHE.directory, ignore_errors=True)  # cold cache
+    os.makedirs(SEGMENT_CACHE.directory, exist_ok=True)
+    with timer:
+        timeline = deck_timeline(specs, narration, deck.profile.fps)
+        output = render_slides_parallel(
+            specs, f"Benchmark {deck.n_slides}", profile=deck.profile, timeline=timeline
+        )
+    os.remove(output)
+    return round(timeline.total, 2), "video_s"
+
+
+BENCHMARKS = {
+    "extract_raw_content": bench_extract_raw_content,
+    "prepare_slide_assets": bench_prepare_slide_assets,
+    "create_slide": bench_create_slide,
+    "add_avatar_to_slide": bench_add_avatar_to_slide,
+    "combine_slides_and_audio": bench_combine_slides_and_audio,
+    "render_slides_parallel": bench_render_slides_parallel,
+    "render_slides_incremental": bench_render_slides_incremental,
+    "render_slides_streaming": bench_render_slides_streaming,
+    "render_deck_narration": bench_render_deck_narration,
+}
+
+
+def run_benchmark(fn, deck, repeat=1):
+    """Best-of-`repeat` wall time; peak RSS over all repeats."""
+    best, peak, items, unit = None, None, 0, ""
+    for _ in range(max(1, repeat)):
+        timer = Timer()
+        with PeakRss() as rss:
+            items, unit = fn(deck, timer)
+        best = timer.seconds if best is None else min(best, timer.seconds)
+        if rss.peak_mb is not None:
+            peak = max(peak or 0, rss.peak_mb)
+
+    return {
+        "seconds": round(best, 3),
+        "items": items,
+        "unit": unit,
+        "throughput": round(items / best, 2) if best else None,  # <unit> per second
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+
+
+# -------------------------------------------------
+# BASELINE COMPARISON
+# -------------------------------------------------
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Rows of (deck, benchmark, seconds, baseline seconds, ratio, verdict)
+    for every benchmark present in both runs.
+    """
+    rows = []
+    for deck, benches in results.items():
+        for name, result in benches.items():
+            base = baseline.get(deck, {}).get(name)
+            if not base or not base.get("seconds"):
+                rows.append((deck, name, result["seconds"], None, None, "new"))
+                continue
+            ratio = result["seconds"] / base["seconds"]
+            verdict = (
+                "REGRESSION" if ratio > 1 + tolerance
+                else "improved" if ratio < 1 - tolerance
+                else "ok"
+            )
+            rows.append((deck, name, result["seconds"], base["seconds"], round(ratio, 2), verdict))
+    return rows
+
+
+def meta_mismatches(meta, baseline_meta):
+    """(setting, this run, baseline) for every COMPARABLE_META that differs."""
+    return [
+        (key, meta.get(key), baseline_meta.get(key))
+        for key in COMPARABLE_META
+        if meta.get(key) != baseline_meta.get(key)
+    ]
+
+
+def print_report(results, rows):
+    print(f"\n{'slides':>11}  {'benchmark':<26} {'seconds':>9} {'throughput':>18} {'peak RSS':>9}  "
+          f"{'baseline':>9} {'ratio':>6}  verdict")
+    verdicts = {(deck, name): (base, ratio, verdict) for deck, name, _, base, ratio, verdict in rows}
+    for deck, benches in results.items():
+        for name, r in benches.items():
+            base, ratio, verdict = verdicts.get((deck, name), (None, None, ""))
+            throughput = f"{r['throughput']} {r['unit']}/s" if r["throughput"] is not None else "-"
+            rss = f"{r['peak_rss_mb']:.0f} MB" if r["peak_rss_mb"] is not None else "-"
+            print(f"{deck:>11}  {name:<26} {r['seconds']:>9.3f} {throughput:>18} {rss:>9}  "
+                  f"{base if base is not None else '-':>9} {ratio if ratio is not None else '-':>6}  {verdict}")
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument("--decks", type=int, nargs="+", default=DEFAULT_DECKS, help="deck sizes (slides)")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated service latency (s)")
+    parser.add_argument("--silent", action="store_true", help="silent narration instead of a tone")
+    parser.add_argument("--bullets", type=int, default=3, help="bullets per slide")
+    parser.add_argument("--words", type=int, default=8, help="words per bullet (sets narration length)")
+    parser.add_argument("--repeat", type=int, default=1, help="best-of-N timing")
+    parser.add_argument("--profile", default="final", help="render profile (draft / standard / final)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--output", default=DEFAULT_RESULTS, help="results JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument("--check", action="store_true", help="exit 1 on any regression")
+    args = parser.parse_args(argv)
+
+    # Read at import time by the pipeline modules (and inherited by their
+    # worker processes): keep benchmark caches and traces out of the real ones
+    work_dir = tempfile.mkdtemp(prefix="bsk_bench_")
+    os.environ["CACHE_DIR"] = os.path.join(work_dir, "cache")
+    os.environ["IMAGES_DIR"] = os.path.join(work_dir, "images")
+    os.environ["TRACE_DIR"] = os.path.join(work_dir, "traces")
+    os.chdir(REPO_ROOT)  # avatar / font assets are repo-relative
+
+    names = args.only or list(BENCHMARKS)
+    results = {}
+    try:
+        for n_slides in args.decks:
+            with install_fakes(work_dir, latency=args.latency, n_slides=n_slides, tone=not args.silent):
+                print(f"Preparing {n_slides}-slide deck...", file=sys.stderr)
+                deck = Deck(n_slides, work_dir, args.bullets, args.words, args.profile)
+                # Non-final profiles get their own baseline rows ("20-draft")
+                key = str(n_slides) if args.profile == "final" else f"{n_slides}-{args.profile}"
+                results[key] = {}
+                for name in names:
+                    print(f"  {name}...", file=sys.stderr)
+                    results[key][name] = run_benchmark(BENCHMARKS[name], deck, args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    run = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "latency": args.latency,
+            "deck_shape": {"bullets": args.bullets, "words": args.words},
+            "repeat": args.repeat,
+            "profile": args.profile,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+
+    baseline, baseline_meta = {}, None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        baseline, baseline_meta = stored.get("results", {}), stored.get("meta", {})
+
+    rows = compare(results, baseline, args.tolerance)
+    print_report(results, rows)
+
+    mismatches = meta_mismatches(run["meta"], baseline_meta) if baseline_meta is not None else []
+    if mismatches:
+        print("\nWARNING: the baseline was recorded with different settings; ratios are not comparable:",
+              file=sys.stderr)
+        for key, value, base in mismatches:
+            print(f"  {key}: {value!r} (baseline {base!r})", file=sys.stderr)
+
+    if args.save_baseline:
+        # Merge so a partial run (--decks / --only) keeps the other entries
+        merged = {deck: dict(benches) for deck, benches in baseline.items()}
+        for deck, benches in results.items():
+            merged.setdefault(deck, {}).update(benches)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**run, "results": merged}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    regressions = [row for row in rows if row[-1] == "REGRESSION"]
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
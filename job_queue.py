@@ -0,0 +1,413 @@
+"""
+Background job queue for video generation
+SUBMIT (UI / CLI) → SQLITE QUEUE → WORKER PROCESSES → MP4
+
+- Jobs survive browser refreshes and app restarts (SQLite on disk)
+- Each worker process runs one job at a time; the number of worker
+  processes is the concurrency limit
+- Progress and cancellation go through the same table
+- Supervised: dead worker processes are restarted, and jobs whose worker
+  died (crash, OOM kill) or stopped sending heartbeats are re-queued, or
+  failed after MAX_JOB_ATTEMPTS
+
+Run workers standalone:
+    python job_queue.py worker --concurrency 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+JOBS_DB = os.getenv("JOBS_DB", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+POLL_INTERVAL = 1.0  # seconds between queue polls when idle
+HEARTBEAT_INTERVAL = 10.0  # running jobs touch heartbeat_at this often
+HEARTBEAT_TIMEOUT = float(os.getenv("JOB_HEARTBEAT_TIMEOUT", "120"))
+MAX_JOB_ATTEMPTS = int(os.getenv("MAX_JOB_ATTEMPTS", "2"))  # a job that kills its worker
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id               TEXT PRIMARY KEY,
+    status           TEXT NOT NULL,
+    spec             TEXT NOT NULL,
+    progress         REAL NOT NULL DEFAULT 0,
+    message          TEXT NOT NULL DEFAULT '',
+    result           TEXT,
+    error            TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_pid       INTEGER,
+    worker_host      TEXT,
+    worker_started   INTEGER,
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    heartbeat_at     REAL,
+    created_at       REAL NOT NULL,
+    started_at       REAL,
+    finished_at      REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+"""
+
+# Columns added after the first release (ALTER TABLE for existing databases)
+MIGRATIONS = {
+    "attempts": "ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+    "heartbeat_at": "ALTER TABLE jobs ADD COLUMN heartbeat_at REAL",
+    "worker_host": "ALTER TABLE jobs ADD COLUMN worker_host TEXT",
+    "worker_started": "ALTER TABLE jobs ADD COLUMN worker_started INTEGER",
+}
+
+# Identifies this machine's workers: PIDs are only checked on their own host
+HOSTNAME = socket.gethostname()
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the running job was cancelled."""
+
+
+# -------------------------------------------------
+# DATABASE
+# -------------------------------------------------
+def connect(db_path=JOBS_DB):
+    """
+    Autocommit connection (explicit BEGIN IMMEDIATE where atomicity matters).
+    WAL lets the UI read while workers write.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column, statement in MIGRATIONS.items():
+        if column not in columns:
+            try:
+                conn.execute(statement)
+            except sqlite3.OperationalError:
+                pass  # added by another process meanwhile
+    return conn
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["spec"] = json.loads(job["spec"])
+    return job
+
+
+# -------------------------------------------------
+# SUBMIT / QUERY / CANCEL (UI SIDE)
+# -------------------------------------------------
+def submit_job(spec, db_path=JOBS_DB) -> str:
+    """Queue a pipeline spec (see pipeline.run_pipeline); returns the job id."""
+    job_id = uuid.uuid4().hex[:12]
+    with closing(connect(db_path)) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, status, spec, message, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(spec), "⏳ Waiting for a worker...", time.time()),
+        )
+    return job_id
+
+
+def get_job(job_id, db_path=JOBS_DB):
+    with closing(connect(db_path)) as conn:
+        return _row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def list_jobs(limit=50, db_path=JOBS_DB):
+    with closing(connect(db_path)) as conn:
+        rows = conn.execute(
+            "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [_row_to_job(row) for row in rows]
+
+
+def cancel_job(job_id, db_path=JOBS_DB):
+    """
+    Queued jobs are cancelled immediately; running jobs stop at their
+    next progress checkpoint.
+    """
+    with closing(connect(db_path)) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, message = ? WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), "🚫 Cancelled", job_id, QUEUED),
+        )
+        conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+            (job_id, RUNNING),
+        )
+
+
+# -------------------------------------------------
+# WORKER SIDE
+# -------------------------------------------------
+def claim_next_job(conn):
+    """
+    Atomically move the oldest queued job to 'running' for this process.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker_pid = ?, worker_host = ?, worker_started = ?, "
+            "started_at = ?, heartbeat_at = ?, attempts = attempts + 1, message = ? WHERE id = ?",
+            (RUNNING, os.getpid(), HOSTNAME, _process_start(os.getpid()), now, now,
+             "🚀 Starting...", row["id"]),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return _row_to_job(row)
+
+
+def _pid_alive(pid):
+    """Best-effort liveness check for a worker on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start(pid):
+    """
+    Start time of a process on this host (clock ticks since boot, Linux),
+    or None. Tells a worker apart from a later process reusing its PID.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # Field 22; the command name (field 2) may contain spaces
+            return int(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _worker_gone(row):
+    """Whether a local job's worker process no longer exists (PID reused included)."""
+    if not row["worker_pid"] or row["worker_host"] != HOSTNAME:
+        return False  # another host's worker: only its heartbeat tells
+    if not _pid_alive(row["worker_pid"]):
+        return True
+    started = row["worker_started"]
+    return started is not None and _process_start(row["worker_pid"]) not in (None, started)
+
+
+def requeue_stale_jobs(conn):
+    """
+    Put 'running' jobs whose worker process died (crash, OOM kill,
+    container restart) or stopped sending heartbeats back in the queue;
+    jobs that already used MAX_JOB_ATTEMPTS are failed instead, so a job
+    that keeps killing its worker does not loop forever, and jobs the
+    user cancelled meanwhile end as cancelled.
+
+    Worker PIDs are only checked for jobs claimed on this host; jobs of
+    other hosts are judged by their heartbeat alone.
+    """
+    rows = conn.execute(
+        "SELECT id, worker_pid, worker_host, worker_started, attempts, heartbeat_at, "
+        "cancel_requested FROM jobs WHERE status = ?", (RUNNING,)
+    ).fetchall()
+    now = time.time()
+    for row in rows:
+        dead = _worker_gone(row)
+        silent = row["heartbeat_at"] is not None and now - row["heartbeat_at"] > HEARTBEAT_TIMEOUT
+        if not (dead or silent):
+            continue
+
+        reason = f"worker {row['worker_pid']} " + ("is gone" if dead else "stopped responding")
+        if row["cancel_requested"]:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, message = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, "🚫 Cancelled", row["id"], RUNNING),
+            )
+            logger.info(f"Job {row['id']} cancelled ({reason})")
+        elif row["attempts"] >= MAX_JOB_ATTEMPTS:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?, message = ? "
+                "WHERE id = ? AND status = ?",
+                (FAILED, now, reason, f"❌ Failed: {reason}", row["id"], RUNNING),
+            )
+            logger.error(f"Failed job {row['id']} after {row['attempts']} attempts ({reason})")
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_pid = NULL, worker_host = NULL, worker_started = NULL, "
+                "progress = 0, message = ? "
+                "WHERE id = ? AND status = ?",
+                (QUEUED, "⏳ Re-queued after worker restart", row["id"], RUNNING),
+            )
+            logger.warning(f"Re-queued job {row['id']} ({reason})")
+
+
+def _heartbeat(db_path, job_id, stop):
+    """Touch the job's heartbeat_at until `stop` is set (own connection)."""
+    with closing(connect(db_path)) as conn:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+
+def run_job(conn, job, db_path=JOBS_DB):
+    """Run one claimed job, recording progress / result / failure."""
+    from pipeline import run_pipeline  # heavy imports only in workers
+
+    job_id = job["id"]
+    # Long stages (LLM, encode) report no progress: beat from a thread
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(db_path, job_id, stop), daemon=True).start()
+
+    def progress(fraction, message):
+        row = conn.execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row and row["cancel_requested"]:
+            raise JobCancelled(job_id)
+        conn.execute(
+            "UPDATE jobs SET progress = ?, message = ? WHERE id = ?",
+            (fraction, message, job_id),
+        )
+
+    try:
+        output_path = run_pipeline({**job["spec"], "job_id": job_id}, progress=progress)
+    except JobCancelled:
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, message = ? WHERE id = ?",
+            (CANCELLED, time.time(), "🚫 Cancelled", job_id),
+        )
+        logger.info(f"Job {job_id} cancelled")
+    except Exception as e:
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, message = ? WHERE id = ?",
+            (FAILED, time.time(), traceback.format_exc(), f"❌ {e}", job_id),
+        )
+        logger.error(f"Job {job_id} failed: {e}")
+    else:
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, progress = 1, result = ?, message = ? "
+            "WHERE id = ?",
+            (DONE, time.time(), output_path, "✅ Video Ready!", job_id),
+        )
+        logger.info(f"Job {job_id} done -> {output_path}")
+    finally:
+        stop.set()
+
+
+def worker_loop(db_path=JOBS_DB, parent_pid=None):
+    """
+    Claim and run jobs forever. Exits (between jobs) when `parent_pid`,
+    the process that launched this worker, goes away.
+    """
+    from utils.storage_utils import get_storage
+
+    get_storage()  # a bad STORAGE_URL / missing boto3 fails here, not in every job
+    conn = connect(db_path)
+    requeue_stale_jobs(conn)
+    logger.info(f"Job worker {os.getpid()} polling {db_path}")
+
+    last_check = time.time()
+    while parent_pid is None or os.getppid() == parent_pid:
+        job = claim_next_job(conn)
+        if job is None:
+            if time.time() - last_check > HEARTBEAT_INTERVAL:
+                requeue_stale_jobs(conn)  # jobs of workers on other hosts too
+                last_check = time.time()
+            time.sleep(POLL_INTERVAL)
+            continue
+        run_job(conn, job, db_path)
+
+
+def start_workers(concurrency=JOB_WORKERS, db_path=JOBS_DB):
+    """
+    Launch `concurrency` worker processes bound to the current process.
+
+    Workers are plain subprocesses (not multiprocessing children) so
+    they can still use process pools for rendering.
+    """
+    from utils.storage_utils import get_storage
+
+    get_storage()  # fail here rather than in workers restarted forever
+    return [_spawn_worker(db_path) for _ in range(max(1, concurrency))]
+
+
+def _spawn_worker(db_path):
+    command = [
+        sys.executable, os.path.abspath(__file__), "worker",
+        "--db", os.path.abspath(db_path), "--parent-pid", str(os.getpid()),
+    ]
+    return subprocess.Popen(command)
+
+
+_supervise_lock = threading.Lock()  # UI sessions poll concurrently
+
+
+def supervise_workers(processes, db_path=JOBS_DB):
+    """
+    Restart workers from start_workers that exited (in place, so a cached
+    list stays current) and requeue / fail the jobs they were running.
+    Cheap enough to call on every UI poll.
+    """
+    restarted = 0
+    with _supervise_lock:
+        for i, process in enumerate(processes):
+            if process.poll() is not None:
+                logger.warning(f"Job worker {process.pid} exited ({process.returncode}); restarting")
+                processes[i] = _spawn_worker(db_path)
+                restarted += 1
+    with closing(connect(db_path)) as conn:
+        requeue_stale_jobs(conn)
+    return restarted
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BSK video job workers")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="run job workers")
+    worker.add_argument("--concurrency", type=int, default=1)
+    worker.add_argument("--db", default=JOBS_DB)
+    worker.add_argument("--parent-pid", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.concurrency > 1:
+        processes = start_workers(args.concurrency, args.db)
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            supervise_workers(processes, args.db)
+    else:
+        worker_loop(args.db, args.parent_pid)
+
+
+if __name__ == "__main__":
+    main()
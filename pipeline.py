@@ -0,0 +1,340 @@
+"""
+Video generation pipeline (UI independent)
+JOB SPEC → RAW TEXT → SLIDES → ASSETS → MP4
+
+Used by the background job workers; contains no Streamlit code.
+
+- Async core (generate_video): narration and image I/O run on one event
+  loop; blocking / CPU-bound steps (PDF, LLM, rendering) run in threads,
+  and the renderers use their own process pools
+- Progress as an async iterator (generate_video_events) for async
+  callers, a callback for sync ones (run_pipeline)
+- Cheap to import: stage modules (PyMuPDF, Gemini, edge-tts, MoviePy)
+  load when their stage first runs
+"""
+
+import asyncio
+import logging
+import os
+
+from services.slide_cache import save_deck
+from utils.render_profiles import get_profile
+from utils.trace_utils import start_trace, stage
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------
+# INPUT
+# -------------------------------------------------
+def build_raw_text(spec) -> str:
+    """
+    Raw text for the LLM: ready-made raw text (batch records), the
+    uploaded PDF if there is one, otherwise the form fields.
+    """
+    if spec.get("raw_text"):
+        return spec["raw_text"]
+
+    if spec.get("pdf_path"):
+        from utils.pdf_extractor import extract_raw_content
+
+        with stage("pdf_extraction"):
+            pages = extract_raw_content(spec["pdf_path"])
+        return "\n".join(line for page in pages for line in page["lines"])
+
+    return "\n".join([
+        spec.get("service_name", ""),
+        spec.get("service_description", ""),
+        spec.get("how_to_apply", ""),
+        spec.get("eligibility", ""),
+    ])
+
+
+# -------------------------------------------------
+# PROGRESS
+# -------------------------------------------------
+class PipelineAborted(Exception):
+    """Raised inside the pipeline when its event consumer went away."""
+
+
+def _reporter(progress, loop):
+    """
+    Thread-safe progress function: `progress` always runs on the event
+    loop thread (callers' state, e.g. SQLite connections, stays on one
+    thread) and its exceptions reach the caller, so raising still aborts
+    the job from inside render threads.
+    """
+    if progress is None:
+        return lambda fraction, message: None
+
+    async def deliver(fraction, message):
+        progress(fraction, message)
+
+    def report(fraction, message):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            progress(fraction, message)
+        else:
+            asyncio.run_coroutine_threadsafe(deliver(fraction, message), loop).result()
+
+    return report
+
+
+# -------------------------------------------------
+# PIPELINE
+# -------------------------------------------------
+async def generate_video(spec, progress=None):
+    """
+    Generate one training video.
+
+    spec: {"service_name", "voice", "job_id"?, "profile"?, "narration"?, "captions"?,
+           "preview"?, "tenant"?, "slides"?, "raw_text"?, "pdf_path"?,
+           "service_description"?, "how_to_apply"?, "eligibility"?}
+    ("profile": draft / standard / final, see utils/render_profiles.py;
+     "narration": slide / deck, default NARRATION_MODE (utils/audio_utils.py);
+     "captions": soft / burn / off, default CAPTIONS (utils/caption_utils.py);
+     "preview": also write <video>_preview.mp4, default RENDER_PREVIEW;
+     "tenant": namespace of the outputs in the shared store, default STORAGE_TENANT;
+     "slides": an edited deck, skips the LLM - see services/slide_cache.load_deck)
+    progress: optional fn(fraction, message), called on the event loop
+    thread; may raise to abort the job
+    Output: path to the rendered MP4
+
+    Stage timings go to logs/traces/<job_id>.jsonl (see utils/trace_utils).
+    With STORAGE_URL set, caches and outputs are shared (utils/storage_utils).
+    """
+    trace = start_trace(spec.get("job_id"))
+    with stage("job", service_name=spec.get("service_name")):
+        output_path = await _run_stages(spec, _reporter(progress, asyncio.get_running_loop()))
+    logger.info(f"Job {trace.job_id} finished; trace: {trace.path}")
+    return output_path
+
+
+async def generate_video_events(spec):
+    """
+    Run generate_video, yielding its progress as events:
+        {"event": "progress", "fraction": 0.35, "message": "..."}
+        {"event": "done", "path": "output_videos/....mp4"}   (last)
+    Failures are raised from the iterator; closing it early aborts the job.
+    """
+    events = asyncio.Queue()
+    closed = False
+
+    def progress(fraction, message):
+        if closed:
+            raise PipelineAborted(spec.get("job_id"))
+        events.put_nowait({"event": "progress", "fraction": fraction, "message": message})
+
+    task = asyncio.ensure_future(generate_video(spec, progress))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+        yield {"event": "done", "path": task.result()}
+    finally:
+        if not task.done():
+            closed = True  # render threads stop at their next progress report
+            task.cancel()
+
+
+def run_pipeline(spec, progress=None):
+    """
+    Blocking generate_video for job workers and the batch CLI (one event
+    loop per job); same spec, progress and output.
+    """
+    return asyncio.run(generate_video(spec, progress))
+
+
+async def _run_stages(spec, report):
+    profile = get_profile(spec.get("profile"))
+
+    if spec.get("slides"):
+        # Re-render of an edited deck: no extraction / LLM
+        slides = spec["slides"]
+    else:
+        # Step 1: Get Content
+        report(0.0, "📄 Reading PDF..." if spec.get("pdf_path") else "📄 Preparing form data...")
+        raw_text = await asyncio.to_thread(build_raw_text, spec)
+
+        # Step 2: AI Slide Generation (blocking client -> thread)
+        from services.gemini_service import generate_slides_from_raw
+
+        report(0.1, "🧠 AI Structuring Content...")
+        with stage("llm"):
+            slides = (await asyncio.to_thread(generate_slides_from_raw, raw_text))["slides"]
+
+    # Step 3: Asset Stage (all TTS + images concurrently, on this loop)
+    from utils.asset_utils import prepare_deck_assets, prepare_slide_assets
+    from utils.audio_utils import NARRATION_MODE
+
+    narration_mode = spec.get("narration") or NARRATION_MODE
+    narration = None
+    report(0.2, f"🎙️ Fetching narration & images for {len(slides)} slides...")
+    with stage("assets", slides=len(slides), narration=narration_mode):
+        if narration_mode == "deck":
+            # One TTS stream for the whole deck, muxed as one audio track
+            assets, narration = await prepare_deck_assets(slides, voice=spec["voice"])
+        else:
+            assets = await prepare_slide_assets(slides, voice=spec["voice"])
+
+    # Steps 3b-5: CPU-bound, off the event loop
+    output_path = await asyncio.to_thread(_render, spec, slides, assets, narration, profile, report)
+    # Saved next to the MP4 so the deck can be edited and re-rendered
+    save_deck(output_path, slides)
+
+    # Step 6: Outputs to the shared store (other replicas can serve them)
+    from utils.storage_utils import get_storage
+
+    if get_storage() is not None:
+        with stage("publish"):
+            await asyncio.to_thread(_publish, output_path, spec.get("tenant"))
+    return output_path
+
+
+def _publish(output_path, tenant):
+    from services.slide_cache import deck_path_for
+    from utils.caption_utils import caption_paths
+    from utils.storage_utils import publish_file
+    from utils.video_utils import preview_path_for
+
+    paths = [output_path, preview_path_for(output_path), deck_path_for(output_path)]
+    for path in paths + list(caption_paths(output_path)):
+        if os.path.exists(path):
+            publish_file(path, tenant)
+
+
+def _render(spec, slides, assets, narration, profile, report):
+    from utils.asset_utils import slide_content_hash, slide_narration
+    from utils.video_utils import deck_timeline
+
+    slide_specs = [
+        {
+            "image_path": image,
+            "title": slide["title"],
+            "content": slide_narration(slide),
+            "audio_path": audio,
+            # Unchanged slides reuse their rendered segments (parallel mode)
+            "hash": slide_content_hash(slide, spec["voice"], profile.name, image),
+        }
+        for slide, (audio, image) in zip(slides, assets)
+    ]
+
+    # Step 3a: Timeline from the narration's MP3 headers (nothing decoded);
+    # every render mode cuts slides and crossfades at these times, snapped
+    # to the profile's frame grid
+    with stage("timeline", slides=len(slides)):
+        timeline = deck_timeline(slide_specs, narration, profile.fps)
+    logger.info(
+        f"Timeline: {len(slides)} slides, {timeline.total:.1f}s, "
+        f"{timeline.frames(profile.fps)} frames at {profile.fps} fps"
+    )
+
+    # Step 3b: Caption cues from the narration's word timings, as SRT / VTT
+    # next to the MP4; "soft" also muxes a subtitle track into the video
+    # before it is moved into place (so it is never visible without one)
+    from utils.caption_utils import (
+        CAPTIONS_MODE, build_cues, language_for, slide_cues, video_words, write_captions,
+    )
+    from utils.video_utils import build_output_path
+
+    captions = spec.get("captions") or CAPTIONS_MODE
+    subtitles = None
+    if captions != "off":
+        with stage("captions", mode=captions):
+            cues = build_cues(video_words(timeline))
+            if cues:
+                srt_path, _ = write_captions(cues, build_output_path(spec["service_name"], profile=profile))
+                if captions == "soft":
+                    subtitles = (srt_path, language_for(spec["voice"]))
+        if captions == "burn":
+            # The current cue replaces the slide's full narration text
+            for slide_spec, cue_list in zip(slide_specs, slide_cues(cues, timeline)):
+                slide_spec["cues"] = cue_list
+
+    return _encode(spec, slide_specs, timeline, profile, report, subtitles)
+
+
+def _encode(spec, slide_specs, timeline, profile, report, subtitles=None):
+    from utils.avatar_utils import add_avatar_to_slide
+    from utils.image_utils import prepare_slide_images
+    from utils.video_utils import (
+        create_slide,
+        combine_slides_and_audio,
+        render_slides_parallel,
+        render_slides_streaming,
+        RENDER_MODE,
+        RENDER_WORKERS,
+    )
+
+    n_slides = len(slide_specs)
+    image_paths = [slide_spec["image_path"] for slide_spec in slide_specs]
+
+    if RENDER_MODE == "parallel":
+        # Step 3c: Decode / crop / resize every photo once; the render
+        # workers read the prepared frames from the image cache
+        report(0.3, "🖼️ Preparing images...")
+        with stage("image_prep", slides=n_slides, profile=profile.name):
+            prepare_slide_images(image_paths, profile)
+
+        # Step 4+5: Per-slide segments in worker processes, joined losslessly
+        report(0.35, f"🎞️ Rendering {n_slides} slides on {RENDER_WORKERS} workers...")
+        with stage("render", mode="parallel", workers=RENDER_WORKERS, profile=profile.name):
+            return render_slides_parallel(
+                slide_specs,
+                spec["service_name"],
+                progress_callback=lambda done, total: report(
+                    0.35 + 0.65 * done / total, f"🎞️ Rendered {done}/{total} segments"
+                ),
+                profile=profile,
+                timeline=timeline,
+                preview=spec.get("preview"),
+                subtitles=subtitles,
+            )
+
+    if RENDER_MODE == "stream":
+        # Step 4+5: One slide at a time, frames piped into a single encoder
+        # (images are prepared per slide too, so memory stays flat)
+        report(0.35, f"🎞️ Rendering {n_slides} slides...")
+        with stage("render", mode="stream", profile=profile.name):
+            return render_slides_streaming(
+                slide_specs,
+                spec["service_name"],
+                progress_callback=lambda done, total: report(
+                    0.35 + 0.65 * done / total, f"🎞️ Rendered slide {done}/{total}"
+                ),
+                profile=profile,
+                timeline=timeline,
+                preview=spec.get("preview"),
+                subtitles=subtitles,
+            )
+
+    # Step 3c: Image Stage (each photo decoded, cropped and resized once)
+    report(0.3, "🖼️ Preparing images...")
+    with stage("image_prep", slides=n_slides, profile=profile.name):
+        backgrounds = prepare_slide_images(image_paths, profile)
+
+    # Step 4: Creation Loop
+    video_clips = []
+    for i, (slide_spec, background) in enumerate(zip(slide_specs, backgrounds)):
+        report(0.35 + 0.3 * i / n_slides, f"🎬 Processing Slide {i+1}/{n_slides}")
+
+        with stage("slide_composition", slide=i):
+            clip = create_slide(
+                background, slide_spec["title"], slide_spec["content"], slide_spec["audio_path"],
+                profile, slide_spec["duration"], slide_spec.get("cues"), slide_spec["fade"],
+            )
+        with stage("avatar_overlay", slide=i):
+            clip = add_avatar_to_slide(clip, clip.duration, profile)
+        video_clips.append(clip)
+
+    # Step 5: Final Export
+    report(0.65, "🎞️ Rendering MP4...")
+    with stage("encode", mode="compose", profile=profile.name):
+        return combine_slides_and_audio(
+            video_clips, [slide_spec["audio_path"] for slide_spec in slide_specs],
+            spec["service_name"], profile, timeline.narration, spec.get("preview"), timeline.fade,
+            subtitles,
+        )
@@ -3,22 +3,45 @@ Gemini slide generator
 RAW PDF text → CLEAN SLIDES (STRICT FORMAT)
 """
 
-import google.generativeai as genai
 import json
 import re
 import os
+from functools import lru_cache
+
+from services.slide_cache import slide_cache_key, get_cached_slides, store_slides
 
 # -------------------------------------------------
 # CONFIG
 # -------------------------------------------------
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables")
-
-genai.configure(api_key=GOOGLE_API_KEY)
 
 MODEL_NAME = "gemini-2.0-flash-exp"
 
+# Bump PROMPT_VERSION whenever build_prompt changes (invalidates cached decks)
+PROMPT_VERSION = "1"
+GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "top_p": 0.8,
+    "top_k": 40,
+}
+
+# -------------------------------------------------
+# CLIENT (LOADED ON FIRST USE)
+# -------------------------------------------------
+@lru_cache(maxsize=None)
+def get_genai():
+    """
+    google.generativeai, imported and configured on the first call that
+    misses the slide cache (cached decks never load the SDK).
+    """
+    if not GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables")
+
+    import google.generativeai as genai
+    genai.configure(api_key=GOOGLE_API_KEY)
+    return genai
+
+
 # -------------------------------------------------
 # SAFE JSON EXTRACTOR
 # -------------------------------------------------
@@ -62,15 +85,17 @@ RAW TEXT:
 # GENERATE SLIDES
 # -------------------------------------------------
 def generate_slides_from_raw(raw_text: str):
+    cache_key = slide_cache_key(raw_text, "gemini", MODEL_NAME, PROMPT_VERSION, GENERATION_CONFIG)
+    cached = get_cached_slides(cache_key)
+    if cached:
+        return cached
+
+    genai = get_genai()
     model = genai.GenerativeModel(MODEL_NAME)
     
     response = model.generate_content(
         build_prompt(raw_text),
-        generation_config=genai.GenerationConfig(
-            temperature=0.2,
-            top_p=0.8,
-            top_k=40,
-        )
+        generation_config=genai.GenerationConfig(**GENERATION_CONFIG)
     )
 
     data = extract_json(response.text)
@@ -85,4 +110,5 @@ def generate_slides_from_raw(raw_text: str):
     for i, slide in enumerate(data["slides"], start=1):
         slide["slide_no"] = i
 
+    store_slides(cache_key, data)
     return data
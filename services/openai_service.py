@@ -8,6 +8,8 @@ import json
 import re
 import os
 
+from services.slide_cache import slide_cache_key, get_cached_slides, store_slides
+
 # -------------------------------------------------
 # CONFIG
 # -------------------------------------------------
@@ -16,6 +18,10 @@ client = OpenAI(api_key=OPENAI_API_KEY)
 
 MODEL_NAME = "gpt-4o-mini"  # fast + reliable for structured output
 
+# Bump PROMPT_VERSION whenever build_prompt changes (invalidates cached decks)
+PROMPT_VERSION = "1"
+GENERATION_CONFIG = {"temperature": 0.2}
+
 # -------------------------------------------------
 # SAFE JSON EXTRACTOR
 # -------------------------------------------------
@@ -80,6 +86,11 @@ RAW TEXT:
 # GENERATE SLIDES
 # -------------------------------------------------
 def generate_slides_from_raw(raw_text: str):
+    cache_key = slide_cache_key(raw_text, "openai", MODEL_NAME, PROMPT_VERSION, GENERATION_CONFIG)
+    cached = get_cached_slides(cache_key)
+    if cached:
+        return cached
+
     response = client.chat.completions.create(
         model=MODEL_NAME,
         messages=[
@@ -92,7 +103,7 @@ def generate_slides_from_raw(raw_text: str):
                 "content": build_prompt(raw_text)
             }
         ],
-        temperature=0.2
+        **GENERATION_CONFIG
     )
 
     text_output = response.choices[0].message.content
@@ -108,6 +119,7 @@ def generate_slides_from_raw(raw_text: str):
     for i, slide in enumerate(data["slides"], start=1):
         slide["slide_no"] = i
 
+    store_slides(cache_key, data)
     return data
 
 
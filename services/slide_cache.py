@@ -0,0 +1,84 @@
+"""
+Shared slide-deck cache for the LLM slide generators
+RAW TEXT + backend + model + prompt + config → validated {"slides": [...]}
+
+Also keeps the deck each video was rendered from next to the MP4
+(<video>.slides.json), so operators can edit slides and re-render.
+"""
+
+import json
+import os
+import re
+
+from utils.cache_utils import CACHE_ROOT, FileCache, cache_key
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+SLIDE_CACHE_TTL = int(os.getenv("SLIDE_CACHE_TTL_HOURS", "168")) * 3600
+SLIDE_CACHE_MAX_BYTES = int(os.getenv("SLIDE_CACHE_MAX_MB", "50")) * 1024 * 1024
+# Expired decks are regenerated under the same key: overwrite the shared copy
+SLIDE_CACHE = FileCache(
+    os.path.join(CACHE_ROOT, "slides"), max_bytes=SLIDE_CACHE_MAX_BYTES, suffix=".json",
+    overwrite=True,
+)
+
+
+# -------------------------------------------------
+# KEY
+# -------------------------------------------------
+def normalize_raw_text(raw_text: str) -> str:
+    """
+    Collapse whitespace and drop blank lines so that re-extracted
+    PDFs / re-submitted forms map to the same key.
+    """
+    lines = (re.sub(r"\s+", " ", line).strip() for line in raw_text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def slide_cache_key(raw_text, backend, model_name, prompt_version, generation_config) -> str:
+    return cache_key(
+        normalize_raw_text(raw_text), backend, model_name, prompt_version, generation_config
+    )
+
+
+# -------------------------------------------------
+# GET / PUT
+# -------------------------------------------------
+def get_cached_slides(key):
+    """
+    Cached slide deck for `key`, or None (missing, expired or malformed).
+    """
+    data = SLIDE_CACHE.get_json(key, ttl=SLIDE_CACHE_TTL)
+    if not data or not isinstance(data.get("slides"), list):
+        return None
+    return data
+
+
+def store_slides(key, data):
+    """
+    Store a slide deck that already passed the generator's safety check.
+    """
+    SLIDE_CACHE.put_json(key, data)
+
+
+# -------------------------------------------------
+# DECK SIDECAR (EDIT & RE-RENDER)
+# -------------------------------------------------
+def deck_path_for(video_path) -> str:
+    return os.path.splitext(video_path)[0] + ".slides.json"
+
+
+def save_deck(video_path, slides):
+    """Store the slides a video was rendered from next to it."""
+    with open(deck_path_for(video_path), "w", encoding="utf-8") as f:
+        json.dump({"slides": slides}, f, ensure_ascii=False, indent=2)
+
+
+def load_deck(video_path):
+    """Slides a video was rendered from, or None."""
+    try:
+        with open(deck_path_for(video_path), "r", encoding="utf-8") as f:
+            return json.load(f)["slides"]
+    except (OSError, ValueError, KeyError):
+        return None
@@ -1,55 +1,147 @@
+import asyncio
 import os
-import requests
+import sys
+import logging
 import hashlib
-import streamlit as st
+import uuid
 from urllib.parse import quote_plus
 
+from utils import http_utils, storage_utils, trace_utils
+from utils.image_cache import IMAGE_CACHE
+
+logger = logging.getLogger(__name__)
+
 # --- CONFIG ---
+def streamlit_secret(name):
+    """
+    Read st.secrets only when Streamlit is already loaded (the app),
+    so the batch CLI and job workers never import it.
+    """
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return None
+    try:
+        return st.secrets.get(name)
+    except Exception:
+        return None  # no secrets.toml
+
 UNSPLASH_URL = "https://api.unsplash.com/search/photos"
-UNSPLASH_ACCESS_KEY = st.secrets.get("UNSPLASH_ACCESS_KEY") or os.getenv("UNSPLASH_ACCESS_KEY")
+UNSPLASH_ACCESS_KEY = streamlit_secret("UNSPLASH_ACCESS_KEY") or os.getenv("UNSPLASH_ACCESS_KEY")
 
+# Search calls count against the app's hourly quota (50 for demo apps,
+# 5000 in production); photo downloads from the CDN do not.
+# 0 disables the shared budget (e.g. behind a proxy that enforces its own).
+UNSPLASH_RATE_PER_HOUR = int(os.getenv("UNSPLASH_RATE_PER_HOUR", "5000"))
+UNSPLASH_LIMITER = http_utils.RateLimiter(
+    "unsplash",
+    rate=UNSPLASH_RATE_PER_HOUR / 3600,
+    burst=int(os.getenv("UNSPLASH_BURST", "10")),
+    cooldown=float(os.getenv("UNSPLASH_COOLDOWN_SECONDS", "300")),
+) if UNSPLASH_RATE_PER_HOUR > 0 else None
+
+# Photos live in the shared image cache (IMAGES_DIR, see utils/image_cache.py)
 # Ensure image directory exists (important for cloud persistence)
-IMAGES_DIR = "images_cache"
-FALLBACK_IMAGE = os.path.join("assets", "default_background.jpg")
-os.makedirs(IMAGES_DIR, exist_ok=True)
+os.makedirs(IMAGE_CACHE.directory, exist_ok=True)
+
+# Plain background for slides whose photo could not be fetched; generated
+# on first use (see fallback_image)
+FALLBACK_IMAGE = os.path.join(IMAGE_CACHE.directory, "fallback_background.jpg")
+
+def fallback_image() -> str:
+    """FALLBACK_IMAGE, created (atomically) if it does not exist yet."""
+    if not os.path.exists(FALLBACK_IMAGE):
+        from utils.image_utils import create_fallback_image
+
+        tmp_path = f"{FALLBACK_IMAGE}.{uuid.uuid4().hex[:8]}.tmp.jpg"
+        os.replace(create_fallback_image(tmp_path, "final"), FALLBACK_IMAGE)
+    return FALLBACK_IMAGE
 
 def normalize_query(query: str) -> str:
     return query.lower().strip().replace("&", "and")
 
 def cached_image_path(query: str) -> str:
     hash_key = hashlib.md5(query.encode("utf-8")).hexdigest()
-    return os.path.join(IMAGES_DIR, f"{hash_key}.jpg")
+    return os.path.join(IMAGE_CACHE.directory, f"{hash_key}.jpg")
 
-def fetch_photo_from_unsplash(query: str):
+def shared_image_key(image_path: str) -> str:
+    """Key of an original photo in the shared artifact store."""
+    return f"images/{os.path.basename(image_path)}"
+
+def store_photo(image_path: str, query: str, image_url: str):
+    """Index a downloaded photo and share it with the other workers."""
+    IMAGE_CACHE.add(image_path, query=query, url=image_url)
+    storage_utils.push(shared_image_key(image_path), image_path)
+
+def search_request(query: str) -> dict:
+    """Keyword arguments of the search call for `query`."""
     if not UNSPLASH_ACCESS_KEY:
         raise ValueError("Unsplash Access Key missing")
-        
-    headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
-    params = {"query": quote_plus(query), "per_page": 1, "orientation": "landscape"}
-    
-    response = requests.get(UNSPLASH_URL, headers=headers, params=params, timeout=10)
-    response.raise_for_status()
-    results = response.json().get("results", [])
+
+    return {
+        "headers": {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"},
+        "params": {"query": quote_plus(query), "per_page": 1, "orientation": "landscape"},
+        "limiter": UNSPLASH_LIMITER,
+    }
+
+def first_result(data):
+    results = data.get("results", [])
     if not results:
         raise ValueError("No images found")
     return results[0]
 
-def fetch_and_save_photo(query: str) -> str:
+def lookup_cached(query: str):
+    """(normalized query, cache path, already cached?)"""
     if not query or not query.strip():
         query = "government office training"
     query = normalize_query(query)
     image_path = cached_image_path(query)
 
-    if os.path.exists(image_path):
+    if IMAGE_CACHE.touch(image_path):
+        trace_utils.count("cache_hits")
+        return query, image_path, True
+
+    # Another worker may have fetched it already (no search quota spent)
+    if storage_utils.pull(shared_image_key(image_path), image_path):
+        IMAGE_CACHE.add(image_path, query=query)
+        trace_utils.count("cache_hits")
+        return query, image_path, True
+
+    trace_utils.count("cache_misses")
+    return query, image_path, False
+
+def fetch_photo_from_unsplash(query: str):
+    return first_result(http_utils.get_json(UNSPLASH_URL, **search_request(query)))
+
+def fetch_and_save_photo(query: str) -> str:
+    query, image_path, cached = lookup_cached(query)
+    if cached:
         return image_path
 
     try:
         photo = fetch_photo_from_unsplash(query)
         image_url = photo["urls"]["regular"]
-        image_data = requests.get(image_url, timeout=10).content
-        with open(image_path, "wb") as f:
-            f.write(image_data)
+        http_utils.download(image_url, image_path)
+        store_photo(image_path, query, image_url)
+        return image_path
+    except Exception as e:
+        logger.warning(f"[Unsplash Error] {e}")
+        return fallback_image()
+
+# --- ASYNC (shared aiohttp session, see utils/http_utils.py) ---
+async def fetch_photo_from_unsplash_async(query: str, session):
+    return first_result(await http_utils.get_json_async(session, UNSPLASH_URL, **search_request(query)))
+
+async def fetch_and_save_photo_async(query: str, session) -> str:
+    query, image_path, cached = await asyncio.to_thread(lookup_cached, query)
+    if cached:
+        return image_path
+
+    try:
+        photo = await fetch_photo_from_unsplash_async(query, session)
+        image_url = photo["urls"]["regular"]
+        await http_utils.download_async(session, image_url, image_path)
+        await asyncio.to_thread(store_photo, image_path, query, image_url)
         return image_path
     except Exception as e:
-        print(f"[Unsplash Error] {e}")
-        return FALLBACK_IMAGE
+        logger.warning(f"[Unsplash Error] {e!r}")
+        return await asyncio.to_thread(fallback_image)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The repo is not installed as a package: import utils / services from the root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import storage_utils  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_shared_store(monkeypatch):
+    """Tests never touch a STORAGE_URL from the environment."""
+    get_storage = storage_utils.get_storage  # tests may patch it
+    monkeypatch.setattr(storage_utils, "STORAGE_URL", "")
+    get_storage.cache_clear()
+    yield
+    get_storage.cache_clear()
@@ -0,0 +1,33 @@
+from PIL import Image
+
+from services import unsplash_service
+from utils.asset_utils import slide_content_hash
+
+SLIDE = {"title": "Safety", "bullets": ["Wear a helmet."], "image_keyword": "construction"}
+
+
+def jpeg(path, color):
+    Image.new("RGB", (64, 36), color).save(path, "JPEG")
+    return str(path)
+
+
+def test_slide_hash_follows_the_resolved_image(tmp_path):
+    photo = jpeg(tmp_path / "photo.jpg", (200, 120, 40))
+    copy = jpeg(tmp_path / "elsewhere.jpg", (200, 120, 40))
+    fallback = jpeg(tmp_path / "fallback.jpg", (30, 30, 40))
+
+    key = slide_content_hash(SLIDE, "en-US-AriaNeural", "draft", photo)
+    # Same bytes at another path (another replica's cache dir): same slide
+    assert slide_content_hash(SLIDE, "en-US-AriaNeural", "draft", copy) == key
+    # Same keyword rendered on the fallback: a different slide
+    assert slide_content_hash(SLIDE, "en-US-AriaNeural", "draft", fallback) != key
+
+
+def test_fallback_image_is_generated_on_first_use(tmp_path, monkeypatch):
+    path = str(tmp_path / "fallback_background.jpg")
+    monkeypatch.setattr(unsplash_service, "FALLBACK_IMAGE", path)
+
+    assert unsplash_service.fallback_image() == path
+    with Image.open(path) as image:
+        assert image.size == (1920, 1080)
+    assert [p.name for p in tmp_path.iterdir()] == ["fallback_background.jpg"]
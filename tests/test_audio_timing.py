@@ -0,0 +1,64 @@
+import struct
+
+import pytest
+
+from utils.audio_timing import mp3_duration
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo: 417-byte frames of 1152 samples
+HEADER = bytes([0xFF, 0xFB, 0x90, 0x00])
+FRAME = HEADER + bytes(413)
+SAMPLES = 1152
+RATE = 44100
+
+
+def xing_frame(frames, tag=b"Xing", lame=None):
+    """First frame carrying a Xing header (all four fields), optionally a LAME tag."""
+    body = bytearray(32)  # stereo MPEG-1 side info
+    body += tag + struct.pack(">III", 0xF, frames, frames * len(FRAME))
+    body += bytes(100) + struct.pack(">I", 50)  # TOC, quality
+    if lame:
+        encoder, delay, padding = lame
+        body += encoder.ljust(9)[:9] + bytes(12)
+        body += ((delay << 12) | padding).to_bytes(3, "big")
+    return HEADER + bytes(body).ljust(413, b"\0")
+
+
+def id3v2(size):
+    # The tag's payload starts with bytes that look like a frame header
+    syncsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x03\x00\x00" + syncsafe + (HEADER + bytes(size))[:size]
+
+
+def write(tmp_path, data):
+    path = tmp_path / "narration.mp3"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_cbr_sums_every_frame(tmp_path):
+    path = write(tmp_path, FRAME * 100)
+    assert mp3_duration(path) == pytest.approx(100 * SAMPLES / RATE)
+
+
+def test_id3_tag_and_junk_are_skipped(tmp_path):
+    # Junk between frames forces a resync
+    data = id3v2(2048) + FRAME * 40 + b"junk" + FRAME * 60
+    assert mp3_duration(write(tmp_path, data)) == pytest.approx(100 * SAMPLES / RATE)
+
+
+def test_xing_frame_count_without_lame_tag(tmp_path):
+    # The count is trusted over the frames present (e.g. a file still being written)
+    path = write(tmp_path, xing_frame(250) + FRAME * 10)
+    assert mp3_duration(path) == pytest.approx(250 * SAMPLES / RATE)
+
+
+@pytest.mark.parametrize("encoder", [b"LAME3.100", b"Lavc61.3."])
+def test_lame_tag_delay_and_padding_are_trimmed(tmp_path, encoder):
+    data = id3v2(100) + xing_frame(250, tag=b"Info", lame=(encoder, 576, 1458)) + FRAME * 250
+    expected = (250 * SAMPLES - 576 - 1458) / RATE
+    assert mp3_duration(write(tmp_path, data)) == pytest.approx(expected)
+
+
+def test_no_frames_raises(tmp_path):
+    with pytest.raises(ValueError, match="No MPEG audio frames"):
+        mp3_duration(write(tmp_path, b"not an mp3" * 100))
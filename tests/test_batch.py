@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+import batch
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    return str(path)
+
+
+def test_load_specs_rejects_duplicate_service_names(tmp_path):
+    source = write_jsonl(tmp_path / "services.jsonl", [
+        {"service_name": "Caste Certificate"},
+        {"service_name": "Income Certificate"},
+        {"service_name": "Caste Certificate", "service_description": "second copy"},
+    ])
+    with pytest.raises(ValueError, match="Duplicate service_name.*Caste Certificate"):
+        batch.load_specs(source, "en-IN-NeerjaNeural")
+
+
+def test_load_specs_accepts_distinct_services(tmp_path):
+    source = write_jsonl(tmp_path / "services.jsonl", [
+        {"service_name": "Caste Certificate"}, {"service_name": ""}, {"service_name": "Income Certificate"},
+    ])
+    specs = batch.load_specs(source, "en-IN-NeerjaNeural", "draft")
+    assert [spec["service_name"] for spec in specs] == ["Caste Certificate", "Income Certificate"]
+
+
+def test_render_workers_split_between_jobs(tmp_path, monkeypatch):
+    monkeypatch.delenv("RENDER_WORKERS", raising=False)
+    monkeypatch.setattr(batch.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(batch, "run_batch", lambda specs, **kwargs: [])
+    source = write_jsonl(tmp_path / "services.jsonl", [{"service_name": "Caste Certificate"}])
+
+    batch.main([source, "--jobs", "3", "--state", str(tmp_path / "s.jsonl"),
+                "--report", str(tmp_path / "r.json")])
+    assert batch.os.environ["RENDER_WORKERS"] == "2"
@@ -0,0 +1,25 @@
+from benchmarks.run import compare, meta_mismatches
+
+META = {"cpu_count": 8, "python": "3.11.7", "latency": 0.0, "deck_shape": {"bullets": 3, "words": 8},
+        "repeat": 1, "profile": "final"}
+
+
+def test_meta_mismatches_name_the_incomparable_settings():
+    assert meta_mismatches(META, dict(META)) == []
+    # Other profiles are stored as their own rows ("20-draft"), not a mismatch
+    assert meta_mismatches(META, dict(META, profile="draft")) == []
+    assert meta_mismatches(META, dict(META, cpu_count=1, latency=0.2)) == [
+        ("cpu_count", 8, 1), ("latency", 0.0, 0.2),
+    ]
+    # Baselines from before a setting was recorded
+    assert meta_mismatches(META, {k: v for k, v in META.items() if k != "cpu_count"}) == [
+        ("cpu_count", 8, None),
+    ]
+
+
+def test_compare_verdicts():
+    results = {"5": {"a": {"seconds": 1.3}, "b": {"seconds": 0.7}, "c": {"seconds": 1.0}, "d": {"seconds": 1.0}}}
+    baseline = {"5": {"a": {"seconds": 1.0}, "b": {"seconds": 1.0}, "c": {"seconds": 1.1}}}
+    assert [row[-1] for row in compare(results, baseline, tolerance=0.2)] == [
+        "REGRESSION", "improved", "ok", "new",
+    ]
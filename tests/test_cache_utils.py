@@ -0,0 +1,95 @@
+import json
+import os
+import time
+
+import pytest
+
+from utils.cache_utils import FileCache, cache_key
+
+
+def write_entry(cache, key, size, age):
+    """Entry of `size` bytes last used `age` seconds ago."""
+    with cache.writer(key) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(b"x" * size)
+    used = time.time() - age
+    os.utime(cache.path_for(key), (used, used))
+
+
+def test_cache_key_is_stable_and_order_independent_for_dicts():
+    assert cache_key("a", {"x": 1, "y": 2}) == cache_key("a", {"y": 2, "x": 1})
+    assert cache_key("a", 1) != cache_key("a", "1")
+
+
+def test_get_hit_and_miss(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=1000, suffix=".bin")
+    assert cache.get("k") is None
+    write_entry(cache, "k", 10, age=0)
+    assert cache.get("k") == cache.path_for("k")
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=250, suffix=".bin")
+    write_entry(cache, "old", 100, age=300)
+    write_entry(cache, "mid", 100, age=200)
+    write_entry(cache, "new", 100, age=100)  # 300 bytes: "old" has to go
+    cache.evict()
+    assert cache.get("old") is None
+    assert cache.get("mid") and cache.get("new")
+
+
+def test_hit_refreshes_recency(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=250, suffix=".bin")
+    write_entry(cache, "a", 100, age=300)
+    write_entry(cache, "b", 100, age=200)
+    assert cache.get("a")  # now the most recently used
+    write_entry(cache, "c", 100, age=0)
+    cache.evict()
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+
+def test_new_entry_is_kept_even_when_larger_than_the_cap(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=50, suffix=".bin")
+    write_entry(cache, "small", 10, age=100)
+    with cache.writer("big") as partial:
+        with open(partial, "wb") as f:
+            f.write(b"x" * 100)
+    assert os.path.exists(cache.path_for("big"))
+    assert not os.path.exists(cache.path_for("small"))
+
+
+def test_writer_removes_temp_file_on_error(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=1000, suffix=".bin")
+    with pytest.raises(RuntimeError):
+        with cache.writer("k") as partial:
+            with open(partial, "wb") as f:
+                f.write(b"partial")
+            raise RuntimeError("encoder died")
+    assert os.listdir(tmp_path) == []
+    assert cache.get("k") is None
+
+
+def test_json_round_trip_and_ttl_expiry(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=1000, suffix=".json")
+    cache.put_json("k", {"slides": [1, 2]})
+    assert cache.get_json("k", ttl=60) == {"slides": [1, 2]}
+
+    path = cache.path_for("k")
+    with open(path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["created_at"] -= 120
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+    assert cache.get_json("k") == {"slides": [1, 2]}  # no ttl: never expires
+    assert cache.get_json("k", ttl=60) is None
+    assert not os.path.exists(path)  # expired entries are deleted
+
+
+def test_corrupt_json_is_a_miss(tmp_path):
+    cache = FileCache(str(tmp_path), max_bytes=1000, suffix=".json")
+    with open(cache.path_for("k"), "w") as f:
+        f.write("{not json")
+    assert cache.get_json("k") is None
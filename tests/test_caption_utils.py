@@ -0,0 +1,92 @@
+import pytest
+
+from utils import caption_utils
+from utils.audio_timing import SlideTiming, Timeline
+from utils.caption_utils import Cue, build_cues, format_srt, format_vtt, slide_cues, video_words
+
+
+def timeline(*slides, narration=None):
+    """Timeline of (start, duration) slides with a 0.5 s crossfade."""
+    return Timeline(
+        tuple(SlideTiming(start, duration, 0.0, duration, f"slide{i}.mp3") for i, (start, duration) in enumerate(slides)),
+        fade=0.5,
+        narration=narration,
+    )
+
+
+def words(slide, start, text, step=0.3):
+    """[slide, start, end, word] for every word of `text`, `step` seconds apart."""
+    return [[slide, start + i * step, start + i * step + step * 0.8, word] for i, word in enumerate(text.split())]
+
+
+def test_cues_split_at_the_character_limit():
+    cues = build_cues(words(0, 0.0, "one two three four five six seven"), max_chars=14)
+    assert [cue.text for cue in cues] == ["one two three", "four five six", "seven"]
+    # Each cue ends when the next starts, the last one is held CAPTION_MIN_SECONDS
+    assert cues[0].end == cues[1].start
+    assert cues[-1].end == pytest.approx(cues[-1].start + caption_utils.CAPTION_MIN_SECONDS)
+
+
+def test_cues_split_at_slides_pauses_and_duration():
+    stream = words(0, 0.0, "first slide") + words(1, 0.6, "second slide")
+    stream += words(1, 5.0, "after a pause")
+    stream += words(1, 10.0, " ".join(["word"] * 20), step=0.25)
+    cues = build_cues(stream, max_chars=200, max_seconds=2.0)
+
+    assert [cue.text for cue in cues[:3]] == ["first slide", "second slide", "after a pause"]
+    assert [cue.slide for cue in cues[:3]] == [0, 1, 1]
+    assert all(cue.end - cue.start <= 2.0 for cue in cues[3:])
+    assert sum(len(cue.text.split()) for cue in cues[3:]) == 20
+
+
+def test_punctuation_words_are_attached():
+    stream = [[0, 0.0, 0.2, "Hello"], [0, 0.2, 0.25, ","], [0, 0.3, 0.5, "world"], [0, 0.5, 0.55, "!"]]
+    assert build_cues(stream)[0].text == "Hello, world!"
+
+
+def test_slide_cues_are_clipped_at_slide_cuts():
+    deck = timeline((0.0, 3.0), (2.5, 4.0))
+    cues = [
+        Cue(1.0, 2.0, "inside", 0),
+        Cue(2.2, 3.4, "crosses the cut", 0),  # runs into the crossfade and past slide 0's end
+        Cue(2.4, 3.0, "early", 1),            # starts before slide 1 does
+    ]
+    assert slide_cues(cues, deck) == [
+        [(1.0, 2.0, "inside"), (2.2, 3.0, "crosses the cut")],
+        [(0.0, 0.5, "early")],
+    ]
+
+
+def test_video_words_offset_by_slide_start(monkeypatch):
+    timings = {"slide0.mp3": [[0, 0.1, 0.4, "Hi"]], "slide1.mp3": None, "slide2.mp3": [[0, 0.0, 0.2, "Bye"]]}
+    monkeypatch.setattr(caption_utils, "words_for", timings.get)
+    deck = timeline((0.0, 3.0), (2.5, 4.0), (6.0, 2.0))
+    # Slide 1 has no word timings: left out, the others keep their slide index
+    assert video_words(deck) == [[0, 0.1, 0.4, "Hi"], [2, 6.0, 6.2, "Bye"]]
+
+
+def test_srt_and_vtt_timestamps():
+    cues = [Cue(59.9996, 61.25, "a", 0), Cue(3725.5, 3727.0, "b", 0)]
+    assert format_srt(cues) == (
+        "1\n00:01:00,000 --> 00:01:01,250\na\n\n"
+        "2\n01:02:05,500 --> 01:02:07,000\nb\n\n"
+    )
+    assert format_vtt(cues) == (
+        "WEBVTT\n\n"
+        "00:01:00.000 --> 00:01:01.250\na\n\n"
+        "01:02:05.500 --> 01:02:07.000\nb\n\n"
+    )
+
+
+def test_subtitles_are_muxed_before_the_video_is_published(tmp_path, monkeypatch):
+    from utils import video_utils
+
+    partial, final = tmp_path / "video.1234.part.mp4", tmp_path / "video.mp4"
+    partial.write_bytes(b"mp4")
+    muxed = []
+    monkeypatch.setattr(
+        caption_utils, "mux_captions", lambda path, srt, language: muxed.append((path, final.exists()))
+    )
+    video_utils._publish([str(partial)], [str(final)], ("video.srt", "eng"))
+    assert muxed == [(str(partial), False)]
+    assert final.read_bytes() == b"mp4" and not partial.exists()
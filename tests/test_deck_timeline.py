@@ -0,0 +1,116 @@
+import random
+
+import numpy as np
+import pytest
+
+from utils import audio_timing
+from utils.audio_timing import build_narration_timeline, build_timeline
+
+
+def timeline_of(monkeypatch, durations, fade=0.5):
+    lengths = dict(zip(map(str, range(len(durations))), durations))
+    monkeypatch.setattr(audio_timing, "audio_duration", lengths.__getitem__)
+    return build_timeline(list(lengths), fade)
+
+
+def streamed_frames(timeline, fps):
+    """Frames render_slides_streaming writes: every body plus every join."""
+    from utils.video_utils import _frames_between
+
+    frames = 0
+    for i, slide in enumerate(timeline.slides):
+        frames += _frames_between(slide.body_start, slide.body_end, fps)
+        if i < len(timeline.slides) - 1:
+            frames += _frames_between(0, timeline.fade, fps)
+    return frames
+
+
+@pytest.mark.parametrize("fps", [12, 24, 25, 30])
+def test_pieces_add_up_to_the_timeline_frames(monkeypatch, fps):
+    rng = random.Random(fps)
+    timeline = timeline_of(monkeypatch, [rng.uniform(2.0, 9.0) for _ in range(100)])
+    snapped = timeline.snap(fps)
+
+    assert streamed_frames(snapped, fps) == snapped.frames(fps)
+    # Cuts are rounded from their exact positions: no drift, however long the deck
+    for exact, slide in zip(timeline.slides, snapped.slides):
+        assert abs(slide.start - exact.start) <= 0.5 / fps + 1e-9
+        assert slide.start * fps == pytest.approx(round(slide.start * fps))
+    assert abs(snapped.total - timeline.total) <= 0.5 / fps + 1e-9
+
+
+def test_fade_is_snapped_to_whole_frames(monkeypatch):
+    snapped = timeline_of(monkeypatch, [3.0, 4.0, 5.0]).snap(25)
+    assert snapped.fade * 25 == pytest.approx(round(snapped.fade * 25))
+    for slide in snapped.slides:
+        assert slide.body_end >= slide.body_start
+
+
+def test_snapped_narration_timeline_keeps_the_track_length(monkeypatch):
+    monkeypatch.setattr(audio_timing, "audio_duration", lambda path: 61.37)
+    timeline = build_narration_timeline("deck.mp3", [0.0, 10.01, 25.333, 40.9], 0.5)
+    snapped = timeline.snap(24)
+    assert snapped.narration == "deck.mp3"
+    assert snapped.frames(24) == round(61.37 * 24)
+    assert streamed_frames(snapped, 24) == snapped.frames(24)
+
+
+class FakeEncoder:
+    class stdin:
+        frames = 0
+
+        @classmethod
+        def write(cls, data):
+            cls.frames += 1
+
+
+def test_stream_frames_writes_exactly_the_requested_frames():
+    from moviepy.editor import ColorClip
+    from utils.video_utils import _stream_frames
+
+    # A 12-frame piece between two snapped cuts: float error makes it
+    # 0.5000000000000001 s, and iter_frames' np.arange yields 13 frames
+    start, end = 13 / 24, 25 / 24
+    clip = ColorClip((16, 16), color=(255, 0, 0), duration=2.0).subclip(start, end)
+    assert len(np.arange(0, clip.duration, 1.0 / 24)) == 13
+    _stream_frames(FakeEncoder, clip, 24, 12)
+    assert FakeEncoder.stdin.frames == 12
+
+
+def test_segment_tasks_add_up_to_the_timeline_frames(monkeypatch, tmp_path):
+    from utils.video_utils import _frames_between, _segment_tasks
+
+    fps = 12
+    timeline = timeline_of(monkeypatch, [4.37, 2.01, 6.66, 3.3]).snap(fps)
+    specs = [{"audio_path": None, "fade": timeline.fade} for _ in timeline.slides]
+    frames = 0
+    for task in _segment_tasks(specs, timeline, str(tmp_path)):
+        if task["kind"] == "body":
+            frames += _frames_between(task["start"], task["end"], fps)
+        else:
+            frames += _frames_between(0, task["spec"]["fade"], fps)
+    assert frames == timeline.frames(fps)
+
+
+def test_write_clip_encodes_exactly_the_requested_frames(tmp_path):
+    import re
+    import subprocess
+
+    from moviepy.editor import ColorClip
+    from utils.capabilities import probe
+    from utils.render_profiles import get_profile
+    from utils.video_utils import _write_clip
+
+    profile = get_profile("draft")
+    if probe().ffmpeg is None:
+        pytest.skip("needs ffmpeg")
+    fps = profile.fps
+    clip = ColorClip((64, 36), color=(0, 0, 255), duration=3.0).subclip(13 / fps, 25 / fps)
+    path = str(tmp_path / "segment.mp4")
+    _write_clip(clip, path, profile, frames=12)
+
+    log = subprocess.run(
+        [probe().ffmpeg, "-i", path, "-map", "0:v", "-f", "null", "-"],
+        capture_output=True, text=True,
+    ).stderr
+    assert re.findall(r"frame=\s*(\d+)", log)[-1] == "12"
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+from aiohttp import web
+
+from utils import http_utils
+from utils.http_utils import RateLimiter, download_async, open_async_session
+
+
+def test_rate_limiter_rejects_a_zero_rate(tmp_path):
+    with pytest.raises(ValueError, match="rate > 0"):
+        RateLimiter("api", rate=0, burst=10, db_path=str(tmp_path / "limits.sqlite3"))
+
+
+def test_rate_limiter_shares_one_bucket_across_threads(tmp_path):
+    db_path = str(tmp_path / "limits.sqlite3")
+    limiter = RateLimiter("api", rate=0.001, burst=20, db_path=db_path)
+    taken = []
+
+    def take():
+        for _ in range(5):
+            limiter.acquire()
+            taken.append(limiter._connect())
+
+    threads = [threading.Thread(target=take) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One connection per thread, reused for every token
+    assert len(taken) == 20 and len({id(conn) for conn in taken}) == 4
+    # The bucket is spent for every limiter on the same database
+    with pytest.raises(RuntimeError, match="no request budget"):
+        RateLimiter("api", rate=0.001, burst=20, db_path=db_path).acquire(max_wait=1)
+
+
+def test_download_outlives_the_api_timeout_while_data_flows(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_utils, "HTTP_TIMEOUT", 0.3)
+
+    async def slow_photo(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(6):
+            await response.write(b"x" * 1024)
+            await asyncio.sleep(0.1)  # 0.6s in total, never 0.3s without data
+        return response
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/photo.jpg", slow_photo)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            async with open_async_session() as session:
+                return await download_async(
+                    session, f"http://127.0.0.1:{port}/photo.jpg", str(tmp_path / "photo.jpg")
+                )
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(run()) == 6 * 1024
+    assert (tmp_path / "photo.jpg").stat().st_size == 6 * 1024
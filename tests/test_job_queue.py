@@ -0,0 +1,135 @@
+import sqlite3
+import time
+from contextlib import closing
+
+import job_queue
+from job_queue import CANCELLED, FAILED, QUEUED, RUNNING, connect, requeue_stale_jobs, submit_job
+
+
+def start_job(db, pid, attempts=1, heartbeat_age=0.0, host=job_queue.HOSTNAME, started=None):
+    job_id = submit_job({"service_name": "x"}, db)
+    with closing(connect(db)) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker_pid = ?, worker_host = ?, worker_started = ?, "
+            "attempts = ?, heartbeat_at = ? WHERE id = ?",
+            (RUNNING, pid, host, started, attempts, time.time() - heartbeat_age, job_id),
+        )
+    return job_id
+
+
+def status(db, job_id):
+    return job_queue.get_job(job_id, db)["status"]
+
+
+def test_job_of_dead_worker_is_requeued(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_queue, "_pid_alive", lambda pid: pid != 111)
+    dead, alive = start_job(db, 111), start_job(db, 222)
+    with closing(connect(db)) as conn:
+        requeue_stale_jobs(conn)
+    assert status(db, dead) == QUEUED
+    assert status(db, alive) == RUNNING
+
+
+def test_job_without_heartbeat_is_requeued(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_queue, "_pid_alive", lambda pid: True)
+    job_id = start_job(db, 111, heartbeat_age=job_queue.HEARTBEAT_TIMEOUT + 1)
+    with closing(connect(db)) as conn:
+        requeue_stale_jobs(conn)
+    assert status(db, job_id) == QUEUED
+
+
+def test_other_hosts_are_judged_by_heartbeat_only(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_queue, "_pid_alive", lambda pid: False)  # no such PID here
+    healthy = start_job(db, 111, host="other-host")
+    silent = start_job(db, 222, host="other-host", heartbeat_age=job_queue.HEARTBEAT_TIMEOUT + 1)
+    with closing(connect(db)) as conn:
+        requeue_stale_jobs(conn)
+    assert status(db, healthy) == RUNNING
+    assert status(db, silent) == QUEUED
+
+
+def test_reused_pid_does_not_keep_a_job_alive(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_queue, "_pid_alive", lambda pid: True)
+    monkeypatch.setattr(job_queue, "_process_start", lambda pid: 5000)
+    same, reused = start_job(db, 111, started=5000), start_job(db, 222, started=1234)
+    with closing(connect(db)) as conn:
+        requeue_stale_jobs(conn)
+    assert status(db, same) == RUNNING
+    assert status(db, reused) == QUEUED
+
+
+def test_cancelled_job_of_dead_worker_is_not_requeued(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_queue, "_pid_alive", lambda pid: False)
+    job_id = start_job(db, 111)
+    job_queue.cancel_job(job_id, db)
+    with closing(connect(db)) as conn:
+        requeue_stale_jobs(conn)
+    assert status(db, job_id) == CANCELLED
+
+
+def test_job_that_keeps_killing_workers_fails(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_queue, "_pid_alive", lambda pid: False)
+    job_id = start_job(db, 111, attempts=job_queue.MAX_JOB_ATTEMPTS)
+    with closing(connect(db)) as conn:
+        requeue_stale_jobs(conn)
+    job = job_queue.get_job(job_id, db)
+    assert job["status"] == FAILED
+    assert "is gone" in job["error"]
+
+
+def test_claim_counts_attempts(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+    job_id = submit_job({"service_name": "x"}, db)
+    with closing(connect(db)) as conn:
+        assert job_queue.claim_next_job(conn)["id"] == job_id
+    job = job_queue.get_job(job_id, db)
+    assert (job["status"], job["attempts"]) == (RUNNING, 1)
+    assert job["heartbeat_at"] is not None
+    assert job["worker_host"] == job_queue.HOSTNAME
+    # Our own claim is recognised as alive
+    with closing(connect(db)) as conn:
+        requeue_stale_jobs(conn)
+    assert status(db, job_id) == RUNNING
+
+
+class ExitedProcess:
+    pid = 111
+    returncode = -9
+
+    def poll(self):
+        return self.returncode
+
+
+class RunningProcess:
+    pid = 222
+
+    def poll(self):
+        return None
+
+
+def test_supervise_restarts_dead_workers_in_place(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(job_queue, "_spawn_worker", lambda db_path: RunningProcess())
+    processes = [ExitedProcess(), RunningProcess()]
+    assert job_queue.supervise_workers(processes, db) == 1
+    assert all(isinstance(process, RunningProcess) for process in processes)
+
+
+def test_old_databases_are_migrated(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+    with closing(sqlite3.connect(db)) as conn:
+        conn.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, spec TEXT NOT NULL, "
+            "progress REAL NOT NULL DEFAULT 0, message TEXT NOT NULL DEFAULT '', result TEXT, "
+            "error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, worker_pid INTEGER, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+    with closing(connect(db)) as conn:
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    assert {"attempts", "heartbeat_at", "worker_host", "worker_started"} <= columns
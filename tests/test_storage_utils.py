@@ -0,0 +1,154 @@
+import json
+import sys
+
+import pytest
+
+from utils import storage_utils, trace_utils
+from utils.cache_utils import FileCache
+from utils.storage_utils import LocalStorage, S3Storage, fetch_output, publish_file, pull, push
+
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path, monkeypatch):
+    """An empty store of each backend, installed as the configured one."""
+    if request.param == "local":
+        storage = LocalStorage(str(tmp_path / "store"))
+        monkeypatch.setattr(storage_utils, "get_storage", lambda: storage)
+        yield storage
+        return
+
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    for name, value in (("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test"),
+                        ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="bsk")
+        storage = S3Storage("bsk", "shared", client=client)
+        monkeypatch.setattr(storage_utils, "get_storage", lambda: storage)
+        yield storage
+
+
+class BrokenStorage:
+    """A store that is down: every call fails."""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("store unreachable")
+        return fail
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Trace counters incremented during the test, by name."""
+    counts = {}
+    monkeypatch.setattr(trace_utils, "count", lambda name, n=1: counts.__setitem__(name, counts.get(name, 0) + n))
+    return counts
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+# -------------------------------------------------
+# PULL / PUSH
+# -------------------------------------------------
+def test_push_pull_round_trip(store, tmp_path, counted):
+    push("cache/tts/abc.mp3", write(tmp_path / "a" / "abc.mp3", b"narration"))
+
+    target = tmp_path / "b" / "abc.mp3"
+    assert pull("cache/tts/abc.mp3", str(target))
+    assert target.read_bytes() == b"narration"
+    assert list(target.parent.iterdir()) == [target]  # no temp file left
+    assert counted == {"storage_hits": 1}
+
+
+def test_pull_miss(store, tmp_path, counted):
+    target = tmp_path / "b" / "missing.mp3"
+    assert not pull("cache/tts/missing.mp3", str(target))
+    assert list(target.parent.iterdir()) == []
+    assert counted == {}
+
+
+def test_push_skips_existing_keys_unless_overwrite(store, tmp_path):
+    push("cache/slides/k.json", write(tmp_path / "v1.json", b"v1"))
+    push("cache/slides/k.json", write(tmp_path / "v2.json", b"v2"))
+    assert store.get_bytes("cache/slides/k.json") == b"v1"
+
+    push("cache/slides/k.json", str(tmp_path / "v2.json"), overwrite=True)
+    assert store.get_bytes("cache/slides/k.json") == b"v2"
+
+
+def test_store_failures_are_logged_and_counted(tmp_path, monkeypatch, counted):
+    monkeypatch.setattr(storage_utils, "get_storage", BrokenStorage)
+    target = tmp_path / "b" / "abc.mp3"
+
+    assert not pull("cache/tts/abc.mp3", str(target))
+    push("cache/tts/abc.mp3", write(tmp_path / "abc.mp3", b"narration"))
+    assert publish_file(str(tmp_path / "abc.mp3")) is None
+    assert list(target.parent.iterdir()) == []
+    assert counted == {"storage_errors": 3}
+
+
+def test_s3_without_bucket_is_a_failure_not_a_miss(tmp_path, monkeypatch, counted):
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    with moto.mock_aws():
+        storage = S3Storage("no-such-bucket", client=boto3.client("s3", region_name="us-east-1"))
+        monkeypatch.setattr(storage_utils, "get_storage", lambda: storage)
+        push("cache/tts/abc.mp3", write(tmp_path / "abc.mp3", b"narration"))
+        assert not pull("cache/tts/abc.mp3", str(tmp_path / "b.mp3"))
+    assert counted == {"storage_errors": 2}
+
+
+def test_s3_without_boto3_fails_with_a_hint(monkeypatch):
+    monkeypatch.setitem(sys.modules, "boto3", None)  # import boto3 -> ImportError
+    with pytest.raises(RuntimeError, match="requirements-s3.txt"):
+        storage_utils.open_storage("s3://bsk/shared")
+
+
+# -------------------------------------------------
+# FILE CACHE THROUGH THE STORE
+# -------------------------------------------------
+def test_ttl_cache_replaces_expired_shared_entries(store, tmp_path):
+    first = FileCache(str(tmp_path / "a" / "slides"), max_bytes=10**6, suffix=".json", overwrite=True)
+    other = FileCache(str(tmp_path / "b" / "slides"), max_bytes=10**6, suffix=".json", overwrite=True)
+
+    first.put_json("deck", {"slides": ["old"]})
+    assert other.get_json("deck", ttl=3600) == {"slides": ["old"]}
+    assert other.get_json("deck", ttl=0) is None  # expired
+
+    # Regenerated on one worker, picked up by the next
+    other.put_json("deck", {"slides": ["new"]})
+    third = FileCache(str(tmp_path / "c" / "slides"), max_bytes=10**6, suffix=".json")
+    assert third.get_json("deck", ttl=3600) == {"slides": ["new"]}
+
+
+# -------------------------------------------------
+# PUBLISHED OUTPUTS
+# -------------------------------------------------
+def test_publish_and_fetch_round_trip(store, tmp_path):
+    video = write(tmp_path / "out" / "service.mp4", b"\x00video")
+    ref = publish_file(video, tenant="district-a")
+    assert ref == "outputs/district-a/service.mp4.json"
+
+    target = tmp_path / "download.mp4"
+    assert fetch_output("service.mp4", str(target), tenant="district-a")
+    assert target.read_bytes() == b"\x00video"
+    assert not fetch_output("service.mp4", str(tmp_path / "x.mp4"), tenant="district-b")
+
+
+def test_publish_stores_identical_bytes_once(store, tmp_path):
+    publish_file(write(tmp_path / "a" / "one.mp4", b"same"), tenant="a")
+    publish_file(write(tmp_path / "b" / "two.mp4", b"same"), tenant="b")
+
+    keys = sorted(key for key, _ in store.list())
+    blobs = [key for key in keys if key.startswith("blobs/")]
+    assert len(blobs) == 1 and blobs[0].endswith(".mp4")
+    assert keys == blobs + ["outputs/a/one.mp4.json", "outputs/b/two.mp4.json"]
+    assert json.loads(store.get_bytes("outputs/b/two.mp4.json"))["blob"] == blobs[0]
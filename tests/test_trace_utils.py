@@ -0,0 +1,50 @@
+import json
+import time
+
+import pytest
+
+from utils import trace_utils
+from utils.trace_utils import current_rss_mb, stage, start_trace, summarize_trace
+
+pytestmark = pytest.mark.skipif(current_rss_mb() is None, reason="needs /proc/self/statm")
+
+
+def records(trace):
+    with open(trace.path, "r", encoding="utf-8") as f:
+        return {r["stage"]: r for r in map(json.loads, f)}
+
+
+def test_stage_rss_is_sampled_during_the_stage(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace_utils, "RSS_SAMPLE_INTERVAL", 0.01)
+    trace = start_trace("t1")
+    trace.path = str(tmp_path / "t1.jsonl")
+
+    with stage("big"):
+        block = bytearray(64 * 1024 * 1024)
+        for i in range(0, len(block), 4096):
+            block[i] = 1  # touch every page so it is resident
+        time.sleep(0.1)
+        del block
+    with stage("small"):
+        time.sleep(0.05)
+
+    by_stage = records(trace)
+    assert by_stage["big"]["rss_delta_mb"] >= 48
+    # The next stage starts after the memory was freed: its own peak is
+    # lower, while the process-lifetime mark still includes "big"
+    assert by_stage["small"]["rss_delta_mb"] < 16
+    assert by_stage["small"]["peak_rss_mb"] < by_stage["big"]["peak_rss_mb"]
+    assert by_stage["small"]["process_peak_rss_mb"] >= by_stage["big"]["peak_rss_mb"] - 1
+
+    summary = {row["stage"]: row for row in summarize_trace(trace.path)}
+    assert summary["big"]["peak_rss_mb"] == by_stage["big"]["peak_rss_mb"]
+
+
+def test_nested_stages_share_the_sampler(tmp_path):
+    trace = start_trace("t2")
+    trace.path = str(tmp_path / "t2.jsonl")
+    with stage("outer"):
+        with stage("inner"):
+            pass
+    by_stage = records(trace)
+    assert by_stage["outer"]["peak_rss_mb"] >= by_stage["inner"]["peak_rss_mb"]
@@ -0,0 +1,131 @@
+"""
+Asset utilities for training video generation
+
+Goals:
+- Fetch narration audio and background images for ALL slides at once
+- One event loop per video (no asyncio.run per slide)
+- Bounded concurrency so edge-tts / Unsplash are not flooded
+- One pooled HTTP session per video for all image fetches
+- Deck narration: one TTS stream for all slides (see prepare_deck_assets)
+"""
+
+import asyncio
+import logging
+import os
+
+from utils.audio_utils import deck_to_speech, slide_cuts, text_to_speech, DEFAULT_VOICE
+from utils.cache_utils import cache_key
+from utils.http_utils import open_async_session
+from utils.storage_utils import file_digest
+from services.unsplash_service import fetch_and_save_photo_async
+from utils.trace_utils import stage
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+# Max number of TTS + image requests in flight for one video
+MAX_ASSET_CONCURRENCY = int(os.getenv("ASSET_CONCURRENCY", "8"))
+
+
+# -------------------------------------------------
+# HELPERS
+# -------------------------------------------------
+def slide_narration(slide) -> str:
+    """Narration text for a slide dict from generate_slides_from_raw."""
+    return " ".join(slide["bullets"])
+
+
+def slide_content_hash(slide, voice, profile_name, image_path) -> str:
+    """
+    Identity of a slide's rendered output: everything that changes its
+    narration, background or frames. Unchanged slides keep their hash
+    across re-renders, so their encoded segments can be reused.
+
+    The background counts by the bytes of the resolved image, not by its
+    keyword: a slide rendered on the fallback (Unsplash down) gets a new
+    hash once its photo arrives, and the same photo hashes the same on
+    every replica.
+    """
+    return cache_key(
+        slide["title"], list(slide["bullets"]), file_digest(image_path), voice, profile_name
+    )
+
+
+# -------------------------------------------------
+# ASSET STAGE (ASYNC)
+# -------------------------------------------------
+async def prepare_slide_assets(
+    slides,
+    voice: str = DEFAULT_VOICE,
+    max_concurrency: int = MAX_ASSET_CONCURRENCY,
+    audio: bool = True,
+):
+    """
+    Run every TTS call and every Unsplash fetch for a deck concurrently.
+
+    Input:
+    - slides: list of slide dicts (title, bullets, image_keyword)
+    - audio: False fetches images only (audio_path is None)
+    Output:
+    - list of (audio_path, image_path), one per slide, in slide order
+
+    Returns only once every asset is ready, so rendering can start
+    with the full set in hand.
+    """
+    max_concurrency = max(1, max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_audio(i, slide):
+        if not audio:
+            return None
+        async with semaphore:
+            with stage("tts", slide=i):
+                return await text_to_speech(slide_narration(slide), voice=voice)
+
+    async def fetch_image(i, slide, session):
+        async with semaphore:
+            with stage("image_fetch", slide=i):
+                return await fetch_and_save_photo_async(slide.get("image_keyword", ""), session)
+
+    async with open_async_session() as session:
+        audio_paths, image_paths = await asyncio.gather(
+            asyncio.gather(*(fetch_audio(i, s) for i, s in enumerate(slides))),
+            asyncio.gather(*(fetch_image(i, s, session) for i, s in enumerate(slides))),
+        )
+
+    return list(zip(audio_paths, image_paths))
+
+
+async def prepare_deck_assets(
+    slides,
+    voice: str = DEFAULT_VOICE,
+    max_concurrency: int = MAX_ASSET_CONCURRENCY,
+):
+    """
+    prepare_slide_assets with single-pass narration: the whole deck is
+    narrated in one TTS stream (one connection) while the images download.
+
+    Output:
+    - (assets, narration): assets as from prepare_slide_assets with
+      audio_path None, narration = {"path", "cuts", "words"} (see
+      audio_utils.deck_to_speech / slide_cuts)
+
+    If the word boundaries cannot be matched to every slide, falls back
+    to one narration file per slide (narration is then None).
+    """
+    async def narrate():
+        with stage("tts", slides=len(slides), narration="deck"):
+            return await deck_to_speech([slide_narration(s) for s in slides], voice=voice)
+
+    (path, words), assets = await asyncio.gather(
+        narrate(), prepare_slide_assets(slides, voice, max_concurrency, audio=False)
+    )
+    try:
+        cuts = slide_cuts(words, len(slides))
+    except ValueError as e:
+        logger.warning(f"Deck narration cannot be split ({e}); narrating slide by slide")
+        return await prepare_slide_assets(slides, voice, max_concurrency), None
+
+    return assets, {"path": path, "cuts": cuts, "words": words}
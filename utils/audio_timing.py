@@ -0,0 +1,309 @@
+"""
+Narration timing for training video generation
+
+Goals:
+- Exact narration length from the MP3 frame headers (no decoding, no
+  ffmpeg process per slide)
+- One timeline for the whole deck, built before any clip is created, so
+  every render mode cuts the same slide / crossfade boundaries
+- Frame counts up front for progress and buffer sizing
+- Same timeline shape for one narration file per slide and for one
+  shared deck narration (single-pass TTS)
+- Cuts snapped to the frame grid (Timeline.snap), so every slide body
+  and crossfade is a whole number of frames and the video never drifts
+  from the narration, however many slides the deck has
+
+Usage:
+    timeline = build_timeline(audio_paths, fade=FADE_DURATION)
+    timeline = build_narration_timeline(deck_audio_path, cuts, fade=FADE_DURATION)
+    timeline = timeline.snap(fps)
+    timeline.slides[i].duration, timeline.slides[i].start, timeline.frames(fps)
+"""
+
+import logging
+import os
+import struct
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# MP3 FRAME HEADERS
+# -------------------------------------------------
+# kbps by [MPEG-1?][layer]; index 0 ("free") and 15 (invalid) are None
+_BITRATES = {
+    (True, 1): [None, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448, None],
+    (True, 2): [None, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384, None],
+    (True, 3): [None, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, None],
+    (False, 1): [None, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256, None],
+    (False, 2): [None, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, None],
+}
+_BITRATES[(False, 3)] = _BITRATES[(False, 2)]
+
+# Hz by version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+
+@dataclass(frozen=True)
+class _Frame:
+    length: int        # bytes, header included
+    samples: int       # PCM samples per channel
+    sample_rate: int
+    mpeg1: bool
+    mono: bool
+
+
+def _parse_header(data, pos):
+    """The MPEG audio frame starting at data[pos], or None."""
+    if pos + 4 > len(data):
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0x3
+    layer = 4 - ((b1 >> 1) & 0x3)  # bits 11/10/01 -> layer 1/2/3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x3
+    if version == 1 or layer == 4 or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index]
+    if bitrate is None:
+        return None
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x1
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate * 1000 // sample_rate + padding
+    return _Frame(length, samples, sample_rate, mpeg1, mono=(b3 >> 6) == 3)
+
+
+def _id3v2_size(data):
+    """Bytes taken by a leading ID3v2 tag (0 if there is none)."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:  # syncsafe integer
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _vbr_samples(data, pos, frame):
+    """
+    Samples per channel from a Xing / Info or VBRI header in the first
+    frame (written by LAME, ffmpeg and Fraunhofer encoders), or None.
+
+    The frame count covers whole frames; a LAME tag after the Xing
+    header (LAME, ffmpeg) also records the encoder delay and padding
+    that decoders trim, which is what a player actually plays.
+    """
+    side_info = (17 if frame.mono else 32) if frame.mpeg1 else (9 if frame.mono else 17)
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if not flags & 0x1:
+            return None
+        samples = struct.unpack(">I", data[xing + 8:xing + 12])[0] * frame.samples
+        # frames, bytes, TOC and quality fields, each only when flagged
+        lame = xing + 8 + 4 * bool(flags & 0x1) + 4 * bool(flags & 0x2) \
+            + 100 * bool(flags & 0x4) + 4 * bool(flags & 0x8)
+        if data[lame:lame + 4] in (b"LAME", b"Lavc", b"Lavf") and len(data) >= lame + 24:
+            gap = int.from_bytes(data[lame + 21:lame + 24], "big")  # 12-bit delay, 12-bit padding
+            samples = max(0, samples - (gap >> 12) - (gap & 0xFFF))
+        return samples
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        return struct.unpack(">I", data[vbri + 14:vbri + 18])[0] * frame.samples
+    return None
+
+
+def mp3_duration(path) -> float:
+    """
+    Length of an MP3 file in seconds from its frame headers: the encoder's
+    frame count when the first frame carries one (Xing / Info / VBRI, less
+    a LAME tag's delay and padding), otherwise the sum over every frame
+    header. Nothing is decoded.
+    Raises ValueError if the file has no MPEG audio frames.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    pos = _id3v2_size(data)
+    first = None
+    samples = 0
+    while pos + 4 <= len(data):
+        frame = _parse_header(data, pos)
+        if frame is None or frame.length <= 4:
+            pos += 1  # junk or a torn frame: resync on the next header
+            continue
+        if first is None:
+            first = frame
+            vbr_samples = _vbr_samples(data, pos, frame)
+            if vbr_samples is not None:
+                return vbr_samples / frame.sample_rate
+        samples += frame.samples
+        pos += frame.length
+
+    if first is None:
+        raise ValueError(f"No MPEG audio frames in {path}")
+    return samples / first.sample_rate
+
+
+def audio_duration(path) -> float:
+    """
+    Narration length in seconds: header-only for MP3 (all TTS output);
+    other formats fall back to ffmpeg via MoviePy.
+    """
+    if os.path.splitext(path)[1].lower() == ".mp3":
+        try:
+            return mp3_duration(path)
+        except ValueError as e:
+            logger.warning(f"{e}; measuring with ffmpeg instead")
+
+    from moviepy.editor import AudioFileClip  # heavy import only when needed
+
+    clip = AudioFileClip(path)
+    try:
+        return clip.duration
+    finally:
+        clip.close()
+
+
+# -------------------------------------------------
+# DECK TIMELINE
+# -------------------------------------------------
+@dataclass(frozen=True)
+class SlideTiming:
+    start: float       # where the slide starts in the video (seconds)
+    duration: float    # narration length = slide clip length
+    body_start: float  # part of the slide outside the crossfades with its
+    body_end: float    # neighbours, relative to the slide's own start
+    audio_path: str = None  # the slide's own narration (None: shared track)
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+
+@dataclass(frozen=True)
+class Timeline:
+    """
+    Placement of every slide in the final video. Consecutive slides
+    overlap by `fade` seconds (the crossfade), like
+    concatenate_videoclips(padding=-fade).
+
+    narration: one audio track for the whole video (slides are silent),
+    or None when every slide carries its own narration
+    """
+    slides: tuple
+    fade: float
+    narration: str = None
+
+    @property
+    def durations(self) -> list:
+        return [slide.duration for slide in self.slides]
+
+    @property
+    def offsets(self) -> list:
+        return [slide.start for slide in self.slides]
+
+    @property
+    def total(self) -> float:
+        return self.slides[-1].end if self.slides else 0.0
+
+    @property
+    def tracks(self) -> list:
+        """(audio path, offset in the video) of every narration file to mix."""
+        if self.narration:
+            return [(self.narration, 0.0)]
+        return [(slide.audio_path, slide.start) for slide in self.slides]
+
+    def frames(self, fps) -> int:
+        """Frames in the final video at `fps`."""
+        return round(self.total * fps)
+
+    def snap(self, fps) -> "Timeline":
+        """
+        The same timeline with every slide start, slide end and the fade
+        on the frame grid of `fps`. Slide starts are rounded from their
+        exact positions (not by adding rounded durations), so the video
+        stays within half a frame of the narration at every cut.
+        """
+        if not self.slides:
+            return self
+        fade = round(self.fade * fps)
+        if self.fade > 0:
+            fade = max(fade, 1)
+        last = len(self.slides) - 1
+
+        starts = []
+        for i, slide in enumerate(self.slides):
+            start = round(slide.start * fps)
+            if i > 1:
+                # the previous slide keeps room for its fade in and fade out
+                start = max(start, starts[-1] + fade)
+            starts.append(start)
+        end = max(round(self.total * fps), starts[-1] + fade)
+
+        slides = []
+        for i, (start, slide) in enumerate(zip(starts, self.slides)):
+            stop = starts[i + 1] + fade if i < last else end
+            slides.append(
+                _slide_timing(i, last, start / fps, (stop - start) / fps, fade / fps, slide.audio_path)
+            )
+        return Timeline(tuple(slides), fade / fps, self.narration)
+
+
+def _slide_timing(i, last, start, duration, fade, audio_path=None):
+    return SlideTiming(
+        start=start,
+        duration=duration,
+        body_start=fade if i > 0 else 0.0,
+        body_end=duration - fade if i < last else duration,
+        audio_path=audio_path,
+    )
+
+
+def build_timeline(audio_paths, fade) -> Timeline:
+    """Timeline of a deck from its narration files (one per slide)."""
+    slides = []
+    start = 0.0
+    last = len(audio_paths) - 1
+    for i, path in enumerate(audio_paths):
+        duration = audio_duration(path)
+        slides.append(_slide_timing(i, last, start, duration, fade, path))
+        start += duration - fade
+    return Timeline(tuple(slides), fade)
+
+
+def build_narration_timeline(narration_path, cuts, fade) -> Timeline:
+    """
+    Timeline of a deck narrated as one track (audio_utils.deck_to_speech).
+
+    cuts: where each slide's narration starts in the track (seconds).
+    Each crossfade is centred on its cut and the video is exactly as
+    long as the track, so the slides just follow the voice.
+    """
+    total = audio_duration(narration_path)
+    starts = [0.0]
+    for cut in cuts[1:]:
+        # Every slide lasts at least 2 * fade (one fade in, one fade out)
+        starts.append(min(max(cut - fade / 2, starts[-1] + fade), total - fade))
+
+    slides = []
+    last = len(starts) - 1
+    for i, start in enumerate(starts):
+        end = starts[i + 1] + fade if i < last else total
+        slides.append(_slide_timing(i, last, start, end - start, fade))
+    return Timeline(tuple(slides), fade, narration=narration_path)
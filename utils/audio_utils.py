@@ -5,14 +5,21 @@ Goals:
 - Clear, slow, professional narration
 - Natural pauses between bullet points
 - Predictable duration for video sync
+- Optional single-pass narration: the whole deck in one TTS stream,
+  split into slides at word boundaries (NARRATION_MODE=deck)
+- Word timings (edge-tts WordBoundary events) kept with every narration,
+  for captions
 """
 
-import tempfile
 import edge_tts
 import asyncio
+import bisect
 import re
 import os
 
+from utils import trace_utils
+from utils.cache_utils import CACHE_ROOT, FileCache, cache_key
+
 # -------------------------------------------------
 # DEFAULT VOICE SETTINGS (TRAINING OPTIMIZED)
 # -------------------------------------------------
@@ -20,6 +27,27 @@ DEFAULT_VOICE = "en-IN-NeerjaNeural"  # Indian English, calm & professional
 DEFAULT_RATE = "+5%"  # Slightly slower than normal
 DEFAULT_PITCH = "+0Hz"
 
+# -------------------------------------------------
+# AUDIO CACHE (CONTENT-ADDRESSED)
+# -------------------------------------------------
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "500")) * 1024 * 1024
+TTS_CACHE = FileCache(
+    os.path.join(CACHE_ROOT, "tts"), max_bytes=TTS_CACHE_MAX_BYTES, suffix=".mp3"
+)
+# Word timings of every narration, same keys as their TTS_CACHE audio
+WORDS_CACHE = FileCache(
+    os.path.join(CACHE_ROOT, "tts_words"), max_bytes=TTS_CACHE_MAX_BYTES // 10, suffix=".json"
+)
+
+# -------------------------------------------------
+# NARRATION MODE
+# -------------------------------------------------
+# "slide": one TTS request (and audio file) per slide
+# "deck":  one TTS stream for the whole deck, muxed as a single track
+NARRATION_MODE = os.getenv("NARRATION_MODE", "slide")
+SLIDE_BREAK = "\n\n"  # between slides in a deck narration
+TICKS_PER_SECOND = 10_000_000  # edge-tts offsets are in 100 ns ticks
+
 
 # -------------------------------------------------
 # TEXT PRE-PROCESSING (VERY IMPORTANT)
@@ -58,26 +86,159 @@ async def text_to_speech(
     Input:
     - text: narration text (usually slide bullets joined)
     Output:
-    - path to generated .mp3 file
+    - path to generated .mp3 file (inside the TTS cache); its word
+      timings are available from words_for(path)
+
+    Identical narration / voice / rate / pitch reuses the cached file.
     """
 
     narration_text = prepare_narration_text(text)
+    key = cache_key(narration_text, voice, rate, pitch)
+
+    # Audio cached before word timings were kept is synthesized again once
+    cached_path, words = await asyncio.to_thread(_cached, key)
+    if words is not None:
+        return cached_path
+
+    await _synthesize(key, narration_text, [0], voice, rate, pitch)
+    return TTS_CACHE.path_for(key)
+
 
+def _cached(key):
+    """
+    (audio path, words) of a cached narration, else (path or None, None).
+    Blocking (may read the shared store): run it off the event loop.
+    """
+    cached_path = TTS_CACHE.get(key)
+    words = WORDS_CACHE.get_json(key) if cached_path else None
+    return cached_path, words
+
+
+def _share(key):
+    TTS_CACHE.share(key)
+    WORDS_CACHE.share(key)
+
+
+async def _synthesize(key, narration_text, starts, voice, rate, pitch):
+    """
+    Stream one TTS request into TTS_CACHE[key] and its word timings into
+    WORDS_CACHE[key]; returns the words (see _assign_words).
+    """
     communicate = edge_tts.Communicate(
-        text=narration_text, voice=voice, rate=rate, pitch=pitch
+        text=narration_text, voice=voice, rate=rate, pitch=pitch, boundary="WordBoundary"
     )
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as audio_file:
-        output_path = audio_file.name
+    boundaries = []
+    with TTS_CACHE.writer(key, share=False) as output_path:
+        with open(output_path, "wb") as audio:
+            async for message in communicate.stream():
+                if message["type"] == "audio":
+                    audio.write(message["data"])
+                elif message["type"] == "WordBoundary":
+                    boundaries.append(message)
+
+        # -------- HARD VALIDATION --------
+        if os.path.getsize(output_path) < 1024:
+            raise RuntimeError("TTS failed: empty or invalid audio file generated")
+
+        trace_utils.count("bytes_downloaded", os.path.getsize(output_path))
+
+    words = _assign_words(boundaries, narration_text, starts)
+    WORDS_CACHE.put_json(key, words, share=False)
+    # Upload for the other workers without blocking the event loop
+    await asyncio.to_thread(_share, key)
+    return words
 
-    await communicate.save(output_path)
 
-    # -------- HARD VALIDATION --------
-    if not os.path.exists(output_path) or os.path.getsize(output_path) < 1024:
-        raise RuntimeError("TTS failed: empty or invalid audio file generated")
+def words_for(audio_path):
+    """
+    Word timings of a narration file from text_to_speech / deck_to_speech:
+    [slide, start, end, word] in seconds (slide is always 0 for a single
+    slide's narration), or None if they were not recorded.
+    """
+    key = os.path.splitext(os.path.basename(audio_path))[0]
+    return WORDS_CACHE.get_json(key)
+
+
+# -------------------------------------------------
+# DECK NARRATION (ONE TTS STREAM)
+# -------------------------------------------------
+def deck_narration_text(texts):
+    """
+    Narration of every slide as one text, plus the character position
+    where each slide starts. Every slide ends a sentence, so the voice
+    pauses at each slide break.
+    """
+    parts, starts, position = [], [], 0
+    for text in texts:
+        text = prepare_narration_text(text)
+        if text and text[-1] not in ".!?":
+            text += "."
+        starts.append(position)
+        parts.append(text)
+        position += len(text) + len(SLIDE_BREAK)
+    return SLIDE_BREAK.join(parts), starts
+
+
+def _assign_words(boundaries, narration_text, starts):
+    """
+    [slide, start, end, word] (seconds) for each WordBoundary event, found
+    in the narration text in order. Words the service normalised beyond
+    recognition are skipped.
+    """
+    words, cursor = [], 0
+    for boundary in boundaries:
+        found = narration_text.find(boundary["text"], cursor)
+        if found < 0:
+            continue
+        cursor = found + len(boundary["text"])
+        start = boundary["offset"] / TICKS_PER_SECOND
+        end = start + boundary["duration"] / TICKS_PER_SECOND
+        words.append([bisect.bisect_right(starts, found) - 1, start, end, boundary["text"]])
+    return words
+
+
+def slide_cuts(words, n_slides):
+    """
+    Start of every slide in the deck narration (seconds): the middle of
+    the pause between one slide's last word and the next slide's first.
+    Raises ValueError if a slide has no located words.
+    """
+    first, last = {}, {}
+    for slide, start, end, _ in words:
+        first.setdefault(slide, start)
+        last[slide] = end
+    missing = [i for i in range(n_slides) if i not in first]
+    if missing:
+        raise ValueError(f"No word boundaries for slides {missing}")
+    return [0.0] + [(last[i - 1] + first[i]) / 2 for i in range(1, n_slides)]
+
+
+async def deck_to_speech(
+    texts,
+    voice: str = DEFAULT_VOICE,
+    rate: str = DEFAULT_RATE,
+    pitch: str = DEFAULT_PITCH,
+):
+    """
+    Narrate a whole deck in one edge-tts stream (one connection instead
+    of one per slide).
+
+    Input:
+    - texts: narration text of every slide, in order
+    Output:
+    - (path to one .mp3 for the deck, words), words being
+      [slide, start, end, word] in seconds from the WordBoundary events
+    """
+    narration_text, starts = deck_narration_text(texts)
+    key = cache_key("deck", narration_text, voice, rate, pitch)
 
-    return output_path
+    cached_path, words = await asyncio.to_thread(_cached, key)
+    if words is not None:
+        return cached_path, words
 
+    words = await _synthesize(key, narration_text, starts, voice, rate, pitch)
+    return TTS_CACHE.path_for(key), words
 
 
 # -------------------------------------------------
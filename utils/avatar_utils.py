@@ -6,50 +6,121 @@ Design goals:
 - Subtle motion (no distraction)
 - Syncs with audio duration
 - Easily replaceable with real lip-sync later
+- Motion is pre-rendered once and looped (no per-frame resize)
+- Size and placement scale with the render profile
 """
 
 import os
-from moviepy.editor import ImageClip, CompositeVideoClip
+import math
+from functools import lru_cache
+from moviepy.editor import VideoClip
+from PIL import Image
 import numpy as np
 
+from utils.render_profiles import get_profile
+
 # -------------------------------------------------
 # CONFIG
 # -------------------------------------------------
 DEFAULT_AVATAR_PATH = "assets/avatar/avatar.png"  # Provide a clean PNG avatar
+# Sizes below are 1080p pixels, scaled by the render profile
 AVATAR_HEIGHT = 220  # Professional size (not too big)
 
+# Motion (one full cycle = lcm of both periods = 12 s)
+BREATH_PERIOD = 4  # seconds
+BREATH_AMPLITUDE = 0.015  # +-1.5% scale
+SWAY_PERIOD = 6  # seconds
+SWAY_PIXELS = 4
+CYCLE_SECONDS = math.lcm(BREATH_PERIOD, SWAY_PERIOD)
+
+# Left edge of the (un-swayed) avatar and its gap to the frame bottom
+AVATAR_X = 60
+AVATAR_BOTTOM_MARGIN = 40
+
+
+# -------------------------------------------------
+# PRE-RENDERED MOTION CYCLE
+# -------------------------------------------------
+@lru_cache(maxsize=4)
+def load_avatar_cycle(avatar_path=DEFAULT_AVATAR_PATH, height=AVATAR_HEIGHT, fps=24, sway_pixels=SWAY_PIXELS):
+    """
+    Render one full breathing + sway cycle, once per avatar / size / fps.
+
+    Every frame shares one transparent canvas large enough for the biggest
+    scale plus the sway range, so the clip itself never moves or resizes.
+
+    Returns (rgb, alpha): uint8 arrays of shape (N, H, W, 3) and (N, H, W)
+    """
+    with Image.open(avatar_path) as img:
+        base = img.convert("RGBA")
+    base_width = round(base.width * height / base.height)
+    base = base.resize((base_width, height), Image.LANCZOS)
+
+    max_scale = 1 + BREATH_AMPLITUDE
+    canvas_size = (
+        math.ceil(base_width * max_scale) + 2 * sway_pixels,
+        math.ceil(height * max_scale),
+    )
+
+    frame_count = CYCLE_SECONDS * fps
+    rgb = np.empty((frame_count, canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
+    alpha = np.empty((frame_count, canvas_size[1], canvas_size[0]), dtype=np.uint8)
+
+    for i in range(frame_count):
+        t = i / fps
+        scale = 1 + BREATH_AMPLITUDE * np.sin(2 * np.pi * t / BREATH_PERIOD)
+        sway = sway_pixels * np.sin(2 * np.pi * t / SWAY_PERIOD)
+
+        # Scale from the top-left corner, like a moving ImageClip.resize would
+        frame = base.resize((round(base_width * scale), round(height * scale)), Image.BILINEAR)
+        canvas = Image.new("RGBA", canvas_size, (0, 0, 0, 0))
+        canvas.paste(frame, (round(sway_pixels + sway), 0))
+
+        pixels = np.asarray(canvas)
+        rgb[i] = pixels[:, :, :3]
+        alpha[i] = pixels[:, :, 3]
+
+    return rgb, alpha
+
 
 # -------------------------------------------------
 # AVATAR CLIP GENERATOR
 # -------------------------------------------------
-def create_avatar_clip(duration, position=("left", "bottom")):
+def create_avatar_clip(duration, position=("left", "bottom"), profile=None):
     """
     Create an animated avatar clip for a slide
 
     Animation:
     - Gentle breathing (scale)
     - Subtle side sway
+
+    Frames are looked up in the cached motion cycle, rendered at the
+    profile's frame rate and scale.
     """
 
     if not os.path.exists(DEFAULT_AVATAR_PATH):
         return None
 
-    avatar = ImageClip(DEFAULT_AVATAR_PATH).resize(height=AVATAR_HEIGHT)
-    avatar = avatar.set_duration(duration)
+    profile = get_profile(profile)
+    sway_pixels = profile.px(SWAY_PIXELS)
+    rgb, alpha = load_avatar_cycle(
+        DEFAULT_AVATAR_PATH, profile.px(AVATAR_HEIGHT), profile.fps, sway_pixels
+    )
+    frame_count = len(rgb)
 
-    # -----------------------------
-    # SUBTLE BREATHING EFFECT
-    # -----------------------------
-    avatar = avatar.resize(lambda t: 1 + 0.015 * np.sin(2 * np.pi * t / 4))
+    def frame_index(t):
+        return int(round(t * profile.fps)) % frame_count
 
-    # -----------------------------
-    # SUBTLE HEAD SWAY
-    # -----------------------------
-    def avatar_position(t):
-        sway = 4 * np.sin(2 * np.pi * t / 6)
-        return (60 + sway, 720 - AVATAR_HEIGHT - 40)
+    avatar = VideoClip(lambda t: rgb[frame_index(t)], duration=duration)
+    mask = VideoClip(lambda t: alpha[frame_index(t)] / 255.0, ismask=True, duration=duration)
+    avatar = avatar.set_mask(mask)
 
-    avatar = avatar.set_position(avatar_position)
+    # Sway is baked into the frames, so the position is fixed
+    # (bottom-left of the actual frame, whatever the profile's height)
+    avatar = avatar.set_position((
+        profile.px(AVATAR_X) - sway_pixels,
+        profile.size[1] - rgb.shape[1] - profile.px(AVATAR_BOTTOM_MARGIN),
+    ))
 
     return avatar
 
@@ -57,12 +128,71 @@ def create_avatar_clip(duration, position=("left", "bottom")):
 # -------------------------------------------------
 # AVATAR OVERLAY HELPER
 # -------------------------------------------------
-def add_avatar_to_slide(slide_clip, audio_duration):
+def _overlay_region(frame_shape, pos, overlay_shape):
+    """
+    Slices of the frame and of the overlay where they intersect.
+    """
+    x, y = int(round(pos[0])), int(round(pos[1]))
+    h, w = overlay_shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, frame_shape[1]), min(y + h, frame_shape[0])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (
+        (slice(y0, y1), slice(x0, x1)),
+        (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)),
+    )
+
+
+def add_avatar_to_slide(slide_clip, audio_duration, profile=None):
     """
     Overlay avatar on an existing slide clip
+
+    Only the avatar's own rectangle is blended per frame; the rest of
+    the slide frame is passed through (same result as compositing the
+    two clips, without a second full-frame blend).
     """
-    avatar_clip = create_avatar_clip(audio_duration)
+    avatar_clip = create_avatar_clip(audio_duration, profile=profile)
     if avatar_clip is None:
         return slide_clip
 
-    return CompositeVideoClip([slide_clip, avatar_clip])
+    def make_frame(t):
+        frame = slide_clip.get_frame(t)
+        slide_mask = slide_clip.mask.get_frame(t) if slide_clip.mask is not None else None
+
+        # Outside the fades the slide mask is all ones: skip the full-frame blend
+        if slide_mask is not None and slide_mask.min() < 1:
+            frame = (frame * slide_mask[:, :, None]).astype(np.uint8)
+        else:
+            frame = frame.copy()
+
+        region = _overlay_region(frame.shape, avatar_clip.pos(t), avatar_clip.size[::-1])
+        if region is not None:
+            frame_slice, avatar_slice = region
+            alpha = avatar_clip.mask.get_frame(t)[avatar_slice][:, :, None]
+            avatar = avatar_clip.get_frame(t)[avatar_slice]
+            frame[frame_slice] = (alpha * avatar + (1 - alpha) * frame[frame_slice]).astype(np.uint8)
+
+        return frame
+
+    clip = VideoClip(make_frame, duration=slide_clip.duration)
+    clip = clip.set_audio(slide_clip.audio)
+
+    if slide_clip.mask is not None:
+        # Keep the slide's fade mask, with the avatar always opaque on top
+        def make_mask(t):
+            mask = slide_clip.mask.get_frame(t)
+            if mask.min() >= 1:
+                return mask
+
+            region = _overlay_region(mask.shape, avatar_clip.pos(t), avatar_clip.size[::-1])
+            if region is not None:
+                mask = mask.copy()
+                mask_slice, avatar_slice = region
+                alpha = avatar_clip.mask.get_frame(t)[avatar_slice]
+                mask[mask_slice] = alpha + (1 - alpha) * mask[mask_slice]
+            return mask
+
+        clip = clip.set_mask(VideoClip(make_mask, ismask=True, duration=slide_clip.duration))
+
+    return clip
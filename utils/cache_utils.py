@@ -0,0 +1,226 @@
+"""
+On-disk cache utilities for training video generation
+
+Goals:
+- Content-addressed entries (same inputs -> same file)
+- Atomic writes (readers never see a half-written file)
+- Size cap with LRU eviction
+- Hit / miss counters for monitoring
+- Read-through / write-through to the shared artifact store
+  (utils/storage_utils.py), so workers reuse each other's entries
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from utils import storage_utils, trace_utils
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+CACHE_ROOT = os.getenv("CACHE_DIR", "cache")
+
+
+# -------------------------------------------------
+# KEY HELPER
+# -------------------------------------------------
+def cache_key(*parts) -> str:
+    """
+    Stable SHA-256 key for any JSON-serialisable inputs.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------
+# FILE CACHE
+# -------------------------------------------------
+class FileCache:
+    """
+    Directory of `<key><suffix>` files capped at `max_bytes`.
+
+    Recency is tracked with the file mtime (touched on every hit),
+    so the least recently used entries are evicted first. Safe to share
+    between threads and processes: entries are published with os.replace.
+
+    With a shared store configured (STORAGE_URL) a local miss is looked
+    up as cache/<directory name>/<key><suffix> there, and every new entry
+    is uploaded; the byte cap only applies to the local copies. Uploads
+    skip keys the store already has, unless `overwrite` is set: for
+    caches whose entries are re-stored under the same key (JSON read
+    with a ttl), so an expired shared copy gets replaced.
+    """
+
+    def __init__(self, directory, max_bytes, suffix="", overwrite=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.overwrite = overwrite
+        self.shared_prefix = f"cache/{os.path.basename(os.path.normpath(directory))}"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def shared_key(self, key) -> str:
+        return f"{self.shared_prefix}/{key}{self.suffix}"
+
+    def _pull(self, key) -> bool:
+        """Copy a shared-store entry missing locally into the directory."""
+        if not storage_utils.pull(self.shared_key(key), self.path_for(key)):
+            return False
+        self.evict(keep=key)
+        return True
+
+    def get(self, key):
+        """
+        Path of a cached entry, or None on a miss.
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            if self._pull(key):
+                with self._lock:
+                    self.hits += 1
+                trace_utils.count("cache_hits")
+                return path
+            with self._lock:
+                self.misses += 1
+            trace_utils.count("cache_misses")
+            return None
+
+        with self._lock:
+            self.hits += 1
+        trace_utils.count("cache_hits")
+        return path
+
+    def get_json(self, key, ttl=None):
+        """
+        Load a JSON entry written by put_json, or None on a miss.
+        Entries older than `ttl` seconds are deleted and count as misses.
+        """
+        path = self.path_for(key)
+        entry = None
+        for attempt in range(2):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                if attempt == 0 and self._pull(key):
+                    continue  # read the copy from the shared store
+            except json.JSONDecodeError:
+                pass
+            break
+
+        if entry is not None and ttl is not None and time.time() - entry["created_at"] > ttl:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            entry = None
+
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            trace_utils.count("cache_misses")
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass  # evicted meanwhile; the loaded data is still valid
+        with self._lock:
+            self.hits += 1
+        trace_utils.count("cache_hits")
+        return entry["data"]
+
+    def put_json(self, key, data, share=True):
+        """
+        Atomically store a JSON-serialisable value.
+        """
+        with self.writer(key, share) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time(), "data": data}, f, ensure_ascii=False)
+
+    def put_file(self, key, path):
+        """
+        Move an existing file into the cache as `key`; returns the entry path.
+        """
+        with self.writer(key) as tmp_path:
+            shutil.move(path, tmp_path)
+        return self.path_for(key)
+
+    def share(self, key):
+        """Upload an entry to the shared store (no-op without one)."""
+        storage_utils.push(self.shared_key(key), self.path_for(key), overwrite=self.overwrite)
+
+    @contextmanager
+    def writer(self, key, share=True):
+        """
+        Yield a temp path in the cache directory; on success it is
+        atomically renamed to the entry path, on error it is removed.
+        share=False leaves the upload to a later share(key) call (e.g.
+        off the event loop).
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            yield tmp_path
+            os.replace(tmp_path, self.path_for(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if share:
+            self.share(key)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        Delete least recently used entries until the cache fits max_bytes.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or not entry.name.endswith(self.suffix):
+                    continue
+                if entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        keep_path = self.path_for(keep) if keep else None
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep_path:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass  # already evicted by another worker
+
+        logger.info(f"Cache {self.directory} trimmed to {total} bytes")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,89 @@
+"""
+Capability probe for external binaries
+
+Goals:
+- Detect optional tools (Tesseract OCR, ffmpeg) once per process, when a
+  stage first needs them, instead of as a side effect of importing
+- One place that says what this machine can do
+"""
+
+import logging
+import os
+import platform
+import shutil
+from dataclasses import dataclass
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    tesseract: str   # Tesseract binary, or None (OCR disabled)
+    ffmpeg: str      # ffmpeg binary (same one MoviePy uses), or None
+
+    @property
+    def ocr(self) -> bool:
+        return self.tesseract is not None
+
+
+# -------------------------------------------------
+# DETECTION
+# -------------------------------------------------
+def find_tesseract():
+    """
+    Finds the Tesseract binary path dynamically based on the OS.
+    """
+    # 1. Check if it's already in the system PATH (Best for Linux/Cloud)
+    path = shutil.which("tesseract")
+    if path:
+        return path
+
+    # 2. Fallback for common Windows installation paths
+    if platform.system() == "Windows":
+        common_paths = [
+            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+            os.path.expanduser(r"~\AppData\Local\Tesseract-OCR\tesseract.exe")
+        ]
+        for p in common_paths:
+            if os.path.exists(p):
+                return p
+
+    # 3. Fallback for Linux (Standard location)
+    linux_path = "/usr/bin/tesseract"
+    if os.path.exists(linux_path):
+        return linux_path
+
+    return None
+
+
+def find_ffmpeg():
+    """
+    MoviePy's ffmpeg (FFMPEG_BINARY, else the imageio-ffmpeg download)
+    without importing MoviePy.
+    """
+    binary = os.getenv("FFMPEG_BINARY", "ffmpeg-imageio")
+    if binary == "auto-detect":
+        return shutil.which("ffmpeg")
+    if binary != "ffmpeg-imageio":
+        return binary
+
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which("ffmpeg")
+
+
+# -------------------------------------------------
+# PROBE (ONCE PER PROCESS)
+# -------------------------------------------------
+@lru_cache(maxsize=None)
+def probe() -> Capabilities:
+    capabilities = Capabilities(tesseract=find_tesseract(), ffmpeg=find_ffmpeg())
+    if not capabilities.ocr:
+        logger.warning("Tesseract OCR not found. OCR features will be disabled.")
+    if not capabilities.ffmpeg:
+        logger.warning("ffmpeg not found. Video rendering will fail.")
+    return capabilities
@@ -0,0 +1,196 @@
+"""
+Captions for training video generation
+
+Goals:
+- Subtitle cues timed by the narration's own word boundaries (edge-tts
+  WordBoundary events), not by estimates
+- SRT and WebVTT files next to every video (searchable, web players)
+- A soft mov_text subtitle track muxed into the MP4 (stream copy: no
+  re-encode, no per-frame cost)
+- Optionally only the current cue burned into the frames, instead of
+  the whole slide narration
+
+Modes (CAPTIONS, or spec["captions"]):
+    "soft"  SRT / VTT files + subtitle track in the MP4 (default)
+    "burn"  SRT / VTT files + the current cue drawn on the slide
+    "off"   no captions
+"""
+
+import logging
+import os
+import re
+import subprocess
+import uuid
+from dataclasses import dataclass
+
+from utils.audio_utils import words_for
+from utils.capabilities import probe
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+CAPTIONS_MODE = os.getenv("CAPTIONS", "soft")
+CAPTION_MAX_CHARS = 42       # one comfortable subtitle line
+CAPTION_MAX_SECONDS = 4.0
+CAPTION_MIN_SECONDS = 1.0    # short cues are held (until the next one starts)
+CAPTION_PAUSE_SECONDS = 0.6  # a longer silence always starts a new cue
+
+# ISO 639-2 code of the subtitle track, from the voice's locale
+LANGUAGES = {"en": "eng", "hi": "hin", "bn": "ben"}
+
+
+@dataclass(frozen=True)
+class Cue:
+    start: float  # seconds in the video
+    end: float
+    text: str
+    slide: int
+
+
+# -------------------------------------------------
+# WORDS → CUES
+# -------------------------------------------------
+def video_words(timeline):
+    """
+    Every narrated word as [slide, start, end, word] in video time, for a
+    timeline from video_utils.deck_timeline. Slides whose narration has
+    no recorded word timings are left out.
+    """
+    if timeline.narration:
+        # One track from the start of the video: track time == video time
+        return words_for(timeline.narration) or []
+
+    words = []
+    for i, slide in enumerate(timeline.slides):
+        slide_words = words_for(slide.audio_path)
+        if slide_words is None:
+            logger.warning(f"No word timings for slide {i + 1}; it gets no captions")
+            continue
+        words += [[i, slide.start + start, slide.start + end, word] for _, start, end, word in slide_words]
+    return words
+
+
+def build_cues(words, max_chars=CAPTION_MAX_CHARS, max_seconds=CAPTION_MAX_SECONDS):
+    """
+    Group words into cues of at most `max_chars` / `max_seconds`, breaking
+    at slide changes and pauses. A cue stays up until its last word ends
+    (at least CAPTION_MIN_SECONDS, never past the next cue).
+    """
+    groups = []
+    for slide, start, end, word in words:
+        group = groups[-1] if groups else None
+        if (
+            group is None
+            or slide != group["slide"]
+            or start - group["end"] > CAPTION_PAUSE_SECONDS
+            or end - group["start"] > max_seconds
+            or len(group["text"]) + 1 + len(word) > max_chars
+        ):
+            groups.append({"slide": slide, "start": start, "end": end, "text": word})
+        else:
+            group["end"] = end
+            group["text"] += " " + word
+
+    cues = []
+    for i, group in enumerate(groups):
+        end = max(group["end"], group["start"] + CAPTION_MIN_SECONDS)
+        if i + 1 < len(groups):
+            end = min(end, groups[i + 1]["start"])
+        cues.append(Cue(group["start"], max(end, group["end"]), _tidy(group["text"]), group["slide"]))
+    return cues
+
+
+def _tidy(text):
+    """No space before punctuation the service reports as its own word."""
+    return re.sub(r"\s+([,.;:!?])", r"\1", text)
+
+
+def slide_cues(cues, timeline):
+    """
+    Cues of every slide relative to the slide's own start, as
+    [(start, end, text), ...] per slide (for burned-in captions).
+    """
+    per_slide = [[] for _ in timeline.slides]
+    for cue in cues:
+        slide = timeline.slides[cue.slide]
+        start = max(cue.start - slide.start, 0.0)
+        end = min(cue.end - slide.start, slide.duration)
+        if end > start:
+            per_slide[cue.slide].append((round(start, 3), round(end, 3), cue.text))
+    return per_slide
+
+
+# -------------------------------------------------
+# SRT / WEBVTT
+# -------------------------------------------------
+def _timestamp(seconds, separator):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def format_srt(cues) -> str:
+    return "".join(
+        f"{i}\n{_timestamp(cue.start, ',')} --> {_timestamp(cue.end, ',')}\n{cue.text}\n\n"
+        for i, cue in enumerate(cues, start=1)
+    )
+
+
+def format_vtt(cues) -> str:
+    return "WEBVTT\n\n" + "".join(
+        f"{_timestamp(cue.start, '.')} --> {_timestamp(cue.end, '.')}\n{cue.text}\n\n"
+        for cue in cues
+    )
+
+
+def caption_paths(video_path):
+    """(.srt, .vtt) paths next to a video."""
+    base = os.path.splitext(video_path)[0]
+    return f"{base}.srt", f"{base}.vtt"
+
+
+def write_captions(cues, video_path):
+    """Write the SRT and WebVTT files next to the video; returns their paths."""
+    srt_path, vtt_path = caption_paths(video_path)
+    for path, text in ((srt_path, format_srt(cues)), (vtt_path, format_vtt(cues))):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return srt_path, vtt_path
+
+
+# -------------------------------------------------
+# SOFT SUBTITLE TRACK
+# -------------------------------------------------
+def language_for(voice) -> str:
+    """Subtitle language code for an edge-tts voice ("en-IN-..." -> "eng")."""
+    return LANGUAGES.get((voice or "").split("-")[0].lower(), "und")
+
+
+def mux_captions(video_path, srt_path, language="und"):
+    """
+    Add the SRT as a mov_text subtitle track to the MP4, in place
+    (audio and video are stream-copied).
+    """
+    tmp_path = f"{video_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        subprocess.run(
+            [
+                probe().ffmpeg, "-y", "-loglevel", "error",
+                "-i", video_path, "-i", srt_path,
+                "-map", "0:v", "-map", "0:a?", "-map", "1:s",
+                "-c", "copy", "-c:s", "mov_text",
+                "-metadata:s:s:0", f"language={language}",
+                "-movflags", "+faststart", "-f", "mp4",
+                tmp_path,
+            ],
+            check=True,
+        )
+        os.replace(tmp_path, video_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return video_path
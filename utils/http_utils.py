@@ -0,0 +1,366 @@
+"""
+Shared HTTP client for external APIs (Unsplash)
+
+Goals:
+- One pooled keep-alive session per process instead of a new TCP/TLS
+  handshake for every request
+- Retry transient failures (connection errors, 429, 5xx) with jittered
+  exponential backoff, honouring Retry-After
+- One request budget per API shared by every job and worker process
+  (SQLite token bucket), paused when the API reports its quota is spent
+- Streaming downloads with a size cap, published atomically
+- aiohttp variants for concurrent fetches from async code
+
+Usage:
+    data = get_json(url, limiter=UNSPLASH_LIMITER, headers=..., params=...)
+    download(image_url, image_path)
+
+    async with open_async_session() as session:
+        await download_async(session, image_url, image_path)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import trace_utils
+from utils.cache_utils import CACHE_ROOT
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))  # keep-alive connections per host
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # API calls; per connect / read for downloads
+# Whole download (up to MAX_DOWNLOAD_MB); a stalled one fails after HTTP_TIMEOUT
+HTTP_DOWNLOAD_TIMEOUT = float(os.getenv("HTTP_DOWNLOAD_TIMEOUT", "300"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF_SECONDS", "0.5"))  # doubled per attempt
+HTTP_BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+MAX_DOWNLOAD_BYTES = int(os.getenv("MAX_DOWNLOAD_MB", "15")) * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", os.path.join(CACHE_ROOT, "rate_limits.sqlite3"))
+# Longest a request waits for the shared budget before giving up
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60"))
+
+RATE_LIMIT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    paused_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+# -------------------------------------------------
+# SHARED RATE LIMIT (ALL PROCESSES)
+# -------------------------------------------------
+class RateLimiter:
+    """
+    Token bucket in SQLite, shared by every process using the same
+    `db_path`: `rate` requests per second with bursts of up to `burst`.
+
+    observe() reads the API's rate-limit headers and pauses the bucket
+    for `cooldown` seconds once the remaining quota reaches zero.
+    """
+
+    def __init__(self, name, rate, burst, cooldown=60.0, db_path=RATE_LIMIT_DB,
+                 remaining_header="X-Ratelimit-Remaining"):
+        if rate <= 0 or burst < 1:
+            raise ValueError(
+                f"Rate limit '{name}' needs rate > 0 and burst >= 1 (got {rate}, {burst}); "
+                "pass no limiter to disable it"
+            )
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.cooldown = cooldown
+        self.db_path = db_path
+        self.remaining_header = remaining_header
+        self._local = threading.local()
+
+    def _connect(self):
+        """
+        This thread's connection (opened once: every request takes a
+        token, so reconnecting per call would double its cost). Writers
+        from other processes are waited for, not failed on.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(RATE_LIMIT_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _update(self, take=False, pause=0.0) -> float:
+        """
+        Refill the bucket, then take a token and/or extend the pause.
+        Returns how long to wait before a token is available (0 = taken).
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated, paused_until FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            tokens, updated, paused_until = row or (self.burst, now, 0.0)
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            paused_until = max(paused_until, now + pause) if pause else paused_until
+
+            wait = 0.0
+            if take:
+                if now < paused_until:
+                    wait = paused_until - now
+                elif tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated, paused_until) VALUES (?, ?, ?, ?)",
+                (self.name, tokens, now, paused_until),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _check_wait(self, wait, waited, max_wait):
+        if waited + wait > max_wait:
+            raise RuntimeError(f"Rate limit '{self.name}': no request budget within {max_wait:.0f}s")
+
+    def acquire(self, max_wait=RATE_LIMIT_MAX_WAIT):
+        waited = 0.0
+        while True:
+            wait = self._update(take=True)
+            if not wait:
+                return
+            self._check_wait(wait, waited, max_wait)
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, max_wait=RATE_LIMIT_MAX_WAIT):
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self._update, True)
+            if not wait:
+                return
+            self._check_wait(wait, waited, max_wait)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def observe(self, headers):
+        """Pause every process's requests once the API says the quota is spent."""
+        remaining = headers.get(self.remaining_header)
+        if remaining is None or not remaining.strip().isdigit() or int(remaining) > 0:
+            return
+        logger.warning(f"Rate limit '{self.name}' exhausted; pausing requests for {self.cooldown:.0f}s")
+        self._update(pause=self.cooldown)
+
+
+# -------------------------------------------------
+# RETRY POLICY
+# -------------------------------------------------
+def backoff_delay(attempt, retry_after=None) -> float:
+    """
+    Retry-After when the server sends one (seconds form), otherwise
+    "full jitter" exponential backoff.
+    """
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), HTTP_BACKOFF_MAX)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF * 2 ** attempt))
+
+
+def _too_large(url, max_bytes):
+    return ValueError(f"Download larger than {max_bytes} bytes: {url}")
+
+
+def _partial_path(path):
+    return f"{path}.{uuid.uuid4().hex[:8]}.part"
+
+
+# -------------------------------------------------
+# SYNC CLIENT (REQUESTS)
+# -------------------------------------------------
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide session with a keep-alive connection pool."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def request(method, url, limiter=None, retries=HTTP_RETRIES, **kwargs) -> requests.Response:
+    """
+    Session request with retries; raises for a final HTTP error status.
+    Streamed responses (stream=True) must be closed by the caller.
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.acquire()
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.info(f"{method} {url} failed ({e}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+        else:
+            if limiter:
+                limiter.observe(response.headers)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                if not response.ok:
+                    response.close()
+                response.raise_for_status()
+                return response
+            delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            logger.info(
+                f"{method} {url} -> {response.status_code}; retry {attempt + 1}/{retries} in {delay:.1f}s"
+            )
+            response.close()
+        time.sleep(delay)
+
+
+def get_json(url, limiter=None, **kwargs):
+    response = request("GET", url, limiter=limiter, **kwargs)
+    trace_utils.count("bytes_downloaded", len(response.content))
+    return response.json()
+
+
+def download(url, path, max_bytes=MAX_DOWNLOAD_BYTES, limiter=None, **kwargs) -> int:
+    """
+    Stream `url` to `path` (published atomically); raises ValueError
+    once the body exceeds `max_bytes`. Returns the number of bytes.
+    """
+    part_path = _partial_path(path)
+    received = 0
+    with request("GET", url, limiter=limiter, stream=True, **kwargs) as response:
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise _too_large(url, max_bytes)
+        try:
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise _too_large(url, max_bytes)
+                    f.write(chunk)
+            os.replace(part_path, path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    trace_utils.count("bytes_downloaded", received)
+    return received
+
+
+# -------------------------------------------------
+# ASYNC CLIENT (AIOHTTP)
+# -------------------------------------------------
+def open_async_session() -> aiohttp.ClientSession:
+    """
+    Pooled session for the running event loop; use as
+    `async with open_async_session() as session:`.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=HTTP_POOL_SIZE),
+        timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+    )
+
+
+async def request_async(session, method, url, limiter=None, retries=HTTP_RETRIES, **kwargs):
+    """
+    request() for aiohttp; the caller releases the response
+    (`async with await request_async(...) as response:`).
+    """
+    for attempt in range(retries + 1):
+        if limiter:
+            await limiter.acquire_async()
+        try:
+            response = await session.request(method, url, **kwargs)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.info(f"{method} {url} failed ({e!r}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+        else:
+            if limiter:
+                await asyncio.to_thread(limiter.observe, response.headers)
+            if response.status not in RETRY_STATUSES or attempt == retries:
+                if not response.ok:
+                    response.release()
+                response.raise_for_status()
+                return response
+            delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            logger.info(f"{method} {url} -> {response.status}; retry {attempt + 1}/{retries} in {delay:.1f}s")
+            response.release()
+        await asyncio.sleep(delay)
+
+
+async def get_json_async(session, url, limiter=None, **kwargs):
+    async with await request_async(session, "GET", url, limiter=limiter, **kwargs) as response:
+        body = await response.read()
+        trace_utils.count("bytes_downloaded", len(body))
+        return json.loads(body)
+
+
+async def download_async(session, url, path, max_bytes=MAX_DOWNLOAD_BYTES, limiter=None, **kwargs) -> int:
+    """
+    download() for aiohttp. The session's total timeout is sized for API
+    calls; a download gets HTTP_TIMEOUT per connect and per read instead,
+    within HTTP_DOWNLOAD_TIMEOUT overall.
+    """
+    kwargs.setdefault("timeout", aiohttp.ClientTimeout(
+        total=HTTP_DOWNLOAD_TIMEOUT, sock_connect=HTTP_TIMEOUT, sock_read=HTTP_TIMEOUT
+    ))
+    part_path = _partial_path(path)
+    received = 0
+    async with await request_async(session, "GET", url, limiter=limiter, **kwargs) as response:
+        if response.content_length and response.content_length > max_bytes:
+            raise _too_large(url, max_bytes)
+        try:
+            with open(part_path, "wb") as f:
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise _too_large(url, max_bytes)
+                    f.write(chunk)
+            os.replace(part_path, path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    trace_utils.count("bytes_downloaded", received)
+    return received
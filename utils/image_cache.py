@@ -0,0 +1,223 @@
+"""
+Image cache for training video generation
+
+Goals:
+- Know where every cached photo came from (query, source URL, size)
+- Byte budget over images_cache/ with least-recently-used eviction
+- Decoded / cropped variants per render resolution, so a photo is
+  decoded and resized once instead of on every slide and every render
+- Safe to share between job and render worker processes (SQLite index,
+  files published with os.replace)
+
+Layout:
+    images_cache/<md5(query)>.jpg      original photos (Unsplash)
+    images_cache/variants/<key>.<ext>  derived files (see variant_path)
+    images_cache/index.sqlite3         one row per file
+"""
+
+import logging
+import os
+import sqlite3
+import time
+import uuid
+
+import numpy as np
+from PIL import Image
+
+from utils.cache_utils import cache_key
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+IMAGES_DIR = os.getenv("IMAGES_DIR", "images_cache")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "1000")) * 1024 * 1024
+# Files used this recently are never evicted (a job may still be rendering them)
+EVICT_GRACE_SECONDS = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    source TEXT,             -- original image of a variant (NULL for originals)
+    query TEXT,
+    url TEXT,
+    width INTEGER,
+    height INTEGER,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_last_access ON files (last_access);
+CREATE INDEX IF NOT EXISTS files_source ON files (source);
+"""
+
+
+# -------------------------------------------------
+# IMAGE CACHE
+# -------------------------------------------------
+class ImageCache:
+    """
+    Directory of photos and their variants, indexed in SQLite and
+    capped at `max_bytes` (least recently used first).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @property
+    def db_path(self):
+        return os.path.join(self.directory, "index.sqlite3")
+
+    def _connect(self):
+        os.makedirs(os.path.join(self.directory, "variants"), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    # --- originals ---
+    def touch(self, path) -> bool:
+        """
+        True if `path` is on disk; records the access. Files from before
+        the index existed are indexed on first use.
+        """
+        if not os.path.exists(path):
+            return False
+        conn = self._connect()
+        try:
+            updated = conn.execute(
+                "UPDATE files SET last_access = ? WHERE path = ?", (time.time(), path)
+            ).rowcount
+        finally:
+            conn.close()
+        if not updated:
+            self.add(path)
+        return True
+
+    def add(self, path, query=None, url=None, source=None):
+        """Index a file that was just written, then enforce the budget."""
+        width = height = None
+        if source is None:
+            try:
+                with Image.open(path) as img:  # header only
+                    width, height = img.size
+            except OSError:
+                pass
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO files "
+                "(path, source, query, url, width, height, bytes, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, source, query, url, width, height, os.path.getsize(path), now, now),
+            )
+        finally:
+            conn.close()
+        self.evict()
+
+    def info(self, path):
+        """Index row for `path` as a dict, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    # --- variants ---
+    def variant_path(self, image_path, name, suffix) -> str:
+        """
+        Path of the `name` variant of an image (e.g. "bg_1920x1080").
+        The key includes the source's mtime, so a replaced file gets
+        fresh variants.
+        """
+        key = cache_key(os.path.abspath(image_path), os.path.getmtime(image_path), name)
+        return os.path.join(self.directory, "variants", f"{key}{suffix}")
+
+    def get_variant(self, image_path, name, suffix):
+        """Path of a cached variant, or None."""
+        path = self.variant_path(image_path, name, suffix)
+        return path if self.touch(path) else None
+
+    def put_variant(self, image_path, name, suffix, write) -> str:
+        """
+        Create a variant with write(tmp_path) and publish it atomically.
+        """
+        path = self.variant_path(image_path, name, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp{suffix}"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.add(path, source=image_path)
+        return path
+
+    def array_variant(self, image_path, name, build) -> np.ndarray:
+        """
+        Decoded variant as an array; build() makes it on a miss.
+        Stored as .npy so a hit is a plain read, no JPEG decode.
+        """
+        path = self.get_variant(image_path, name, ".npy")
+        if path:
+            try:
+                return np.load(path)
+            except (OSError, ValueError):
+                pass  # evicted or torn since the lookup: rebuild
+
+        array = build()
+        self.put_variant(image_path, name, ".npy", lambda tmp_path: np.save(tmp_path, array))
+        return array
+
+    # --- budget ---
+    def evict(self):
+        """
+        Delete least recently used files until the cache fits max_bytes;
+        evicting an original also drops its variants.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM files").fetchone()[0]
+            if total <= self.max_bytes:
+                conn.execute("COMMIT")
+                return
+
+            candidates = conn.execute(
+                "SELECT path, bytes FROM files WHERE last_access < ? ORDER BY last_access",
+                (time.time() - EVICT_GRACE_SECONDS,),
+            ).fetchall()
+            removed = []
+            for row in candidates:
+                if total <= self.max_bytes:
+                    break
+                dependents = conn.execute(
+                    "SELECT path, bytes FROM files WHERE source = ?", (row["path"],)
+                ).fetchall()
+                for entry in [row, *dependents]:
+                    if entry["path"] in removed:
+                        continue
+                    removed.append(entry["path"])
+                    total -= entry["bytes"]
+
+            conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        for path in removed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        logger.info(f"Image cache trimmed to {total} bytes ({len(removed)} files evicted)")
+
+
+IMAGE_CACHE = ImageCache(IMAGES_DIR, IMAGE_CACHE_MAX_BYTES)
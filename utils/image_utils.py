@@ -5,82 +5,111 @@ Goals:
 - Preserve subject focus
 - Avoid distortion
 - Ensure professional visual consistency
+- Output size follows the render profile
+- Decode / crop / resize each photo once per resolution: reduced-size
+  JPEG decoding, results kept as arrays in the image cache
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from PIL import Image, ImageEnhance
 
+from utils.image_cache import IMAGE_CACHE
+from utils.render_profiles import get_profile
+
 # -------------------------------------------------
 # CONFIG
 # -------------------------------------------------
-TARGET_WIDTH = 1280
-TARGET_HEIGHT = 720
-ASPECT_RATIO = TARGET_WIDTH / TARGET_HEIGHT
+ASPECT_RATIO = 16 / 9
+# Decode / resize threads for a deck (Pillow releases the GIL while working)
+IMAGE_PREP_WORKERS = int(os.getenv("IMAGE_PREP_WORKERS", "4"))
 
 
 # -------------------------------------------------
 # CORE IMAGE PROCESSOR
 # -------------------------------------------------
-def prepare_slide_image(image_path):
-    """
-    Prepare an image for video slide usage:
-    - Center crop to 16:9
-    - Resize to 1280x720
-    - Enhance contrast slightly
-    """
+def crop_box(img_width, img_height):
+    """Centered 16:9 region of an image, as a (left, top, right, bottom) box."""
+    if img_width / img_height > ASPECT_RATIO:
+        # Image is wider than 16:9 → crop sides
+        new_width = img_height * ASPECT_RATIO
+        left = (img_width - new_width) / 2
+        return (left, 0, left + new_width, img_height)
 
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image not found: {image_path}")
+    # Image is taller than 16:9 → crop top/bottom
+    new_height = img_width / ASPECT_RATIO
+    top = (img_height - new_height) / 2
+    return (0, top, img_width, top + new_height)
 
-    with Image.open(image_path).convert("RGB") as img:
-        img_width, img_height = img.size
-        img_ratio = img_width / img_height
 
+def _process_image(image_path, size):
+    with Image.open(image_path) as img:
         # -----------------------------
-        # CENTER CROP TO 16:9
+        # REDUCED-SIZE DECODE
         # -----------------------------
-        if img_ratio > ASPECT_RATIO:
-            # Image is wider than 16:9 → crop sides
-            new_width = int(img_height * ASPECT_RATIO)
-            left = (img_width - new_width) // 2
-            img = img.crop((left, 0, left + new_width, img_height))
-        else:
-            # Image is taller than 16:9 → crop top/bottom
-            new_height = int(img_width / ASPECT_RATIO)
-            top = (img_height - new_height) // 2
-            img = img.crop((0, top, img_width, top + new_height))
+        # JPEGs are decoded at 1/2, 1/4 or 1/8 scale when that still
+        # covers the frame (a 5000 px original decodes at ~2500 px)
+        img.draft("RGB", size)
+        img = img.convert("RGB")
 
         # -----------------------------
-        # RESIZE FOR VIDEO
+        # CENTER CROP TO 16:9 + RESIZE FOR VIDEO (one pass)
         # -----------------------------
-        img = img.resize((TARGET_WIDTH, TARGET_HEIGHT), Image.LANCZOS)
+        img = img.resize(size, Image.LANCZOS, box=crop_box(*img.size), reducing_gap=3.0)
 
-        # -----------------------------
-        # LIGHT ENHANCEMENT (SAFE)
-        # -----------------------------
-        img = ImageEnhance.Contrast(img).enhance(1.05)
-        img = ImageEnhance.Sharpness(img).enhance(1.05)
+    # -----------------------------
+    # LIGHT ENHANCEMENT (SAFE)
+    # -----------------------------
+    img = ImageEnhance.Contrast(img).enhance(1.05)
+    img = ImageEnhance.Sharpness(img).enhance(1.05)
+    return np.asarray(img)
 
-        # -----------------------------
-        # SAVE PROCESSED IMAGE
-        # -----------------------------
-        base, _ = os.path.splitext(image_path)
-        processed_path = f"{base}_video.jpg"
-        img.save(processed_path, "JPEG", quality=92, subsampling=0)
 
-        return processed_path
+def prepare_slide_image(image_path, profile=None):
+    """
+    Prepare an image for video slide usage:
+    - Center crop to 16:9
+    - Resize to the render profile's frame size (1920x1080 for "final")
+    - Enhance contrast slightly
+    Returns the frame as a (height, width, 3) uint8 array; repeated calls
+    for the same image and size are read from the image cache.
+    """
+
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"Image not found: {image_path}")
+
+    size = get_profile(profile).size
+    return IMAGE_CACHE.array_variant(
+        image_path, f"slide_{size[0]}x{size[1]}", lambda: _process_image(image_path, size)
+    )
+
+
+def prepare_slide_images(image_paths, profile=None, max_workers=IMAGE_PREP_WORKERS):
+    """
+    prepare_slide_image for a whole deck, on a thread pool; each distinct
+    image is processed once. Returns the arrays in input order.
+    """
+    unique_paths = list(dict.fromkeys(image_paths))
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        frames = dict(zip(
+            unique_paths,
+            executor.map(lambda path: prepare_slide_image(path, profile), unique_paths),
+        ))
+    return [frames[path] for path in image_paths]
 
 # -------------------------------------------------
 # FALLBACK IMAGE GENERATOR
 # -------------------------------------------------
 
-def create_fallback_image(output_path="images/fallback_video.jpg"):
+def create_fallback_image(output_path="images/fallback_video.jpg", profile=None):
     """
     Create a clean fallback background
     when Unsplash image is missing or fails.
     """
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    img = Image.new("RGB", (TARGET_WIDTH, TARGET_HEIGHT), (30, 30, 40))
+    img = Image.new("RGB", get_profile(profile).size, (30, 30, 40))
     img.save(output_path, "JPEG", quality=90)
 
     return output_path
@@ -1,53 +1,38 @@
-import fitz  # PyMuPDF
-import pytesseract
 from PIL import Image
 import re
-import shutil
 import os
-import platform
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.cache_utils import CACHE_ROOT, FileCache, cache_key
+from utils.capabilities import probe
+from utils.storage_utils import file_digest
 
 # -------------------------------------------------
-# DYNAMIC CONFIGURATION
+# CONFIGURATION
 # -------------------------------------------------
-
-def get_tesseract_path():
-    """
-    Finds the Tesseract binary path dynamically based on the OS.
-    """
-    # 1. Check if it's already in the system PATH (Best for Linux/Cloud)
-    path = shutil.which("tesseract")
-    if path:
-        return path
-
-    # 2. Fallback for common Windows installation paths
-    if platform.system() == "Windows":
-        common_paths = [
-            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-            os.path.expanduser(r"~\AppData\Local\Tesseract-OCR\tesseract.exe")
-        ]
-        for p in common_paths:
-            if os.path.exists(p):
-                return p
-    
-    # 3. Fallback for Linux (Standard location)
-    linux_path = "/usr/bin/tesseract"
-    if os.path.exists(linux_path):
-        return linux_path
-
-    return None
-
-# Initialize Pytesseract
-TESSERACT_EXE = get_tesseract_path()
-if TESSERACT_EXE:
-    pytesseract.pytesseract.tesseract_cmd = TESSERACT_EXE
-    OCR_AVAILABLE = True
-else:
-    logging.warning("Tesseract OCR not found. OCR features will be disabled.")
-    OCR_AVAILABLE = False
+# PyMuPDF and pytesseract are imported, and Tesseract detected
+# (utils/capabilities.py), only when a PDF is actually extracted
 
 OCR_DPI = 200  # 200 is usually enough for text and faster than 300
+OCR_LANG = "eng"
+
+# OCR trigger: too little native text, OR images cover a real part of the
+# page and the native text layer covers much less than the images do
+OCR_MIN_LINES = 5
+OCR_MIN_IMAGE_COVERAGE = 0.15
+OCR_TEXT_TO_IMAGE_RATIO = 0.5
+
+# Page-level parallelism (small PDFs stay in-process: spawning costs more)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_PAGES = 8
+
+# Per-page result cache: (pdf hash, page no, OCR settings) -> lines
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PDF_PAGE_CACHE_MAX_MB", "100")) * 1024 * 1024
+PAGE_CACHE = FileCache(
+    os.path.join(CACHE_ROOT, "pdf_pages"), max_bytes=PAGE_CACHE_MAX_BYTES, suffix=".json"
+)
 
 # -------------------------------------------------
 # HELPERS
@@ -60,60 +45,155 @@ def clean_line(text):
 
 def ocr_page(page):
     """Convert PDF page to image and perform OCR."""
-    if not OCR_AVAILABLE:
+    if not probe().ocr:
         return []
 
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = probe().tesseract
+
     try:
         # Higher DPI improves OCR accuracy for small text
         pix = page.get_pixmap(dpi=OCR_DPI)
         img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
         
         # Performance tip: Use 'eng' lang or specify others if needed
-        text = pytesseract.image_to_string(img, lang='eng')
+        text = pytesseract.image_to_string(img, lang=OCR_LANG)
         return [clean_line(l) for l in text.split("\n") if clean_line(l)]
     except Exception as e:
         logging.error(f"OCR Error on page: {e}")
         return []
 
+def _covered_fraction(page, rects):
+    """Fraction of the page area covered by rects (clipped to the page)."""
+    import fitz  # PyMuPDF
+
+    page_area = page.rect.width * page.rect.height
+    if not page_area:
+        return 0.0
+    area = 0.0
+    for rect in rects:
+        clipped = fitz.Rect(rect) & page.rect
+        if not clipped.is_empty:
+            area += clipped.width * clipped.height
+    return min(1.0, area / page_area)
+
+def needs_ocr(page, page_lines):
+    """
+    Decide whether OCR can add anything to the native text of a page.
+
+    A logo or small photo on a text page does not trigger OCR;
+    a scanned page (large image, little or no text layer) does.
+    """
+    if len(page_lines) < OCR_MIN_LINES:
+        return True
+
+    image_coverage = _covered_fraction(page, [info["bbox"] for info in page.get_image_info()])
+    if image_coverage < OCR_MIN_IMAGE_COVERAGE:
+        return False
+
+    text_blocks = [b[:4] for b in page.get_text("blocks") if b[6] == 0]
+    text_coverage = _covered_fraction(page, text_blocks)
+    return text_coverage < image_coverage * OCR_TEXT_TO_IMAGE_RATIO
+
+def extract_page(page):
+    """Native text of one page, merged with OCR text when needed."""
+    page_lines = []
+
+    # 1. Native Text Extraction (Vector text)
+    text = page.get_text("text")
+    for line in text.split("\n"):
+        line = clean_line(line)
+        if line:
+            page_lines.append(line)
+
+    # 2. OCR Fallback
+    if probe().ocr and needs_ocr(page, page_lines):
+        ocr_lines = ocr_page(page)
+
+        # Simple merge: add OCR lines if they aren't already captured
+        for l in ocr_lines:
+            if l not in page_lines:
+                page_lines.append(l)
+
+    return page_lines
+
+def _page_cache_key(pdf_hash, page_no):
+    return cache_key(pdf_hash, page_no, probe().ocr, OCR_DPI, OCR_LANG,
+                     OCR_MIN_LINES, OCR_MIN_IMAGE_COVERAGE, OCR_TEXT_TO_IMAGE_RATIO)
+
+def _extract_pages(pdf_path, pdf_hash, page_numbers):
+    """
+    Extract (and cache) a list of 1-based page numbers.
+    """
+    import fitz  # PyMuPDF
+
+    results = []
+    with fitz.open(pdf_path) as doc:
+        for page_no in page_numbers:
+            page_lines = extract_page(doc[page_no - 1])
+            PAGE_CACHE.put_json(_page_cache_key(pdf_hash, page_no), page_lines)
+            results.append({"page": page_no, "lines": page_lines})
+    return results
+
+def _init_ocr_worker():
+    # One Tesseract thread per worker; parallelism comes from the pool
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+def _chunk(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
 # -------------------------------------------------
 # MAIN EXTRACTION
 # -------------------------------------------------
 
-def extract_raw_content(pdf_path):
+def extract_raw_content(pdf_path, workers=OCR_WORKERS):
     """
     Extracts text from PDF. Uses native text first, 
     falls back to OCR if the page looks like an image.
+
+    Pages already seen (same PDF bytes) come from the page cache;
+    the rest are extracted across a process pool.
     """
+    import fitz  # PyMuPDF
+
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF file not found at {pdf_path}")
 
-    doc = fitz.open(pdf_path)
-    extracted_pages = []
-
-    for page_no, page in enumerate(doc, start=1):
-        page_lines = []
-
-        # 1. Native Text Extraction (Vector text)
-        text = page.get_text("text")
-        for line in text.split("\n"):
-            line = clean_line(line)
-            if line:
-                page_lines.append(line)
-
-        # 2. OCR Fallback 
-        # Trigger if: Very little text found OR page contains images/is scanned
-        if OCR_AVAILABLE and (len(page_lines) < 5 or page.get_images()):
-            ocr_lines = ocr_page(page)
-            
-            # Simple merge: add OCR lines if they aren't already captured
-            for l in ocr_lines:
-                if l not in page_lines:
-                    page_lines.append(l)
-
-        extracted_pages.append({"page": page_no, "lines": page_lines})
-
-    doc.close()
-    return extracted_pages
+    pdf_hash = file_digest(pdf_path)  # page cache key
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    pages = {}
+    missing = []
+    for page_no in range(1, page_count + 1):
+        lines = PAGE_CACHE.get_json(_page_cache_key(pdf_hash, page_no))
+        if lines is None:
+            missing.append(page_no)
+        else:
+            pages[page_no] = {"page": page_no, "lines": lines}
+
+    if len(missing) < PARALLEL_MIN_PAGES or workers <= 1:
+        for result in _extract_pages(pdf_path, pdf_hash, missing):
+            pages[result["page"]] = result
+    else:
+        # Small chunks keep workers evenly loaded when OCR pages cluster
+        chunk_size = max(1, len(missing) // (workers * 4))
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx, initializer=_init_ocr_worker
+        ) as pool:
+            futures = [
+                pool.submit(_extract_pages, pdf_path, pdf_hash, chunk)
+                for chunk in _chunk(missing, chunk_size)
+            ]
+            for future in futures:
+                for result in future.result():
+                    pages[result["page"]] = result
+
+    logging.info(
+        f"Extracted {page_count} pages ({page_count - len(missing)} from cache) from {pdf_path}"
+    )
+    return [pages[page_no] for page_no in range(1, page_count + 1)]
 
 if __name__ == "__main__":
     # Test script (Update path for local testing)
@@ -0,0 +1,111 @@
+"""
+Render profiles for training video generation
+
+Goals:
+- One place for output size, frame rate and encoder settings
+- A fast low-resolution "draft" render for reviewing content
+- Layout sizes (fonts, margins, avatar) defined once at 1080p and
+  scaled to the profile, so every profile has the same layout
+- Encoder settings for mostly static slides (libx264 tune=stillimage,
+  long GOP), thread counts that do not oversubscribe parallel encoders,
+  and an optional low-bitrate preview rendition
+"""
+
+import os
+from dataclasses import dataclass
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+# Layout constants across the code base are in pixels of a 1080p frame
+REFERENCE_HEIGHT = 1080
+
+# Shared by every profile: slides are still frames plus fades and a
+# small avatar, so x264 can spend far fewer bits than on camera footage
+ENCODER_TUNE = os.getenv("ENCODER_TUNE", "stillimage")   # libx264 -tune ("" = none)
+GOP_SECONDS = float(os.getenv("GOP_SECONDS", "10"))       # max keyframe interval
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0"))  # per ffmpeg process, 0 = auto
+RENDER_PREVIEW = os.getenv("RENDER_PREVIEW", "0") == "1"  # also write <video>_preview.mp4
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    name: str
+    size: tuple          # (width, height)
+    fps: int
+    preset: str          # libx264 preset
+    crf: int             # libx264 quality (lower = better, 23 = default)
+    audio_bitrate: str
+    output_suffix: str   # added to the output file name
+    tune: str = ENCODER_TUNE
+    gop_seconds: float = GOP_SECONDS
+
+    @property
+    def scale(self) -> float:
+        return self.size[1] / REFERENCE_HEIGHT
+
+    def px(self, value) -> int:
+        """Scale a 1080p layout size (in pixels) to this profile."""
+        return max(1, round(value * self.scale))
+
+    def x264_params(self, fps=None) -> list:
+        """
+        libx264 options other than the preset (MoviePy passes that one
+        itself). fps: frame rate of the encoded stream, if not self.fps.
+        """
+        params = ["-crf", str(self.crf), "-g", str(max(1, round(self.gop_seconds * (fps or self.fps))))]
+        if self.tune:
+            params += ["-tune", self.tune]
+        return params
+
+
+RENDER_PROFILES = {
+    # Reviewing content: catch typos in seconds, not minutes
+    "draft": RenderProfile("draft", (640, 360), 12, "ultrafast", 30, "64k", "_draft"),
+    "standard": RenderProfile("standard", (1280, 720), 24, "veryfast", 23, "128k", "_720p"),
+    "final": RenderProfile("final", (1920, 1080), 24, "medium", 23, "128k", ""),
+}
+
+DEFAULT_PROFILE = os.getenv("RENDER_PROFILE", "final")
+
+# Second, small rendition written alongside the main one (spec "preview"
+# or RENDER_PREVIEW); keeps the main rendition's frame rate
+PREVIEW_PROFILE = RenderProfile("preview", (640, 360), 24, "veryfast", 32, "48k", "_preview")
+
+
+# -------------------------------------------------
+# LOOKUP
+# -------------------------------------------------
+def get_profile(profile=None) -> RenderProfile:
+    """
+    Profile by name; a RenderProfile is passed through and None
+    means DEFAULT_PROFILE.
+    """
+    if isinstance(profile, RenderProfile):
+        return profile
+
+    name = profile or DEFAULT_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(
+            f"Unknown render profile '{name}' (expected one of: {', '.join(RENDER_PROFILES)})"
+        )
+    return RENDER_PROFILES[name]
+
+
+def wants_preview(profile, preview=None) -> bool:
+    """Whether a render in `profile` also gets a preview rendition."""
+    preview = RENDER_PREVIEW if preview is None else preview
+    return bool(preview) and get_profile(profile).size[1] > PREVIEW_PROFILE.size[1]
+
+
+def encoder_threads(processes=1) -> int:
+    """
+    ffmpeg threads for each of `processes` encoders running at once:
+    ENCODER_THREADS if set, otherwise the cores split between them
+    (0 = one encoder, let x264 decide).
+    """
+    if ENCODER_THREADS:
+        return ENCODER_THREADS
+    if processes <= 1:
+        return 0
+    return max(1, (os.cpu_count() or 1) // processes)
@@ -0,0 +1,371 @@
+"""
+Shared artifact store for training video generation
+
+Goals:
+- One store that every replica / worker reads and writes, so TTS audio,
+  word timings, photos, slide segments and LLM decks produced by one
+  worker are reused by all of them
+- Two backends behind the same methods: a directory (local disk or a
+  shared mount) and any S3-compatible bucket (AWS, MinIO, ...)
+- Content-addressed keys: cache entries are keyed by their inputs,
+  published outputs by the SHA-256 of their bytes, so identical
+  artifacts are stored once
+- Optional: with no STORAGE_URL everything stays in the local caches,
+  and a failing store only costs cache misses and unpublished outputs,
+  never a job (failures are logged and counted as storage_errors)
+- Size report per area (python -m utils.storage_utils)
+
+Layout (keys):
+    cache/<cache name>/<key><suffix>    FileCache entries (utils/cache_utils.py)
+    images/<md5(query)>.jpg             Unsplash originals
+    blobs/<sha256><ext>                 published files (deduplicated)
+    outputs/<tenant>/<name>.json        per-tenant reference to a blob
+
+Config:
+    STORAGE_URL=file:///mnt/shared/bsk   or   s3://bucket/prefix
+    S3_ENDPOINT_URL=http://minio:9000    (S3-compatible servers)
+    s3:// stores need boto3: pip install -r requirements-s3.txt
+    STORAGE_TENANT=default               (namespace of published outputs)
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from utils import trace_utils
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+STORAGE_URL = os.getenv("STORAGE_URL", "")  # "" = no shared store
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+STORAGE_TENANT = os.getenv("STORAGE_TENANT", "default")
+
+
+def _tmp_path(path):
+    """Unique sibling of `path` to write before an atomic rename."""
+    return f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+
+
+# -------------------------------------------------
+# LOCAL BACKEND
+# -------------------------------------------------
+class LocalStorage:
+    """
+    Store in a directory: `<root>/<key>`. With the directory on a shared
+    mount (NFS, EFS, ...) it is shared between machines as well.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def __repr__(self):
+        return f"LocalStorage({self.root!r})"
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def put_file(self, key, path):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = _tmp_path(target)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_file(self, key, path) -> bool:
+        """Copy `key` to `path`; False if there is no such key."""
+        try:
+            shutil.copyfile(self._path(key), path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put_bytes(self, key, data):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = _tmp_path(target)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+
+    def get_bytes(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix=""):
+        """(key, bytes) of every object under `prefix`."""
+        base = self._path(prefix) if prefix else self.root
+        for directory, _, files in os.walk(base):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue  # a write in progress
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                try:
+                    yield key, os.path.getsize(path)
+                except FileNotFoundError:
+                    pass
+
+
+# -------------------------------------------------
+# S3 BACKEND
+# -------------------------------------------------
+class S3Storage:
+    """
+    Store in an S3-compatible bucket: `s3://<bucket>/<prefix>/<key>`.
+    `endpoint_url` points it at MinIO or another S3-compatible server;
+    `client` may be any object with the boto3 S3 client methods used here.
+    """
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, client=None):
+        if client is None:
+            try:
+                import boto3  # optional dependency, only for s3:// stores
+            except ImportError:
+                raise RuntimeError(
+                    f"s3://{bucket} stores need boto3: pip install -r requirements-s3.txt"
+                ) from None
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def __repr__(self):
+        return f"S3Storage('s3://{self.bucket}/{self.prefix}')"
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @staticmethod
+    def _missing(error) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def exists(self, key) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if self._missing(e):
+                return False
+            raise
+        return True
+
+    def put_file(self, key, path):
+        self.client.upload_file(path, self.bucket, self._key(key))
+
+    def get_file(self, key, path) -> bool:
+        """Download `key` to `path`; False if there is no such key."""
+        try:
+            self.client.download_file(self.bucket, self._key(key), path)
+        except Exception as e:
+            if self._missing(e):
+                return False
+            raise
+        return True
+
+    def put_bytes(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def get_bytes(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix=""):
+        """(key, bytes) of every object under `prefix`."""
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][strip:], obj["Size"]
+
+
+# -------------------------------------------------
+# STORE SELECTION
+# -------------------------------------------------
+def open_storage(url, endpoint_url=None):
+    """
+    Backend for a store URL: file:///path (or a plain path) or
+    s3://bucket/prefix.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "s3":
+        return S3Storage(parsed.netloc, parsed.path, endpoint_url=endpoint_url)
+    if parsed.scheme in ("", "file"):
+        return LocalStorage(parsed.path if parsed.scheme else url)
+    raise ValueError(f"Unsupported STORAGE_URL: {url}")
+
+
+@lru_cache(maxsize=1)
+def get_storage():
+    """
+    The configured shared store (once per process), or None. Raises for
+    a bad STORAGE_URL or a missing backend library: call it at startup
+    so a misconfigured worker fails before it takes any job.
+    """
+    if not STORAGE_URL:
+        return None
+    storage = open_storage(STORAGE_URL, S3_ENDPOINT_URL)
+    logger.info(f"Shared artifact store: {storage!r}")
+    return storage
+
+
+# -------------------------------------------------
+# CACHE SYNC (best effort)
+# -------------------------------------------------
+def pull(key, path) -> bool:
+    """
+    Fetch `key` from the shared store into `path` (atomically). False
+    when no store is configured, the key is missing or the store fails.
+    """
+    storage = get_storage()
+    if storage is None:
+        return False
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = _tmp_path(path)
+    try:
+        found = storage.get_file(key, tmp_path)
+        if found:
+            os.replace(tmp_path, path)
+            trace_utils.count("storage_hits")
+        return found
+    except Exception as e:
+        logger.warning(f"Shared store read of {key} failed: {e!r}")
+        trace_utils.count("storage_errors")
+        return False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def push(key, path, overwrite=False):
+    """
+    Upload `path` as `key` unless the store has it already (keys are
+    content-addressed, so an existing key holds the same bytes).
+    overwrite=True always uploads: for entries that are re-stored under
+    the same key with new bytes (e.g. after their TTL expired).
+    """
+    storage = get_storage()
+    if storage is None:
+        return
+    try:
+        if overwrite or not storage.exists(key):
+            storage.put_file(key, path)
+    except Exception as e:
+        logger.warning(f"Shared store write of {key} failed: {e!r}")
+        trace_utils.count("storage_errors")
+
+
+# -------------------------------------------------
+# PUBLISHED OUTPUTS
+# -------------------------------------------------
+def file_digest(path) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def publish_file(path, tenant=None, storage=None):
+    """
+    Store a finished file under the tenant's outputs: the bytes once as
+    blobs/<sha256><ext> (shared by every tenant and re-render that
+    produces them), plus outputs/<tenant>/<name>.json pointing at it.
+    Returns the reference key, or None if the store failed (the local
+    file is still there; the job does not fail over it).
+    """
+    storage = storage or get_storage()
+    name = os.path.basename(path)
+    ref = f"outputs/{tenant or STORAGE_TENANT}/{name}.json"
+    try:
+        blob = f"blobs/{file_digest(path)}{os.path.splitext(name)[1]}"
+        if not storage.exists(blob):
+            storage.put_file(blob, path)
+        storage.put_bytes(ref, json.dumps({
+            "blob": blob,
+            "bytes": os.path.getsize(path),
+            "published_at": time.time(),
+        }).encode("utf-8"))
+    except Exception as e:
+        logger.warning(f"Publishing {path} as {ref} failed: {e!r}")
+        trace_utils.count("storage_errors")
+        return None
+    return ref
+
+
+def fetch_output(name, path, tenant=None, storage=None) -> bool:
+    """Download a published output (by file name) to `path`; False if unknown."""
+    storage = storage or get_storage()
+    ref = storage.get_bytes(f"outputs/{tenant or STORAGE_TENANT}/{name}.json")
+    if ref is None:
+        return False
+    return storage.get_file(json.loads(ref)["blob"], path)
+
+
+# -------------------------------------------------
+# SIZE REPORT
+# -------------------------------------------------
+def usage(storage=None, prefix="") -> dict:
+    """
+    Objects and bytes per area of the store:
+    {"cache/tts": {"objects": 120, "bytes": 5_300_000}, ..., "total": {...}}
+    """
+    storage = storage or get_storage()
+    report = {}
+    total = {"objects": 0, "bytes": 0}
+    for key, size in storage.list(prefix):
+        parts = key.split("/")
+        area = "/".join(parts[:2]) if parts[0] in ("cache", "outputs") else parts[0]
+        entry = report.setdefault(area, {"objects": 0, "bytes": 0})
+        for counts in (entry, total):
+            counts["objects"] += 1
+            counts["bytes"] += size
+    report["total"] = total
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Size report of the shared artifact store")
+    parser.add_argument("--url", default=STORAGE_URL, help="store URL (default: STORAGE_URL)")
+    parser.add_argument("--prefix", default="", help="only keys under this prefix")
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("no store configured (set STORAGE_URL or pass --url)")
+
+    print(json.dumps(usage(open_storage(args.url, S3_ENDPOINT_URL), args.prefix), indent=2))
@@ -0,0 +1,150 @@
+"""
+Text rendering utilities for training video generation
+
+Goals:
+- Render slide text in-process with Pillow (no ImageMagick subprocess)
+- Word-wrap to a fixed width, centered, with an outline stroke
+- Cache loaded fonts and measured word widths across slides
+- Return RGBA numpy arrays ready for compositing
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+# Streamlit Cloud / Linux ships DejaVu; Windows ships Arial
+DEFAULT_FONT = "DejaVu-Sans" if os.name != 'nt' else "Arial"
+
+# Font name -> candidate files (Pillow also searches the system font dirs)
+FONT_FILES = {
+    "DejaVu-Sans": ["DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"],
+    "DejaVu-Sans-Bold": ["DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"],
+    "Arial": ["arial.ttf", "Arial.ttf", r"C:\Windows\Fonts\arial.ttf"],
+}
+
+LINE_SPACING = 1.0  # multiple of the font's ascent + descent
+
+
+# -------------------------------------------------
+# FONT + MEASUREMENT CACHES
+# -------------------------------------------------
+@lru_cache(maxsize=32)
+def load_font(font=DEFAULT_FONT, fontsize=45):
+    """
+    Load a TrueType font once per (name, size).
+    `font` may be a known name (see FONT_FILES) or a path to a .ttf file.
+    """
+    for candidate in FONT_FILES.get(font, [font]):
+        try:
+            return ImageFont.truetype(candidate, fontsize)
+        except OSError:
+            continue
+
+    # Last resort: Pillow's bundled scalable font
+    return ImageFont.load_default(size=fontsize)
+
+
+@lru_cache(maxsize=16384)
+def text_length(font, text) -> float:
+    """Advance width of `text` in pixels (cached per font object)."""
+    return font.getlength(text)
+
+
+# -------------------------------------------------
+# LAYOUT
+# -------------------------------------------------
+def wrap_text(text, font, max_width):
+    """
+    Greedy word-wrap into lines no wider than max_width.
+    Explicit newlines are kept; a single over-long word gets its own line.
+    """
+    space = text_length(font, " ")
+    lines = []
+
+    for paragraph in text.split("\n"):
+        words = paragraph.split()
+        if not words:
+            lines.append("")
+            continue
+
+        current, current_width = [], 0.0
+        for word in words:
+            word_width = text_length(font, word)
+            needed = word_width if not current else current_width + space + word_width
+            if current and needed > max_width:
+                lines.append(" ".join(current))
+                current, current_width = [word], word_width
+            else:
+                current.append(word)
+                current_width = needed
+        lines.append(" ".join(current))
+
+    return lines
+
+
+# -------------------------------------------------
+# RENDERER
+# -------------------------------------------------
+def render_text(
+    text,
+    fontsize=45,
+    color="white",
+    font=DEFAULT_FONT,
+    stroke_color=None,
+    stroke_width=0,
+    width=None,
+):
+    """
+    Render centered, word-wrapped text to an RGBA array.
+
+    Mirrors TextClip(method='caption', size=(width, None)): the image is
+    `width` pixels wide and as tall as the wrapped text needs.
+
+    Output:
+    - uint8 numpy array of shape (H, W, 4)
+    """
+    pil_font = load_font(font, fontsize)
+    ascent, descent = pil_font.getmetrics()
+    line_height = int(round((ascent + descent) * LINE_SPACING))
+
+    if width is None:
+        lines = text.split("\n")
+        width = int(max(text_length(pil_font, line) for line in lines)) + 2 * stroke_width
+    else:
+        lines = wrap_text(text, pil_font, width - 2 * stroke_width)
+
+    height = line_height * len(lines) + 2 * stroke_width
+    image = Image.new("RGBA", (width, max(height, 1)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+
+    y = stroke_width
+    for line in lines:
+        x = (width - text_length(pil_font, line)) / 2
+        draw.text(
+            (x, y),
+            line,
+            font=pil_font,
+            fill=color,
+            stroke_width=stroke_width,
+            stroke_fill=stroke_color,
+        )
+        y += line_height
+
+    return np.asarray(image)
+
+
+def paste_rgba(canvas, overlay, position):
+    """
+    Alpha-composite an RGBA array onto a PIL RGBA canvas (in place).
+    position: (x, y) or ('center', y)
+    """
+    x, y = position
+    if x == "center":
+        x = (canvas.width - overlay.shape[1]) // 2
+    canvas.alpha_composite(Image.fromarray(overlay, "RGBA"), (max(int(x), 0), max(int(y), 0)))
+    return canvas
@@ -0,0 +1,390 @@
+"""
+Tracing utilities for the video generation pipeline
+
+Goals:
+- Per-stage wall time, CPU time, peak RSS, bytes downloaded, cache hits
+  (RSS sampled while the stage runs: peak_rss_mb / rss_delta_mb belong
+  to the stage; process_peak_rss_mb is the process's lifetime high-water
+  mark)
+- One JSONL log per job (logs/traces/<job_id>.jsonl), appended to by the
+  job process AND its render worker processes
+- Optional Prometheus-style text endpoint aggregated from those logs
+
+Usage:
+    trace = start_trace(job_id)
+    with stage("llm"):
+        ...
+    count("bytes_downloaded", len(data))   # from anywhere inside a stage
+
+Metrics endpoint:
+    python -m utils.trace_utils --port 9108
+"""
+
+import argparse
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+TRACE_DIR = os.getenv("TRACE_DIR", os.path.join("logs", "traces"))
+RSS_SAMPLE_INTERVAL = float(os.getenv("TRACE_RSS_INTERVAL", "0.05"))  # seconds
+COUNTERS = ("bytes_downloaded", "cache_hits", "cache_misses", "storage_hits", "storage_errors")
+
+# (trace, (open stage counters, ...)) for the current thread / task
+_active = contextvars.ContextVar("active_trace", default=(None, ()))
+
+
+# -------------------------------------------------
+# RESOURCE PROBES
+# -------------------------------------------------
+def cpu_seconds() -> float:
+    """CPU time of this process plus its finished child processes."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def process_peak_rss_mb():
+    """
+    Lifetime high-water RSS (MB) of this process and of its largest
+    child, or None. Only ever rises in a long-lived worker.
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is KB on Linux (bytes on macOS; close enough for a trend)
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return round(own, 1), round(children, 1)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux), or None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class _RssWindow:
+    def __init__(self, rss):
+        self.start = self.peak = rss
+
+
+class _RssSampler:
+    """
+    One daemon thread per process sampling RSS while any stage is open;
+    every open stage keeps the peak seen during its own lifetime.
+    """
+
+    def __init__(self):
+        self._windows = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def open(self):
+        rss = current_rss_mb()
+        if rss is None:
+            return None
+        window = _RssWindow(rss)
+        with self._lock:
+            if self._pid != os.getpid():  # first use, or a forked worker
+                self._pid = os.getpid()
+                self._windows = set()
+                threading.Thread(target=self._run, daemon=True).start()
+            self._windows.add(window)
+        self._wake.set()
+        return window
+
+    def close(self, window):
+        if window is None:
+            return None
+        self._sample()
+        with self._lock:
+            self._windows.discard(window)
+        return window
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        with self._lock:
+            for window in self._windows:
+                window.peak = max(window.peak, rss)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._sample()
+            with self._lock:
+                if not self._windows:
+                    self._wake.clear()
+            time.sleep(RSS_SAMPLE_INTERVAL)
+
+
+_rss_sampler = _RssSampler()
+
+
+# -------------------------------------------------
+# JOB TRACE
+# -------------------------------------------------
+class JobTrace:
+    """
+    Appends one JSON record per finished stage to the job's trace file.
+    Only (job_id, path) crosses process boundaries (see context()).
+    """
+
+    def __init__(self, job_id, path=None):
+        self.job_id = job_id
+        self.path = path or trace_path(job_id)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    def context(self):
+        """Picklable handle for worker processes (see resume_trace)."""
+        return (self.job_id, self.path)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        # Single O_APPEND write per record: safe across worker processes
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class _StageCounters:
+    def __init__(self):
+        self.values = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, name, n):
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + n
+
+
+def start_trace(job_id=None):
+    """Create a trace for a job and make it current."""
+    trace = JobTrace(job_id or uuid.uuid4().hex[:12])
+    _active.set((trace, ()))
+    return trace
+
+
+def resume_trace(context):
+    """Re-attach to a job's trace inside a worker process."""
+    if context is None:
+        return None
+    trace = JobTrace(*context)
+    _active.set((trace, ()))
+    return trace
+
+
+def current_trace():
+    return _active.get()[0]
+
+
+@contextmanager
+def stage(name, **attrs):
+    """
+    Time a pipeline stage and log it to the current trace (no-op without one).
+
+    Counters recorded with count() inside the block are attributed to this
+    stage and to every enclosing stage. CPU time is process-wide, so for
+    stages that overlap (concurrent TTS / image calls) read it as the
+    CPU spent while the stage was open.
+    """
+    trace, open_counters = _active.get()
+    counters = _StageCounters()
+    token = _active.set((trace, open_counters + (counters,)))
+
+    started_at = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = cpu_seconds()
+    rss = _rss_sampler.open() if trace is not None else None
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _active.reset(token)
+        if trace is not None:
+            _rss_sampler.close(rss)
+            process_rss, children_rss = process_peak_rss_mb()
+            trace.write({
+                "job_id": trace.job_id,
+                "stage": name,
+                "status": status,
+                "started_at": round(started_at, 3),
+                "wall_s": round(time.perf_counter() - wall_start, 4),
+                "cpu_s": round(cpu_seconds() - cpu_start, 4),
+                # RSS of this process while the stage ran (sampled)
+                "peak_rss_mb": round(rss.peak, 1) if rss else None,
+                "rss_delta_mb": round(rss.peak - rss.start, 1) if rss else None,
+                # Lifetime high-water marks (getrusage)
+                "process_peak_rss_mb": process_rss,
+                "children_process_peak_rss_mb": children_rss,
+                "pid": os.getpid(),
+                **counters.values,
+                **attrs,
+            })
+
+
+def count(name, n=1):
+    """Add to a counter (e.g. bytes_downloaded, cache_hits) on all open stages."""
+    for counters in _active.get()[1]:
+        counters.add(name, n)
+
+
+def trace_path(job_id):
+    return os.path.join(TRACE_DIR, f"{job_id}.jsonl")
+
+
+def summarize_trace(path):
+    """
+    Per-stage totals for one job's trace file, in first-seen order:
+    [{"stage", "runs", "wall_s", "cpu_s", "peak_rss_mb", counters...}]
+    """
+    summary = {}
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            row = summary.setdefault(record["stage"], {
+                "stage": record["stage"], "runs": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                "peak_rss_mb": 0.0, **dict.fromkeys(COUNTERS, 0),
+            })
+            row["runs"] += 1
+            row["wall_s"] = round(row["wall_s"] + record["wall_s"], 3)
+            row["cpu_s"] = round(row["cpu_s"] + record["cpu_s"], 3)
+            row["peak_rss_mb"] = max(row["peak_rss_mb"], record.get("peak_rss_mb") or 0)
+            for name in COUNTERS:
+                row[name] += record.get(name, 0)
+
+    return list(summary.values())
+
+
+# -------------------------------------------------
+# PROMETHEUS-STYLE METRICS (AGGREGATED FROM TRACE LOGS)
+# -------------------------------------------------
+class TraceAggregator:
+    """
+    Incrementally tails every *.jsonl in TRACE_DIR and keeps per-stage
+    totals, so stages from all job and render processes are included.
+    """
+
+    def __init__(self, trace_dir=TRACE_DIR):
+        self.trace_dir = trace_dir
+        self.offsets = {}
+        self.totals = {}  # (stage, status) -> {"runs", "wall_s", "cpu_s", counters...}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        if not os.path.isdir(self.trace_dir):
+            return
+        for name in os.listdir(self.trace_dir):
+            if name.endswith(".jsonl"):
+                self._read_new(os.path.join(self.trace_dir, name))
+
+    def _read_new(self, path):
+        offset = self.offsets.get(path, 0)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+
+        # Only consume complete lines; a record may be mid-write
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            try:
+                self._add(json.loads(line))
+            except (json.JSONDecodeError, KeyError):
+                continue
+        self.offsets[path] = offset + end
+
+    def _add(self, record):
+        key = (record["stage"], record["status"])
+        totals = self.totals.setdefault(
+            key, {"runs": 0, "wall_s": 0.0, "cpu_s": 0.0, **dict.fromkeys(COUNTERS, 0)}
+        )
+        totals["runs"] += 1
+        totals["wall_s"] += record["wall_s"]
+        totals["cpu_s"] += record["cpu_s"]
+        for name in COUNTERS:
+            totals[name] += record.get(name, 0)
+
+    def render(self) -> str:
+        with self._lock:
+            self.refresh()
+            metrics = [
+                ("bsk_stage_runs_total", "counter", "runs"),
+                ("bsk_stage_wall_seconds_total", "counter", "wall_s"),
+                ("bsk_stage_cpu_seconds_total", "counter", "cpu_s"),
+                ("bsk_stage_bytes_downloaded_total", "counter", "bytes_downloaded"),
+                ("bsk_stage_cache_hits_total", "counter", "cache_hits"),
+                ("bsk_stage_cache_misses_total", "counter", "cache_misses"),
+                ("bsk_stage_storage_hits_total", "counter", "storage_hits"),
+                ("bsk_stage_storage_errors_total", "counter", "storage_errors"),
+            ]
+            lines = []
+            for metric, kind, field in metrics:
+                lines.append(f"# TYPE {metric} {kind}")
+                for (stage_name, status), totals in sorted(self.totals.items()):
+                    lines.append(
+                        f'{metric}{{stage="{stage_name}",status="{status}"}} {totals[field]}'
+                    )
+            return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port, trace_dir=TRACE_DIR):
+    """Serve /metrics on a background thread; returns the server."""
+    aggregator = TraceAggregator(trace_dir)
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = aggregator.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep scrapes out of the app log
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Metrics endpoint on :{port}/metrics (traces in {trace_dir})")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve pipeline trace metrics")
+    parser.add_argument("--port", type=int, default=9108)
+    parser.add_argument("--trace-dir", default=TRACE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start_metrics_server(args.port, args.trace_dir)
+    threading.Event().wait()
@@ -1,120 +1,747 @@
+import bisect
+import gc
 import os
 import shutil
 import logging
+import subprocess
+import tempfile
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from PIL import Image
 from moviepy.editor import (
     ImageClip, 
-    TextClip, 
+    VideoClip,
     CompositeVideoClip, 
     AudioFileClip, 
+    CompositeAudioClip,
     concatenate_videoclips, 
     concatenate_audioclips
 )
-from moviepy.config import change_settings
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from utils.audio_timing import audio_duration, build_narration_timeline, build_timeline
+from utils.avatar_utils import add_avatar_to_slide
+from utils.cache_utils import CACHE_ROOT, FileCache, cache_key
+from utils.capabilities import probe
+from utils.image_utils import prepare_slide_image
+from utils.render_profiles import PREVIEW_PROFILE, encoder_threads, get_profile, wants_preview
+from utils.text_utils import render_text, paste_rgba
+from utils.trace_utils import stage, current_trace, resume_trace
 
 # --- LOGGING SETUP ---
 logger = logging.getLogger(__name__)
 
-# --- IMAGEMAGICK CONFIGURATION ---
-# This part automatically finds 'magick' on Linux (Streamlit) or Windows (Local)
-def configure_imagemagick():
-    # 1. Try to find 'magick' or 'convert' in the system PATH
-    magick_path = shutil.which("magick") or shutil.which("convert")
-    
-    # 2. Fallback for common Windows installation path if not in PATH
-    if not magick_path and os.name == 'nt':
-        common_windows_path = r"C:\Program Files\ImageMagick-7.1.2-Q16-HDRI\magick.exe"
-        if os.path.exists(common_windows_path):
-            magick_path = common_windows_path
-
-    if magick_path:
-        change_settings({"IMAGEMAGICK_BINARY": magick_path})
-        logger.info(f"ImageMagick found at: {magick_path}")
-    else:
-        logger.error("ImageMagick binary not found. Video generation will fail.")
+# --- RENDER CONFIG ---
+# Size, fps and encoder settings (CRF, preset, tune, GOP, threads) come
+# from the render profile (utils/render_profiles.py); layout sizes below
+# are 1080p pixels.
+FADE_DURATION = 0.5
+# "parallel": per-slide segments in a process pool, joined without re-encoding
+#             (segments of unchanged slides are reused from SEGMENT_CACHE)
+# "stream":   one slide at a time, frames piped into a single ffmpeg process
+#             (flat memory use; for memory-limited containers)
+# "compose":  single concatenate_videoclips graph encoded on one core
+RENDER_MODE = os.getenv("RENDER_MODE", "parallel")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", os.cpu_count() or 1))
 
-configure_imagemagick()
+# Encoded slide segments, keyed by slide content (see _segment_key).
+# Bump SEGMENT_VERSION whenever slide layout, avatar or encoding changes.
+SEGMENT_VERSION = 3
+SEGMENT_CACHE_MAX_BYTES = int(os.getenv("SEGMENT_CACHE_MAX_MB", "2000")) * 1024 * 1024
+SEGMENT_CACHE = FileCache(
+    os.path.join(CACHE_ROOT, "segments"), max_bytes=SEGMENT_CACHE_MAX_BYTES, suffix=".mp4"
+)
 
 # --- SLIDE CREATION ---
-def create_slide(image_path, title_text, content_text, audio_path):
+def create_slide(
+    image, title_text, content_text, audio_path, profile=None, duration=None, cues=None, fade=None
+):
     """
     Creates a single video slide with background image, text overlays, and audio.
+    The static layers are pre-composited into one frame; only the fades
+    (and the avatar added later) vary per frame.
+    Frame size and text layout follow the render profile.
+
+    image: background from prepare_slide_image (uint8 array at the
+           profile's frame size), or an image path to prepare here
+    audio_path: narration track, or None for a silent clip (the stream
+                mode mixes narration in ffmpeg)
+    duration: slide length from the deck timeline (default: measured
+              from the narration's MP3 headers)
+    cues: burned-in captions, [(start, end, text)] relative to the slide
+          (caption_utils.slide_cues); the current cue is drawn at the
+          bottom instead of the full content_text
+    fade: crossfade length from the deck timeline (default: FADE_DURATION)
     """
-    # 1. Load Audio to get duration
-    audio_clip = AudioFileClip(audio_path)
-    duration = audio_clip.duration
+    profile = get_profile(profile)
+    px = profile.px
+
+    # 1. Duration from the timeline / MP3 headers (no ffmpeg probe)
+    if duration is None:
+        duration = audio_duration(audio_path)
 
     # 2. Background Image
-    # Resize to standard 1080p (1920x1080)
-    img_clip = ImageClip(image_path).set_duration(duration).resize(height=1080)
-    img_clip = img_clip.set_position('center')
-
-    # 3. Title Text
-    # Streamlit Cloud uses 'DejaVu-Sans' by default; Windows uses 'Arial'
-    font = "DejaVu-Sans" if os.name != 'nt' else "Arial"
-    
-    title_clip = TextClip(
+    # 16:9 crop at the profile's frame size (1920x1080 for "final")
+    if not isinstance(image, np.ndarray):
+        image = prepare_slide_image(image, profile)
+    canvas = Image.fromarray(image).convert("RGBA")
+
+    # 3. Title Text (rendered in-process with Pillow)
+    title_layer = render_text(
         title_text,
-        fontsize=70,
+        fontsize=px(70),
         color='white',
-        font=font,
-        stroke_color='black',
-        stroke_width=2,
-        method='caption',
-        size=(1700, None)
-    ).set_duration(duration).set_position(('center', 100))
-
-    # 4. Content Text (Main Body)
-    content_clip = TextClip(
-        content_text,
-        fontsize=45,
-        color='yellow',
-        font=font,
         stroke_color='black',
-        stroke_width=1,
-        method='caption',
-        size=(1500, None)
-    ).set_duration(duration).set_position(('center', 400))
+        stroke_width=px(2),
+        width=px(1700),
+    )
+    paste_rgba(canvas, title_layer, ('center', px(100)))
+
+    # 4. Content Text (Main Body), unless captions replace it
+    if cues is None:
+        content_layer = render_text(
+            content_text,
+            fontsize=px(45),
+            color='yellow',
+            stroke_color='black',
+            stroke_width=px(1),
+            width=px(1500),
+        )
+        paste_rgba(canvas, content_layer, ('center', px(400)))
 
     # 5. Overlay Graphics (Black gradient/shadow for readability)
     # Note: Simplified for this version to ensure it runs on Streamlit
-    
-    # 6. Compose the Video
-    slide = CompositeVideoClip([img_clip, title_clip, content_clip], size=(1920, 1080))
-    slide = slide.set_audio(audio_clip)
+
+    # 6. Bake the static layers into ONE frame
+    # Background, title and content never change over time, so they are
+    # composited once here instead of being re-blended for every frame.
+    baked_frame = np.asarray(canvas.convert("RGB"))
+
+    if cues:
+        slide = _caption_clip(baked_frame, cues, duration, profile)
+    else:
+        slide = ImageClip(baked_frame).set_duration(duration)
+    if audio_path:
+        # A frame-snapped duration may outlast the file by part of a frame:
+        # the composite pads with silence instead of reading past its end
+        narration = CompositeAudioClip([AudioFileClip(audio_path)]).set_duration(duration)
+        slide = slide.set_audio(narration)
 
     # Optional: Add fades for smooth transitions
-    return slide.crossfadein(0.5).crossfadeout(0.5)
+    fade = FADE_DURATION if fade is None else fade
+    return slide.crossfadein(fade).crossfadeout(fade)
 
-# --- FINAL VIDEO COMPOSITION ---
-def combine_slides_and_audio(video_clips, audio_paths, service_name=None):
+def _caption_clip(baked_frame, cues, duration, profile):
     """
-    Combines all individual slides into a single MP4 file.
+    The baked frame with the current cue drawn at the bottom. Each cue's
+    strip is blended once up front; a frame is the baked frame with that
+    strip pasted in (or the baked frame itself between cues).
     """
-    # Concatenate all clips with a 'compose' method to handle different sizes
-    final_video = concatenate_videoclips(video_clips, method="compose", padding=-0.5)
+    px = profile.px
+    height, width = baked_frame.shape[:2]
+    strips = []
+    for _, _, text in cues:
+        layer = render_text(
+            text, fontsize=px(48), color='white', stroke_color='black',
+            stroke_width=px(2), width=px(1500),
+        )
+        y = max(height - px(60) - layer.shape[0], 0)
+        x = (width - layer.shape[1]) // 2
+        region = (slice(y, y + layer.shape[0]), slice(x, x + layer.shape[1]))
+        alpha = layer[:, :, 3:] / 255.0
+        strip = (alpha * layer[:, :, :3] + (1 - alpha) * baked_frame[region]).astype(np.uint8)
+        strips.append((region, strip))
+
+    starts = [start for start, _, _ in cues]
 
-    # Create output directory
-    output_dir = "output_videos"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    def make_frame(t):
+        i = bisect.bisect_right(starts, t) - 1
+        if i < 0 or t >= cues[i][1]:
+            return baked_frame
+        region, strip = strips[i]
+        frame = baked_frame.copy()
+        frame[region] = strip
+        return frame
 
-    # Generate Filename
-    filename = "training_video.mp4"
+    return VideoClip(make_frame, duration=duration)
+
+# --- OUTPUT PATH ---
+def build_output_path(service_name=None, output_dir="output_videos", profile=None):
+    """
+    Output MP4 path for a service (creates the output directory).
+    Draft / standard renders get a suffix so they never replace the final video.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    suffix = get_profile(profile).output_suffix
+
+    filename = f"training_video{suffix}.mp4"
     if service_name:
         safe_name = "".join([c for c in service_name if c.isalnum() or c in (' ', '_')]).rstrip()
-        filename = f"Training_{safe_name.replace(' ', '_')}.mp4"
-    
-    output_path = os.path.join(output_dir, filename)
+        filename = f"Training_{safe_name.replace(' ', '_')}{suffix}.mp4"
+
+    return os.path.join(output_dir, filename)
+
+def preview_path_for(output_path):
+    """Path of the low-bitrate preview rendition of a video."""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}{PREVIEW_PROFILE.output_suffix}{ext}"
+
+def _partial_path(path):
+    """
+    Unique name to encode `path` under until it is complete (same
+    extension, so ffmpeg picks the container): concurrent jobs never
+    share temp files and a half-written video is never visible.
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.{uuid.uuid4().hex[:8]}.part{ext}"
+
+def _publish(partial_paths, final_paths, subtitles=None):
+    """
+    Move finished encodes into place. subtitles: (srt path, language) to
+    mux as a soft subtitle track first, so a published video already
+    carries its captions.
+    """
+    if subtitles:
+        from utils.caption_utils import mux_captions
+
+        for partial_path in partial_paths:
+            with stage("captions_mux", path=os.path.basename(partial_path)):
+                mux_captions(partial_path, *subtitles)
+    for partial_path, final_path in zip(partial_paths, final_paths):
+        os.replace(partial_path, final_path)
+
+def _discard(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def _x264_args(profile, threads=0, fps=None):
+    """ffmpeg video encoder options for `profile` (one output)."""
+    args = ["-c:v", "libx264", "-preset", profile.preset, *profile.x264_params(fps)]
+    if threads:
+        args += ["-threads", str(threads)]
+    return args + ["-pix_fmt", "yuv420p"]
+
+def _preview_args(fps):
+    """Output options of the preview rendition (scaled from the main one)."""
+    return [
+        *_x264_args(PREVIEW_PROFILE, fps=fps),
+        "-c:a", "aac", "-b:a", PREVIEW_PROFILE.audio_bitrate,
+        "-movflags", "+faststart",
+    ]
+
+def encode_preview(video_path, preview_path=None, subtitles=None):
+    """
+    Preview rendition of a finished video (for the 'compose' mode; the
+    other modes write it in the same ffmpeg run as the main rendition).
+    subtitles: see _publish
+    """
+    preview_path = preview_path or preview_path_for(video_path)
+    partial_path = _partial_path(preview_path)
+    try:
+        subprocess.run(
+            [
+                probe().ffmpeg, "-y", "-loglevel", "error", "-i", video_path,
+                "-map", "0:v", "-map", "0:a?",
+                "-vf", f"scale=-2:{PREVIEW_PROFILE.size[1]}", *_preview_args(None),
+                partial_path,
+            ],
+            check=True,
+        )
+        _publish([partial_path], [preview_path], subtitles)
+    finally:
+        _discard([partial_path])
+    return preview_path
+
+# --- FINAL VIDEO COMPOSITION ---
+def combine_slides_and_audio(
+    video_clips, audio_paths, service_name=None, profile=None, narration=None, preview=None,
+    fade=None, subtitles=None,
+):
+    """
+    Combines all individual slides into a single MP4 file.
+    narration: one audio track for the whole deck (single-pass TTS); the
+               slide clips are silent and the track is laid under them
+    preview: also write the preview rendition (default: RENDER_PREVIEW)
+    fade: crossfade overlap from the deck timeline (default: FADE_DURATION)
+    subtitles: (srt path, language) muxed as a soft subtitle track
+    """
+    profile = get_profile(profile)
+    fade = FADE_DURATION if fade is None else fade
+
+    # Concatenate all clips with a 'compose' method to handle different sizes
+    final_video = concatenate_videoclips(video_clips, method="compose", padding=-fade)
+    # MoviePy ends the result `fade` early (it pads after the last clip
+    # too); the timeline keeps the last slide's fade out
+    final_video = final_video.set_duration(final_video.duration + fade)
+    if narration:
+        track = CompositeAudioClip([AudioFileClip(narration)])
+        final_video = final_video.set_audio(track.set_duration(final_video.duration))
+
+    output_path = build_output_path(service_name, profile=profile)
+    partial_path = _partial_path(output_path)
 
     # Write the video file
     # We use 'libx264' for high compatibility and 'aac' for audio
-    final_video.write_videofile(
-        output_path,
-        fps=24,
-        codec="libx264",
-        audio_codec="aac",
-        temp_audiofile="temp-audio.m4a",
-        remove_temp=True
+    try:
+        _write_clip(final_video, partial_path, profile, threads=encoder_threads())
+        _publish([partial_path], [output_path], subtitles)
+    finally:
+        _discard([partial_path])
+        # Release the ffmpeg readers held by every slide's AudioFileClip
+        final_video.close()
+        for clip in video_clips:
+            clip.close()
+
+    if wants_preview(profile, preview):
+        with stage("encode_preview"):
+            encode_preview(output_path, subtitles=subtitles)
+    return output_path
+
+# --- PARALLEL SEGMENT RENDERING ---
+# Each slide body and each crossfade join is encoded exactly once, in its own
+# worker process. The segments share codec settings, so ffmpeg's concat
+# demuxer can stitch them together with stream copy (no second encode).
+#
+#   slide 1 body | join 1->2 | slide 2 body | join 2->3 | ... | slide N body
+#
+# The join segments hold the FADE_DURATION overlap that the 'compose' mode
+# produces with padding=-FADE_DURATION.
+
+def _build_slide_clip(spec, profile, with_audio=True):
+    with stage("slide_composition"):
+        clip = create_slide(
+            spec["image_path"], spec["title"], spec["content"],
+            spec["audio_path"] if with_audio else None, profile, spec.get("duration"),
+            spec.get("cues"), spec.get("fade"),
+        )
+    with stage("avatar_overlay"):
+        return add_avatar_to_slide(clip, clip.duration, profile)
+
+def _frames_between(start, end, fps):
+    """Frames of the piece [start, end) of a frame-snapped timeline."""
+    return round(end * fps) - round(start * fps)
+
+def _uint8_frame(clip, t):
+    frame = clip.get_frame(t)
+    return frame if frame.dtype == "uint8" else frame.astype("uint8")
+
+def _write_clip(clip, path, profile, frames=None, threads=0):
+    """
+    Encode exactly `frames` frames of `clip` (default: its duration on
+    the profile's frame grid) with the clip's audio cut to match.
+    write_videofile takes its frame count from np.arange, which adds a
+    frame whenever float error pushes a duration past a frame boundary;
+    over a deck of segments those frames drift away from the narration.
+    """
+    fps = profile.fps
+    frames = round(clip.duration * fps) if frames is None else frames
+    clip = clip.set_duration(frames / fps)
+
+    # Per output: concurrent jobs must not share the temp audio file
+    audio_path = f"{path}.m4a" if clip.audio is not None else None
+    try:
+        if audio_path:
+            clip.audio.write_audiofile(
+                audio_path, fps=44100, nbytes=4, buffersize=2000,
+                codec="aac", bitrate=profile.audio_bitrate, logger=None,
+            )
+        with FFMPEG_VideoWriter(
+            path, clip.size, fps, codec="libx264", preset=profile.preset,
+            audiofile=audio_path, threads=threads or None, ffmpeg_params=profile.x264_params(),
+        ) as writer:
+            for k in range(frames):
+                writer.write_frame(_uint8_frame(clip, k / fps))
+    finally:
+        if audio_path:
+            _discard([audio_path])
+
+
+def render_segment(task):
+    """
+    Worker entry point: encode one body or join segment.
+
+    task = {"kind": "body", "spec": ..., "start": ..., "end": ..., "path": ...}
+         | {"kind": "join", "spec": ..., "next_spec": ..., "path": ...}
+    plus "profile": the RenderProfile, "threads": encoder threads and
+    "trace": the parent job's trace context (or None)
+    """
+    resume_trace(task.get("trace"))
+    profile = task["profile"]
+    threads = task.get("threads", 0)
+
+    # Whole frames between the timeline's cuts, so the joined segments
+    # stay on the deck timeline (and under a deck narration track)
+    if task["kind"] == "body":
+        clip = _build_slide_clip(task["spec"], profile)
+        segment = clip.subclip(task["start"], task["end"])
+        frames = _frames_between(task["start"], task["end"], profile.fps)
+        # Per-frame avatar blending happens lazily here, inside the encode
+        with stage("encode", segment=os.path.basename(task["path"])):
+            _write_clip(segment, task["path"], profile, frames, threads)
+        clip.close()
+    else:
+        outgoing = _build_slide_clip(task["spec"], profile)
+        incoming = _build_slide_clip(task["next_spec"], profile)
+        fade = task["spec"].get("fade", FADE_DURATION)
+        segment = _join_clip(outgoing, incoming, profile.size, fade)
+        with stage("encode", segment=os.path.basename(task["path"])):
+            _write_clip(segment, task["path"], profile, _frames_between(0, fade, profile.fps), threads)
+        outgoing.close()
+        incoming.close()
+
+    return task["path"]
+
+def deck_timeline(slide_specs, narration=None, fps=None):
+    """
+    Timeline of a deck (see utils/audio_timing.py), with each spec's
+    "duration" filled in so slide clips match it exactly.
+
+    narration: {"path", "cuts"} of a single-pass deck narration
+               (asset_utils.prepare_deck_assets); the specs' "audio_path"
+               is then None
+    fps: snap every cut to this frame rate (the render profile's); the
+         renderers write exactly the frames between the snapped cuts
+    Each spec also gets the timeline's "fade" (FADE_DURATION, snapped).
+    """
+    if narration:
+        timeline = build_narration_timeline(narration["path"], narration["cuts"], FADE_DURATION)
+    else:
+        timeline = build_timeline([spec["audio_path"] for spec in slide_specs], FADE_DURATION)
+    if fps:
+        timeline = timeline.snap(fps)
+    for spec, duration in zip(slide_specs, timeline.durations):
+        spec["duration"] = duration
+        spec["fade"] = timeline.fade
+    return timeline
+
+def _join_clip(outgoing, incoming, size, fade=None):
+    """The crossfade overlap (`fade`, default FADE_DURATION) between two slide clips."""
+    fade = FADE_DURATION if fade is None else fade
+    return CompositeVideoClip(
+        [
+            outgoing.subclip(outgoing.duration - fade),
+            incoming.subclip(0, fade),
+        ],
+        size=size,
+    ).set_duration(fade)
+
+def _segment_tasks(slide_specs, timeline, work_dir):
+    """Ordered body/join tasks for a deck (order == concat order)."""
+    tasks = []
+    last = len(slide_specs) - 1
+
+    for i, (spec, timing) in enumerate(zip(slide_specs, timeline.slides)):
+        if timing.body_end > timing.body_start:
+            tasks.append({
+                "kind": "body", "spec": spec, "start": timing.body_start, "end": timing.body_end,
+                "path": os.path.join(work_dir, f"{len(tasks):04d}_body.mp4"),
+            })
+        if i < last:
+            tasks.append({
+                "kind": "join", "spec": spec, "next_spec": slide_specs[i + 1],
+                "path": os.path.join(work_dir, f"{len(tasks):04d}_join.mp4"),
+            })
+
+    return tasks
+
+def _segment_key(task, profile):
+    """
+    Cache key of a body / join segment: the content hash of its slide(s)
+    (spec["hash"], see asset_utils.slide_content_hash) plus everything
+    else that shapes the encoded frames and audio.
+    """
+    def identity(spec):
+        # A deck narration times slides by the whole deck, and its
+        # segments carry no audio of their own
+        return (
+            spec.get("hash") or cache_key(spec), spec.get("duration"), spec.get("fade"),
+            bool(spec["audio_path"]), spec.get("cues"),
+        )
+
+    if task["kind"] == "body":
+        parts = ("body", identity(task["spec"]), task["start"], task["end"])
+    else:
+        parts = ("join", identity(task["spec"]), identity(task["next_spec"]))
+    return cache_key(SEGMENT_VERSION, FADE_DURATION, profile, *parts)
+
+def concat_segments(
+    segment_paths, output_path, narration=None, profile=None, preview_path=None, subtitles=None
+):
+    """
+    Join MP4 segments with ffmpeg's concat demuxer (stream copy, no re-encode).
+    narration: audio track for silent segments (deck narration), encoded
+               once here and muxed under the joined video
+    preview_path: also write the preview rendition, in the same ffmpeg
+                  run (the segments are read once, only the preview is
+                  decoded and encoded)
+    subtitles: (srt path, language) muxed as a soft subtitle track
+    """
+    profile = get_profile(profile)
+    partial_path = _partial_path(output_path)
+    list_path = f"{partial_path}.segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    command = [probe().ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    audio = "0:a?"
+    if narration:
+        command += ["-i", narration]
+        audio = "1:a"
+    command += ["-map", "0:v", "-map", audio, "-c:v", "copy"]
+    command += ["-c:a", "aac", "-b:a", profile.audio_bitrate] if narration else ["-c:a", "copy"]
+    command += ["-movflags", "+faststart", partial_path]
+
+    outputs, partials = [output_path], [partial_path]
+    if preview_path:
+        partials.append(_partial_path(preview_path))
+        outputs.append(preview_path)
+        command += [
+            "-map", "0:v", "-map", audio, "-vf", f"scale=-2:{PREVIEW_PROFILE.size[1]}",
+            *_preview_args(profile.fps), partials[-1],
+        ]
+
+    try:
+        subprocess.run(command, check=True)
+        _publish(partials, outputs, subtitles)
+    finally:
+        _discard([list_path, *partials])
+
+    return output_path
+
+def render_slides_parallel(
+    slide_specs, service_name=None, workers=RENDER_WORKERS, progress_callback=None, profile=None,
+    timeline=None, preview=None, subtitles=None,
+):
+    """
+    Render slides to segments in a process pool, then concatenate them.
+    Segments whose slides did not change since an earlier render are
+    taken from SEGMENT_CACHE; only the rest are encoded.
+
+    slide_specs: list of {"image_path", "title", "content", "audio_path", "hash"?}
+    progress_callback: optional fn(done, total) called as segments finish
+    profile: render profile name or RenderProfile (default: RENDER_PROFILE)
+    timeline: deck_timeline(slide_specs, narration) if already built
+              (required with a deck narration: the specs have no audio)
+    preview: also write the preview rendition (default: RENDER_PREVIEW)
+    subtitles: (srt path, language) muxed as a soft subtitle track
+    """
+    profile = get_profile(profile)
+    timeline = timeline or deck_timeline(slide_specs, fps=profile.fps)
+    output_path = build_output_path(service_name, profile=profile)
+    preview_path = preview_path_for(output_path) if wants_preview(profile, preview) else None
+    work_dir = tempfile.mkdtemp(prefix="bsk_segments_")
+    workers = max(1, workers)
+
+    try:
+        tasks = _segment_tasks(slide_specs, timeline, work_dir)
+        trace = current_trace()
+        pending = []
+        for task in tasks:
+            task["key"] = _segment_key(task, profile)
+            cached_path = SEGMENT_CACHE.get(task["key"])
+            if cached_path:
+                task["path"] = cached_path
+                continue
+            task["profile"] = profile
+            task["threads"] = encoder_threads(workers)
+            task["trace"] = trace.context() if trace else None
+            pending.append(task)
+
+        reused = len(tasks) - len(pending)
+        if progress_callback and reused:
+            progress_callback(reused, len(tasks))
+
+        if pending:
+            # 'spawn' keeps workers clear of Streamlit's threads and sockets
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                futures = [pool.submit(render_segment, task) for task in pending]
+                try:
+                    for done, future in enumerate(as_completed(futures), start=reused + 1):
+                        future.result()
+                        if progress_callback:
+                            progress_callback(done, len(tasks))
+                except BaseException:
+                    # Failed or aborted by the callback: drop segments not started yet
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+        with stage("concat", segments=len(tasks), reused=reused):
+            concat_segments(
+                [task["path"] for task in tasks], output_path, timeline.narration, profile, preview_path,
+                subtitles,
+            )
+
+        # Keep the new segments for the next render of this deck
+        for task in pending:
+            SEGMENT_CACHE.put_file(task["key"], task["path"])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info(
+        f"Rendered {len(slide_specs)} slides in parallel "
+        f"({reused}/{len(tasks)} segments reused) -> {output_path}"
     )
+    return output_path
+
+# --- STREAMING RENDER ---
+# Frames go straight from the slide clips into ONE ffmpeg process over a
+# pipe, and ffmpeg reads and mixes the narration files itself. Only the
+# slide being written (plus the next one during a crossfade) is ever open,
+# so memory stays flat however long the deck is.
+
+def _narration_filter(offsets):
+    """
+    filter_complex placing input i+1 (narration track i) at offsets[i]
+    seconds and mixing them, so overlaps sound like the 'compose' mode.
+    """
+    chains = [
+        f"[{i + 1}:a]adelay=delays={round(offset * 1000)}:all=1[a{i}]"
+        for i, offset in enumerate(offsets)
+    ]
+    inputs = "".join(f"[a{i}]" for i in range(len(offsets)))
+    chains.append(f"{inputs}amix=inputs={len(offsets)}:normalize=0:dropout_transition=0[aout]")
+    return ";".join(chains)
+
+def open_stream_encoder(
+    output_path, audio_paths, offsets, profile, stderr=None, preview_path=None, threads=0
+):
+    """
+    ffmpeg process reading raw RGB frames (profile size @ profile fps)
+    on stdin and the narration files from disk (one per slide, or the
+    single deck narration at offset 0).
+
+    preview_path: also encode the preview rendition from the same frames
+                  and mixed narration (split inside ffmpeg)
+    """
+    width, height = profile.size
+    command = [
+        probe().ffmpeg, "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-vcodec", "rawvideo", "-pix_fmt", "rgb24",
+        "-s", f"{width}x{height}", "-r", str(profile.fps), "-i", "-",
+    ]
+    for path in audio_paths:
+        command += ["-i", path]
+
+    filters = _narration_filter(offsets)
+    video, audio = "0:v", "[aout]"
+    if preview_path:
+        filters += (
+            f";[0:v]split=2[vmain][vfull];[vfull]scale=-2:{PREVIEW_PROFILE.size[1]}[vpreview]"
+            ";[aout]asplit=2[amain][apreview]"
+        )
+        video, audio = "[vmain]", "[amain]"
+
+    command += [
+        "-filter_complex", filters,
+        "-map", video, "-map", audio,
+        *_x264_args(profile, threads),
+        "-c:a", "aac", "-b:a", profile.audio_bitrate,
+        "-movflags", "+faststart",
+        output_path,
+    ]
+    if preview_path:
+        command += ["-map", "[vpreview]", "-map", "[apreview]", *_preview_args(profile.fps), preview_path]
+    return subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr)
+
+def _stream_frames(encoder, clip, fps, frames):
+    """
+    Exactly `frames` frames of `clip` (clip.iter_frames yields
+    ceil(duration * fps), plus float error: one frame too many per piece
+    would add up across the deck and drift away from the narration).
+    """
+    for k in range(frames):
+        encoder.stdin.write(_uint8_frame(clip, k / fps).tobytes())
+
+def render_slides_streaming(
+    slide_specs, service_name=None, progress_callback=None, profile=None, timeline=None, preview=None,
+    subtitles=None,
+):
+    """
+    Render slides one at a time straight into an ffmpeg pipe.
+
+    Same timeline as the 'compose' and 'parallel' modes. The slide clips
+    carry no audio (ffmpeg reads the narration files) and each one is
+    closed as soon as its frames are written.
+    slide_specs: list of {"image_path", "title", "content", "audio_path"}
+    progress_callback: optional fn(done, total) called as slides finish
+    profile: render profile name or RenderProfile (default: RENDER_PROFILE)
+    timeline: deck_timeline(slide_specs, narration) if already built
+              (required with a deck narration: the specs have no audio)
+    preview: also write the preview rendition (default: RENDER_PREVIEW)
+    subtitles: (srt path, language) muxed as a soft subtitle track
+    """
+    profile = get_profile(profile)
+    timeline = timeline or deck_timeline(slide_specs, fps=profile.fps)
+    output_path = build_output_path(service_name, profile=profile)
+    outputs = [output_path]
+    if wants_preview(profile, preview):
+        outputs.append(preview_path_for(output_path))
+    partials = [_partial_path(path) for path in outputs]
+    last = len(slide_specs) - 1
+
+    with tempfile.TemporaryFile() as error_log:
+        audio_paths, offsets = zip(*timeline.tracks)
+        encoder = open_stream_encoder(
+            partials[0], audio_paths, offsets, profile, stderr=error_log,
+            preview_path=partials[1] if len(partials) > 1 else None, threads=encoder_threads(),
+        )
+        clip = incoming = None
+        completed = False
+        try:
+            for i, (spec, timing) in enumerate(zip(slide_specs, timeline.slides)):
+                clip = incoming if incoming is not None else _build_slide_clip(spec, profile, False)
+                incoming = None
+
+                if timing.body_end > timing.body_start:
+                    with stage("encode", segment=f"{i:04d}_body"):
+                        _stream_frames(
+                            encoder, clip.subclip(timing.body_start, timing.body_end), profile.fps,
+                            _frames_between(timing.body_start, timing.body_end, profile.fps),
+                        )
+
+                if i < last:
+                    incoming = _build_slide_clip(slide_specs[i + 1], profile, False)
+                    with stage("encode", segment=f"{i:04d}_join"):
+                        _stream_frames(
+                            encoder, _join_clip(clip, incoming, profile.size, timeline.fade), profile.fps,
+                            _frames_between(0, timeline.fade, profile.fps),
+                        )
+
+                clip.close()
+                clip = None
+                # moviepy clips form reference cycles: free this slide's
+                # frames now instead of whenever the cyclic GC next runs
+                gc.collect()
+                if progress_callback:
+                    progress_callback(i + 1, len(slide_specs))
+            completed = True
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its own error is raised below
+        except BaseException:
+            encoder.kill()  # failed, or aborted by the callback
+            raise
+        finally:
+            for open_clip in (clip, incoming):
+                if open_clip is not None:
+                    open_clip.close()
+            try:
+                encoder.stdin.close()  # end of stream: ffmpeg finishes the file
+            except BrokenPipeError:
+                pass
+            if encoder.wait() == 0 and completed:
+                _publish(partials, outputs, subtitles)
+            _discard(partials)
+
+        if encoder.returncode != 0:
+            error_log.seek(0)
+            message = error_log.read().decode("utf-8", "replace").strip()
+            raise RuntimeError(f"ffmpeg failed ({encoder.returncode}): {message}")
 
+    logger.info(f"Streamed {len(slide_specs)} slides -> {output_path}")
     return output_path